@@ -1,38 +1,400 @@
-from flask import Flask, request, jsonify, render_template, send_file
-import google.generativeai as genai
+from flask import Flask, Request, Response, g, has_request_context, request, jsonify, render_template, stream_with_context, url_for
 import os
+import re
+import io
+import csv
 import json
+import multiprocessing
+import random
+import shutil
+import base64
+import bisect
+import contextvars
+import importlib.util
+import hashlib
+import signal
 import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from werkzeug.utils import secure_filename
-import PyPDF2
-from docx import Document
 from dotenv import load_dotenv
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
 
 # Load environment variables
 load_dotenv()
 
+class UploadRequest(Request):
+    """Request that keeps uploaded files in memory up to UPLOAD_SPOOL_MAX_MEMORY.
+
+    Werkzeug spools every file part over 500KB to disk while parsing the form.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_MEMORY'], mode='rb+')
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'docx', 'txt'}
 
+# SQLite settings
+app.config['DATABASE'] = os.getenv('DATABASE_PATH', 'database.db')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))
+
+# Follow-up requests for the missing tail of a truncated Gemini response (0 = off)
+app.config['GEMINI_CONTINUATION_ATTEMPTS'] = int(os.getenv('GEMINI_CONTINUATION_ATTEMPTS', '1'))
+
+# Gemini call scheduler (per process): rate limits, retries and circuit breaker
+app.config['LLM_REQUESTS_PER_MINUTE'] = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '60'))
+app.config['LLM_TOKENS_PER_MINUTE'] = int(os.getenv('LLM_TOKENS_PER_MINUTE', '1000000'))
+app.config['LLM_RESPONSE_TOKEN_ESTIMATE'] = int(os.getenv('LLM_RESPONSE_TOKEN_ESTIMATE', '2000'))
+app.config['LLM_MAX_RETRIES'] = int(os.getenv('LLM_MAX_RETRIES', '4'))
+app.config['LLM_BACKOFF_BASE'] = float(os.getenv('LLM_BACKOFF_BASE', '1'))
+app.config['LLM_BACKOFF_MAX'] = float(os.getenv('LLM_BACKOFF_MAX', '30'))
+app.config['LLM_QUEUE_TIMEOUT'] = float(os.getenv('LLM_QUEUE_TIMEOUT', '120'))
+app.config['LLM_BREAKER_THRESHOLD'] = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+app.config['LLM_BREAKER_COOLDOWN'] = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))
+
+# Batch uploads: files per request, files processed at the same time (shared
+# by all batch requests of a process) and the request size limit
+app.config['BATCH_MAX_FILES'] = int(os.getenv('BATCH_MAX_FILES', '50'))
+app.config['BATCH_CONCURRENCY'] = int(os.getenv('BATCH_CONCURRENCY', '4'))
+app.config['BATCH_MAX_CONTENT_LENGTH'] = int(os.getenv('BATCH_MAX_CONTENT_MB', '200')) * 1024 * 1024
+
+# Upload storage: uploads up to UPLOAD_SPOOL_MAX_MEMORY bytes are parsed and
+# extracted in memory and larger ones are spooled to a temporary file.
+# Originals are kept once per SHA-256 under uploads/blobs. A janitor thread deletes stored files
+# older than STORAGE_MAX_AGE_DAYS, then the oldest ones until uploads/ fits in
+# STORAGE_MAX_MB (0 = no limit; an interval of 0 turns the janitor off).
+app.config['UPLOAD_SPOOL_MAX_MEMORY'] = int(os.getenv('UPLOAD_SPOOL_MAX_MEMORY', str(2 * 1024 * 1024)))
+app.config['UPLOAD_KEEP_ORIGINALS'] = os.getenv('UPLOAD_KEEP_ORIGINALS', '1') == '1'
+app.config['STORAGE_MAX_AGE_DAYS'] = int(os.getenv('STORAGE_MAX_AGE_DAYS', '30'))
+app.config['STORAGE_MAX_MB'] = int(os.getenv('STORAGE_MAX_MB', '1024'))
+app.config['STORAGE_JANITOR_INTERVAL'] = int(os.getenv('STORAGE_JANITOR_INTERVAL', '3600'))
+
+# Callable (or "module:attribute" path) used instead of google.generativeai.GenerativeModel,
+# so benchmarks and load tests can run against a local stand-in
+app.config['GEMINI_MODEL_FACTORY'] = os.getenv('GEMINI_MODEL_FACTORY') or None
+
+# Generation cache settings (shared by all workers through the database)
+app.config['GENERATION_CACHE_ENABLED'] = os.getenv('GENERATION_CACHE_ENABLED', '1') == '1'
+app.config['GENERATION_CACHE_MAX_ENTRIES'] = int(os.getenv('GENERATION_CACHE_MAX_ENTRIES', '500'))
+app.config['GENERATION_CACHE_MAX_BYTES'] = int(os.getenv('GENERATION_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+app.config['GENERATION_CACHE_MAX_AGE_DAYS'] = int(os.getenv('GENERATION_CACHE_MAX_AGE_DAYS', '30'))
+
+# Background upload job settings
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', '4'))
+app.config['JOB_QUEUE_SIZE'] = int(os.getenv('JOB_QUEUE_SIZE', '32'))
+app.config['JOB_RETENTION_HOURS'] = int(os.getenv('JOB_RETENTION_HOURS', '24'))
+app.config['JOB_EVENTS_POLL_INTERVAL'] = float(os.getenv('JOB_EVENTS_POLL_INTERVAL', '0.5'))
+app.config['JOB_EVENTS_TIMEOUT'] = int(os.getenv('JOB_EVENTS_TIMEOUT', '600'))
+
+# How long deletions are remembered for GET /test-cases?since= (older clients reload)
+app.config['SYNC_TOMBSTONE_RETENTION_HOURS'] = int(os.getenv('SYNC_TOMBSTONE_RETENTION_HOURS', '24'))
+
+# Near-duplicate detection: generated test cases whose estimated Jaccard
+# similarity to an existing one reaches the threshold are not stored
+app.config['DEDUP_ENABLED'] = os.getenv('DEDUP_ENABLED', '1') == '1'
+app.config['DEDUP_THRESHOLD'] = float(os.getenv('DEDUP_THRESHOLD', '0.8'))
+
+# Add a Server-Timing header with the stage and database timings to every response
+app.config['SERVER_TIMING_ENABLED'] = os.getenv('SERVER_TIMING_ENABLED', '0') == '1'
+
+# Rows per Parquet row group in /export?format=parquet
+app.config['PARQUET_ROW_GROUP_SIZE'] = int(os.getenv('PARQUET_ROW_GROUP_SIZE', '10000'))
+
+# Map-reduce generation settings for large documents
+app.config['CHUNK_TOKEN_BUDGET'] = int(os.getenv('CHUNK_TOKEN_BUDGET', '6000'))
+app.config['CHUNK_AUTO_THRESHOLD_TOKENS'] = int(os.getenv('CHUNK_AUTO_THRESHOLD_TOKENS', '30000'))
+app.config['CHUNK_CONCURRENCY'] = int(os.getenv('CHUNK_CONCURRENCY', '4'))
+
+# Incremental regeneration: re-uploading a known file regenerates only the
+# sections whose text changed. Sections under the minimum size are generated
+# together with the section before them.
+app.config['INCREMENTAL_REGENERATION'] = os.getenv('INCREMENTAL_REGENERATION', '1') == '1'
+app.config['INCREMENTAL_MIN_SECTION_TOKENS'] = int(os.getenv('INCREMENTAL_MIN_SECTION_TOKENS', '30'))
+
+# Requirement text compaction before prompting, and the largest document
+# (in estimated tokens, after compaction) accepted for generation; 0 = no limit
+app.config['COMPACTION_ENABLED'] = os.getenv('COMPACTION_ENABLED', '1') == '1'
+app.config['COMPACTION_MIN_DUPLICATE_CHARS'] = int(os.getenv('COMPACTION_MIN_DUPLICATE_CHARS', '80'))
+app.config['MAX_REQUIREMENT_TOKENS'] = int(os.getenv('MAX_REQUIREMENT_TOKENS', '250000'))
+
+# Text extraction settings. EXTRACTION_PAGE_TIMEOUT only applies to PDFs
+# parsed in the process pool; pages extracted in the request thread have no
+# time limit.
+app.config['EXTRACTION_MAX_PAGES'] = int(os.getenv('EXTRACTION_MAX_PAGES', '0'))  # 0 = no limit
+app.config['EXTRACTION_PROCESS_POOL'] = os.getenv('EXTRACTION_PROCESS_POOL', '0') == '1'
+app.config['EXTRACTION_WORKERS'] = int(os.getenv('EXTRACTION_WORKERS', str(os.cpu_count() or 2)))
+app.config['EXTRACTION_PARALLEL_MIN_PAGES'] = int(os.getenv('EXTRACTION_PARALLEL_MIN_PAGES', '40'))
+app.config['EXTRACTION_PAGES_PER_TASK'] = int(os.getenv('EXTRACTION_PAGES_PER_TASK', '20'))
+app.config['EXTRACTION_PAGE_TIMEOUT'] = float(os.getenv('EXTRACTION_PAGE_TIMEOUT', '10'))
+
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+# Bump whenever SYSTEM_INSTRUCTION or build_generation_prompt changes so that
+# generations cached under the old prompt are no longer served
+PROMPT_VERSION = '2'
+
 # Configure Gemini AI
+# (the client itself is configured on first use, see get_gemini_model)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if not GEMINI_API_KEY:
     print("WARNING: GEMINI_API_KEY not found in environment variables!")
-else:
-    genai.configure(api_key=GEMINI_API_KEY)
 
-# Create uploads folder if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+PAGE_BREAK = '\f'
 
-# Database initialization
-def init_db():
-    conn = sqlite3.connect('database.db')
-    cursor = conn.cursor()
+# Metrics. Histograms live in this process and are rendered in the
+# Prometheus text format by /metrics. timed_stage() also keeps each
+# request's timings for the optional Server-Timing header.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+BYTE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+class Histogram:
+    """Labelled histogram with fixed buckets, rendered in the Prometheus text format"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # One counter per bucket plus +Inf, then the sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series_items = [(labels, list(series)) for labels, series in self._series.items()]
+        for label_values, series in sorted(series_items):
+            labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labelnames, label_values)]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                bucket_labels = ','.join(labels + [f'le="{bound}"'])
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_text = '{' + ','.join(labels) + '}' if labels else ''
+            lines.append(f'{self.name}_sum{label_text} {series[-1]}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from a callback when /metrics is scraped"""
+
+    def __init__(self, name, documentation, callback, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.kind = kind
+
+    def render(self):
+        return (f'# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n'
+                f'{self.name} {self.callback()}\n')
+
+REQUEST_DURATION = Histogram('case10x_http_request_duration_seconds', 'Time to produce a response, per route.',
+                             ('route', 'method', 'status'))
+STAGE_DURATION = Histogram('case10x_stage_duration_seconds', 'Time spent in each upload pipeline stage.', ('stage',))
+DB_QUERY_DURATION = Histogram('case10x_db_query_duration_seconds', 'SQLite statement execution time, per route.', ('route',))
+GEMINI_TOKENS = Histogram('case10x_gemini_tokens', 'Gemini prompt and response tokens per call.', ('direction',), TOKEN_BUCKETS)
+EXTRACTED_BYTES = Histogram('case10x_extracted_bytes', 'Bytes of text extracted per file.', ('file_type',), BYTE_BUCKETS)
+LLM_QUEUE_WAIT = Histogram('case10x_llm_queue_wait_seconds', 'Time Gemini calls waited for the scheduler.')
+REQUIREMENT_TOKENS = Histogram('case10x_requirement_tokens', 'Estimated requirement text tokens per upload, before and after compaction.',
+                               ('stage',), TOKEN_BUCKETS)
+METRICS = [REQUEST_DURATION, STAGE_DURATION, DB_QUERY_DURATION, GEMINI_TOKENS, EXTRACTED_BYTES, LLM_QUEUE_WAIT, REQUIREMENT_TOKENS]
+
+def current_route():
+    """Route pattern of the current request, used as a low-cardinality metric label"""
+    if not has_request_context():
+        return 'background'
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@contextmanager
+def timed_stage(stage):
+    """Record how long the enclosed block takes as an upload pipeline stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+def record_stage(stage, seconds):
+    STAGE_DURATION.observe(seconds, stage)
+    if has_request_context():
+        g.setdefault('stage_timings', []).append((stage, seconds))
+
+def record_db_query(seconds):
+    DB_QUERY_DURATION.observe(seconds, current_route())
+    if has_request_context():
+        g.db_seconds = g.get('db_seconds', 0.0) + seconds
+        g.db_queries = g.get('db_queries', 0) + 1
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports how long each statement takes to execute"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_db_query(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_db_query(time.perf_counter() - started)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the implicit ones of execute(), are instrumented"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# Near-duplicate detection. Every test case gets a MinHash signature over
+# the word shingles of its name and steps. Locality-sensitive hashing splits
+# the signature into bands, and cases sharing any band bucket become
+# candidates, so a lookup costs a few index probes instead of a table scan.
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+SHINGLE_SIZE = 3
+WORD_PATTERN = re.compile(r'\w+')
+
+def test_case_shingles(test_case):
+    """Word shingles of a test case's name and steps"""
+    test_steps = test_case.get('test_steps') or ''
+    if isinstance(test_steps, list):
+        test_steps = '\n'.join(test_steps)
+    words = WORD_PATTERN.findall(f"{test_case.get('test_case_name') or ''}\n{test_steps}".lower())
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))}
+
+def minhash_signature(test_case):
+    """MinHash signature of a test case as MINHASH_PERMUTATIONS 32-bit values.
+
+    One SHAKE-128 digest per shingle supplies an independent 32-bit hash for
+    every permutation, and the element-wise minimum runs in C via zip/min.
+    """
+    digests = (
+        array('I', hashlib.shake_128(shingle.encode('utf-8')).digest(4 * MINHASH_PERMUTATIONS))
+        for shingle in test_case_shingles(test_case)
+    )
+    return array('I', map(min, zip(*digests)))
+
+def lsh_buckets(signature):
+    """One bucket per band, as signed 64-bit integers so SQLite stores them natively"""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes(), digest_size=8).digest(),
+            'little', signed=True
+        )
+        for band in range(LSH_BANDS)
+    ]
+
+def signature_similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for a, b in zip(signature, other) if a == b) / MINHASH_PERMUTATIONS
+
+def load_signature(blob):
+    signature = array('I')
+    signature.frombytes(blob)
+    return signature
+
+def index_test_case_signatures(cursor, test_cases):
+    """Store the signature and LSH buckets of saved test cases (dicts with ``id``)"""
+    signature_rows, bucket_rows = [], []
+    for tc in test_cases:
+        signature = minhash_signature(tc)
+        signature_rows.append((tc['id'], signature.tobytes()))
+        bucket_rows.extend((tc['id'], band, bucket) for band, bucket in enumerate(lsh_buckets(signature)))
+    cursor.executemany('INSERT OR REPLACE INTO test_case_signatures (test_case_id, signature) VALUES (?, ?)', signature_rows)
+    cursor.executemany('INSERT OR REPLACE INTO test_case_lsh (test_case_id, band, bucket) VALUES (?, ?, ?)', bucket_rows)
+
+# Database access. Each thread keeps one pooled connection (see get_db) in
+# WAL mode, so readers are not blocked while an upload is being written.
+_db_local = threading.local()
+
+def connect_db():
+    """Open a new SQLite connection with WAL journaling and tuned pragmas"""
+    conn = sqlite3.connect(
+        app.config['DATABASE'],
+        timeout=app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000,
+        isolation_level=None,  # transactions are managed explicitly by transaction()
+        factory=InstrumentedConnection
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f"PRAGMA busy_timeout = {app.config['SQLITE_BUSY_TIMEOUT_MS']}")
+    conn.execute(f"PRAGMA cache_size = -{app.config['SQLITE_CACHE_SIZE_KB']}")
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA foreign_keys = ON')
+    return conn
+
+def get_db():
+    """Return this thread's pooled connection, opening it on first use"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        conn = connect_db()
+        _db_local.conn = conn
+    return conn
+
+def _reset_db_connections():
+    # A forked worker must not share its parent's SQLite connections
+    global _db_local
+    _db_local = threading.local()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_db_connections)
+
+@contextmanager
+def transaction(conn=None):
+    """Run a block in one write transaction on the pooled connection.
+
+    BEGIN IMMEDIATE takes the write lock up front so concurrent writers wait
+    on busy_timeout instead of failing halfway through. Nested uses join the
+    outer transaction.
+    """
+    conn = conn or get_db()
+    if conn.in_transaction:
+        yield conn.cursor()
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn.cursor()
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+def _migrate_base_schema(cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS test_cases (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -47,69 +409,863 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    conn.commit()
-    conn.close()
+    # Columns added after the first release
+    cursor.execute('PRAGMA table_info(test_cases)')
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'source_section' not in columns:
+        cursor.execute('ALTER TABLE test_cases ADD COLUMN source_section TEXT')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS generation_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            test_cases TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            hit_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS upload_jobs (
+            id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT,
+            error TEXT,
+            result TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS generation_cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+def _migrate_lookup_indexes(cursor):
+    # Serves the filename filter on GET /test-cases and the per-file DELETE
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_cases_file_created ON test_cases (requirement_file, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_cases_created_at ON test_cases (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_generation_cache_accessed ON generation_cache (last_accessed_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_jobs_updated_at ON upload_jobs (updated_at)')
+
+def _migrate_filter_indexes(cursor):
+    # Keyset pagination orders by (created_at, id); id is the rowid, so these
+    # indexes already end in it and serve both the filter and the order
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_cases_type_created ON test_cases (test_type, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_cases_priority_created ON test_cases (priority, created_at)')
+
+def _migrate_search_index(cursor):
+    # External-content FTS5 index: the text lives only in test_cases and the
+    # triggers keep the index in step with every insert, update and delete
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS test_cases_fts USING fts5(
+            test_case_name, description, test_steps, expected_result,
+            content='test_cases', content_rowid='id', tokenize='porter unicode61'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS test_cases_fts_insert AFTER INSERT ON test_cases BEGIN
+            INSERT INTO test_cases_fts (rowid, test_case_name, description, test_steps, expected_result)
+            VALUES (new.id, new.test_case_name, new.description, new.test_steps, new.expected_result);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS test_cases_fts_delete AFTER DELETE ON test_cases BEGIN
+            INSERT INTO test_cases_fts (test_cases_fts, rowid, test_case_name, description, test_steps, expected_result)
+            VALUES ('delete', old.id, old.test_case_name, old.description, old.test_steps, old.expected_result);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS test_cases_fts_update
+        AFTER UPDATE OF test_case_name, description, test_steps, expected_result ON test_cases BEGIN
+            INSERT INTO test_cases_fts (test_cases_fts, rowid, test_case_name, description, test_steps, expected_result)
+            VALUES ('delete', old.id, old.test_case_name, old.description, old.test_steps, old.expected_result);
+            INSERT INTO test_cases_fts (rowid, test_case_name, description, test_steps, expected_result)
+            VALUES (new.id, new.test_case_name, new.description, new.test_steps, new.expected_result);
+        END
+    ''')
+    # Matches in the name count most, then the description, then steps and results
+    cursor.execute("INSERT INTO test_cases_fts (test_cases_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0, 2.0)')")
+    # Index the rows that existed before this migration
+    cursor.execute("INSERT INTO test_cases_fts (test_cases_fts) VALUES ('rebuild')")
+
+def _migrate_duplicate_index(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS test_case_signatures (
+            test_case_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS test_case_lsh (
+            test_case_id INTEGER NOT NULL,
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            PRIMARY KEY (test_case_id, band)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_case_lsh_bucket ON test_case_lsh (band, bucket)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS test_cases_signature_delete AFTER DELETE ON test_cases BEGIN
+            DELETE FROM test_case_signatures WHERE test_case_id = old.id;
+            DELETE FROM test_case_lsh WHERE test_case_id = old.id;
+        END
+    ''')
+    # Sign the test cases stored before this migration
+    rows = cursor.execute('SELECT id, test_case_name, test_steps FROM test_cases').fetchall()
+    for start in range(0, len(rows), 1000):
+        index_test_case_signatures(cursor, [dict(row) for row in rows[start:start + 1000]])
+
+def _migrate_requirement_snapshots(cursor):
+    # section_key ties each generated test case to the document section it
+    # came from, so a revised upload can keep the cases of unchanged sections
+    cursor.execute('ALTER TABLE test_cases ADD COLUMN section_key TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_cases_file_section ON test_cases (requirement_file, section_key)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS requirement_snapshots (
+            requirement_file TEXT PRIMARY KEY,
+            requirement_text TEXT NOT NULL,
+            sections TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _migrate_documents(cursor):
+    # One row per requirement document, referenced by an integer key instead
+    # of repeating the filename in every test case. The section snapshots of
+    # incremental regeneration move here too.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            filename TEXT NOT NULL UNIQUE,
+            file_type TEXT,
+            size_bytes INTEGER,
+            content_hash TEXT,
+            page_count INTEGER,
+            requirement_text TEXT,
+            sections TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO documents (filename, requirement_text, sections, updated_at)
+        SELECT requirement_file, requirement_text, sections, updated_at FROM requirement_snapshots
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO documents (filename, created_at, updated_at)
+        SELECT requirement_file, MIN(created_at), MAX(created_at) FROM test_cases GROUP BY requirement_file
+    ''')
+    cursor.execute('DROP TABLE requirement_snapshots')
+
+    # Lookup tables for the enum codes, so the stored integers stay readable in SQL
+    for table, codes in (('test_case_priorities', PRIORITY_IDS), ('test_case_types', TEST_TYPE_IDS)):
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)')
+        cursor.executemany(f'INSERT INTO {table} (id, name) VALUES (?, ?)', [(code, name) for name, code in codes.items()])
+
+    # SQLite cannot change column types in place: rebuild test_cases, keeping
+    # the IDs (the search and duplicate indexes are keyed by them) and the
+    # triggers, which DROP TABLE removes
+    triggers = [row[0] for row in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'test_cases'"
+    )]
+    sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'test_cases'").fetchone()
+    cursor.execute('''
+        CREATE TABLE test_cases_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+            test_case_name TEXT NOT NULL,
+            description TEXT,
+            preconditions TEXT,
+            test_steps TEXT,
+            expected_result TEXT,
+            priority_id INTEGER NOT NULL REFERENCES test_case_priorities (id),
+            test_type_id INTEGER NOT NULL REFERENCES test_case_types (id),
+            source_section TEXT,
+            section_key TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Free-text values written before the enums were enforced are coerced
+    # the same way generated test cases are
+    cursor.connection.create_function('priority_code', 1, lambda value: PRIORITY_IDS[
+        _enum_value(value, TEST_CASE_PRIORITIES, PRIORITY_ALIASES, 'Medium')])
+    cursor.connection.create_function('test_type_code', 1, lambda value: TEST_TYPE_IDS[
+        _enum_value(value, TEST_CASE_TYPES, TEST_TYPE_ALIASES, 'Functional')])
+    cursor.execute('''
+        INSERT INTO test_cases_new
+        (id, document_id, test_case_name, description, preconditions, test_steps, expected_result,
+         priority_id, test_type_id, source_section, section_key, created_at)
+        SELECT t.id, d.id, t.test_case_name, t.description, t.preconditions, t.test_steps, t.expected_result,
+               priority_code(t.priority), test_type_code(t.test_type), t.source_section, t.section_key, t.created_at
+        FROM test_cases t JOIN documents d ON d.filename = t.requirement_file
+    ''')
+    cursor.execute('DROP TABLE test_cases')
+    cursor.execute('ALTER TABLE test_cases_new RENAME TO test_cases')
+    for trigger in triggers:
+        cursor.execute(trigger)
+    if sequence:
+        # Deleted IDs must not be handed out again
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'test_cases'", (sequence[0],))
+
+    cursor.execute('CREATE INDEX idx_test_cases_document_created ON test_cases (document_id, created_at)')
+    cursor.execute('CREATE INDEX idx_test_cases_document_section ON test_cases (document_id, section_key)')
+    cursor.execute('CREATE INDEX idx_test_cases_created_at ON test_cases (created_at)')
+    cursor.execute('CREATE INDEX idx_test_cases_type_created ON test_cases (test_type_id, created_at)')
+    cursor.execute('CREATE INDEX idx_test_cases_priority_created ON test_cases (priority_id, created_at)')
+
+    # Test cases as the API shows them, with the keys resolved to names.
+    # Filters still go on the integer columns, which the view passes through.
+    cursor.execute('''
+        CREATE VIEW test_case_details AS
+        SELECT t.id, t.document_id, d.filename AS requirement_file, t.test_case_name, t.description,
+               t.preconditions, t.test_steps, t.expected_result, t.priority_id, p.name AS priority,
+               t.test_type_id, y.name AS test_type, t.source_section, t.section_key, t.created_at
+        FROM test_cases t
+        JOIN documents d ON d.id = t.document_id
+        JOIN test_case_priorities p ON p.id = t.priority_id
+        JOIN test_case_types y ON y.id = t.test_type_id
+    ''')
+
+def _migrate_change_tracking(cursor):
+    # Every change to a test case takes the next value of a table-wide
+    # version counter, so clients can ask for what changed since the version
+    # they last saw. Deletions leave a tombstone carrying their version.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS test_case_sync (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    # epoch tells databases apart in ETags, so a recreated database never
+    # matches an ETag from the old one
+    cursor.execute('''
+        INSERT INTO test_case_sync (name, value)
+        VALUES ('version', 0), ('pruned_version', 0), ('epoch', abs(random() % 1000000000))
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS test_case_tombstones (
+            test_case_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_case_tombstones_version ON test_case_tombstones (version)')
+
+    cursor.execute('ALTER TABLE test_cases ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('ALTER TABLE test_cases ADD COLUMN updated_at TIMESTAMP')
+    cursor.execute('UPDATE test_cases SET updated_at = created_at')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_cases_version ON test_cases (version)')
+
+    # The triggers only set version and updated_at, which are not in the
+    # watched column list, so they never fire themselves again
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS test_cases_version_insert AFTER INSERT ON test_cases BEGIN
+            UPDATE test_case_sync SET value = value + 1 WHERE name = 'version';
+            UPDATE test_cases
+            SET version = (SELECT value FROM test_case_sync WHERE name = 'version'), updated_at = CURRENT_TIMESTAMP
+            WHERE id = new.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS test_cases_version_update
+        AFTER UPDATE OF document_id, test_case_name, description, preconditions, test_steps, expected_result,
+                        priority_id, test_type_id, source_section, section_key ON test_cases BEGIN
+            UPDATE test_case_sync SET value = value + 1 WHERE name = 'version';
+            UPDATE test_cases
+            SET version = (SELECT value FROM test_case_sync WHERE name = 'version'), updated_at = CURRENT_TIMESTAMP
+            WHERE id = new.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS test_cases_version_delete AFTER DELETE ON test_cases BEGIN
+            UPDATE test_case_sync SET value = value + 1 WHERE name = 'version';
+            INSERT OR REPLACE INTO test_case_tombstones (test_case_id, version)
+            VALUES (old.id, (SELECT value FROM test_case_sync WHERE name = 'version'));
+        END
+    ''')
+
+    cursor.execute('DROP VIEW test_case_details')
+    cursor.execute('''
+        CREATE VIEW test_case_details AS
+        SELECT t.id, t.document_id, d.filename AS requirement_file, t.test_case_name, t.description,
+               t.preconditions, t.test_steps, t.expected_result, t.priority_id, p.name AS priority,
+               t.test_type_id, y.name AS test_type, t.source_section, t.section_key, t.created_at,
+               t.updated_at, t.version
+        FROM test_cases t
+        JOIN documents d ON d.id = t.document_id
+        JOIN test_case_priorities p ON p.id = t.priority_id
+        JOIN test_case_types y ON y.id = t.test_type_id
+    ''')
+
+def _migrate_edit_tracking(cursor):
+    # Re-uploads regenerate test cases but keep the ones a user edited
+    cursor.execute('ALTER TABLE test_cases ADD COLUMN edited_at TIMESTAMP')
+    # Inserts set updated_at to created_at, so only an edit moves it past it
+    cursor.execute('UPDATE test_cases SET edited_at = updated_at WHERE updated_at > created_at')
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run, so append new steps here and never edit released ones.
+SCHEMA_MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_lookup_indexes,
+    _migrate_filter_indexes,
+    _migrate_search_index,
+    _migrate_duplicate_index,
+    _migrate_requirement_snapshots,
+    _migrate_documents,
+    _migrate_change_tracking,
+    _migrate_edit_tracking,
+]
 
-# Initialize database on startup
-init_db()
+# Database initialization
+def init_db():
+    """Bring the database schema up to date"""
+    conn = connect_db()
+    try:
+        # Nothing to do on an up to date database, which is every start but
+        # the first; skip the write lock so workers start without waiting
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= len(SCHEMA_MIGRATIONS):
+            return
+        while True:
+            # Re-read the version under the write lock so concurrently
+            # starting workers never apply the same migration twice
+            with transaction(conn) as cursor:
+                version = cursor.execute('PRAGMA user_version').fetchone()[0]
+                if version >= len(SCHEMA_MIGRATIONS):
+                    break
+                SCHEMA_MIGRATIONS[version](cursor)
+                cursor.execute(f'PRAGMA user_version = {version + 1}')
+            print(f"Applied database migration {version + 1}: {SCHEMA_MIGRATIONS[version].__name__}")
+    finally:
+        conn.close()
+
+_app_setup_lock = threading.Lock()
+_app_ready = False
+
+def create_app(config=None):
+    """Prepare the app to serve requests and return it.
+
+    Importing app.py only defines routes and reads configuration; this
+    creates the uploads folder and migrates the database, once per process.
+    ``config`` overrides app.config values first (tests, benchmarks). The app
+    stays a module-level singleton because helpers and background threads
+    read ``app.config`` outside of requests.
+    """
+    global _app_ready, gemini_scheduler
+    with _app_setup_lock:
+        if config:
+            app.config.update(config)
+            if any(key.startswith('LLM_') for key in config):
+                gemini_scheduler = LLMScheduler(app.config)
+        if not _app_ready:
+            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+            init_db()
+            _app_ready = True
+    return app
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF file"""
+def request_flag(name):
+    """Read a boolean flag from the form data or query string"""
+    value = request.form.get(name) or request.args.get(name) or ''
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Upload storage. An upload is spooled once by the form parser, hashed, and
+# extracted from the spool; originals are content-addressed, so identical
+# files are stored once.
+UPLOAD_READ_CHUNK_SIZE = 64 * 1024
+UPLOAD_BLOB_DIR = 'blobs'
+
+class SpooledUpload:
+    """An uploaded file with its size and SHA-256, read in one pass.
+
+    Takes over the stream of a FileStorage, which UploadRequest spooled in
+    memory up to UPLOAD_SPOOL_MAX_MEMORY bytes and to a temporary file beyond
+    that; it is not copied. The upload outlives the request, so background
+    jobs can take it over; whoever processes the upload closes it. ``path``
+    is set once the original has been stored by store_upload. Raises
+    UploadError (413) past ``max_size`` bytes.
+    """
+
+    def __init__(self, file, max_size=None):
+        self.file = file.stream
+        # Closing the request closes the streams of its files
+        file.stream = io.BytesIO()
+        self.path = None
+        self.size = 0
+        digest = hashlib.sha256()
+        try:
+            self.file.seek(0)
+            for block in iter(lambda: self.file.read(UPLOAD_READ_CHUNK_SIZE), b''):
+                self.size += len(block)
+                if max_size and self.size > max_size:
+                    raise UploadError(f'File exceeds the {max_size // (1024 * 1024)}MB size limit', 413)
+                digest.update(block)
+        except BaseException:
+            self.file.close()
+            raise
+        self.content_hash = digest.hexdigest()
+
+    @property
+    def in_memory(self):
+        return self.size <= app.config['UPLOAD_SPOOL_MAX_MEMORY']
+
+    def open(self):
+        """The uploaded bytes, rewound for reading"""
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self.file.close()
+
+def read_upload(file, max_size=None):
+    """Hash an uploaded file and keep its original when UPLOAD_KEEP_ORIGINALS is set"""
+    with timed_stage('save'):
+        upload = SpooledUpload(file, max_size)
+        if app.config['UPLOAD_KEEP_ORIGINALS']:
+            try:
+                store_upload(upload)
+            except OSError as e:
+                # Keeping the original is best effort; processing works from the spool
+                print(f"Could not store the original of {file.filename}: {e}")
+    return upload
+
+def blob_path(content_hash):
+    """Where the original with this SHA-256 is stored"""
+    return os.path.join(app.config['UPLOAD_FOLDER'], UPLOAD_BLOB_DIR, content_hash[:2], content_hash)
+
+def store_upload(upload):
+    """Store the original of an upload under its SHA-256 and return the path.
+
+    A file that is already stored is not written again; its modification
+    time is refreshed, which restarts its retention period.
+    """
+    path = blob_path(upload.content_hash)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write under a temporary name and rename, so a blob is never seen half written
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(temp_path, 'wb') as blob:
+                shutil.copyfileobj(upload.open(), blob, UPLOAD_READ_CHUNK_SIZE)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    upload.path = path
+    return path
+
+# Storage janitor state of this process, reported by /storage/stats
+_storage_stats = {'files': None, 'bytes': None, 'removed_files': 0, 'removed_bytes': 0, 'last_sweep': None}
+_storage_stats_lock = threading.Lock()
+_storage_janitor_pid = None
+_storage_janitor_lock = threading.Lock()
+
+def iter_stored_files():
+    """Yield ``(path, size, mtime)`` for every file under UPLOAD_FOLDER"""
+    for root, _, names in os.walk(app.config['UPLOAD_FOLDER']):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+def sweep_storage(now=None):
+    """Delete stored files past STORAGE_MAX_AGE_DAYS, then the oldest until STORAGE_MAX_MB is met.
+
+    Covers the content-addressed originals as well as uploads and Excel
+    exports that earlier versions left in uploads/. Files that are still
+    being written are only removed by age. Returns the sweep's counters.
+    """
+    now = time.time() if now is None else now
+    max_age = app.config['STORAGE_MAX_AGE_DAYS'] * 24 * 3600
+    max_bytes = app.config['STORAGE_MAX_MB'] * 1024 * 1024
+
+    files = sorted(iter_stored_files(), key=lambda stored: stored[2])
+    total_bytes = sum(size for _, size, _ in files)
+    removed_files = removed_bytes = 0
+    for path, size, mtime in files:
+        expired = max_age and now - mtime > max_age
+        over_quota = max_bytes and total_bytes > max_bytes and not path.endswith('.tmp')
+        if not (expired or over_quota):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Removed by the janitor of another worker
+        total_bytes -= size
+        removed_files += 1
+        removed_bytes += size
+
+    if removed_files:
+        print(f"Storage janitor removed {removed_files} files ({removed_bytes / 1024 / 1024:.1f} MB)")
+    with _storage_stats_lock:
+        _storage_stats['files'] = len(files) - removed_files
+        _storage_stats['bytes'] = total_bytes
+        _storage_stats['removed_files'] += removed_files
+        _storage_stats['removed_bytes'] += removed_bytes
+        _storage_stats['last_sweep'] = datetime.fromtimestamp(now).isoformat(timespec='seconds')
+    return {'files': len(files) - removed_files, 'bytes': total_bytes,
+            'removed_files': removed_files, 'removed_bytes': removed_bytes}
+
+def run_storage_janitor(interval):
+    while True:
+        try:
+            sweep_storage()
+        except Exception as e:
+            print(f"Error sweeping upload storage: {e}")
+        time.sleep(interval)
+
+def start_storage_janitor():
+    """Start this process's janitor thread, once.
+
+    Called on the first request rather than in create_app(), so that with
+    preload_app every forked worker starts its own thread. Sweeps are
+    idempotent, so workers sharing uploads/ do not get in each other's way.
+    """
+    global _storage_janitor_pid
+    interval = app.config['STORAGE_JANITOR_INTERVAL']
+    if not interval or _storage_janitor_pid == os.getpid():
+        return
+    with _storage_janitor_lock:
+        if _storage_janitor_pid != os.getpid():
+            threading.Thread(
+                target=run_storage_janitor, args=(interval,), name='storage-janitor', daemon=True
+            ).start()
+            _storage_janitor_pid = os.getpid()
+
+# Per file type extraction counters, reported by /extraction/stats
+_extraction_stats = {}
+_extraction_stats_lock = threading.Lock()
+
+def record_extraction(file_type, unit, units, text, seconds, timeouts=0):
+    """Accumulate extraction throughput counters and log the file's numbers"""
+    size = len(text.encode('utf-8'))
+    EXTRACTED_BYTES.observe(size, file_type)
+    with _extraction_stats_lock:
+        stats = _extraction_stats.setdefault(file_type, {
+            'files': 0, 'unit': unit, 'units': 0, 'bytes': 0, 'seconds': 0.0, 'timeouts': 0
+        })
+        stats['files'] += 1
+        stats['units'] += units
+        stats['bytes'] += size
+        stats['seconds'] += seconds
+        stats['timeouts'] += timeouts
+
+    throughput = size / 1024 / seconds if seconds > 0 else 0.0
+    print(f"Extracted {units} {unit} ({size / 1024:.1f} KB) from {file_type.upper()} "
+          f"in {seconds:.2f}s ({throughput:.1f} KB/s)")
+
+class PageExtractionTimeout(Exception):
+    """Raised inside an extraction worker when a single page takes too long"""
+
+def _raise_page_timeout(signum, frame):
+    raise PageExtractionTimeout()
+
+def iter_pdf_pages(pdf_reader, start, stop):
+    """Yield the text of each page in ``[start, stop)``"""
+    for page_number in range(start, stop):
+        yield pdf_reader.pages[page_number].extract_text() or ''
+
+def _extract_pdf_page_range(file_path, start, stop, page_timeout):
+    """Process pool task: extract pages ``[start, stop)`` of a PDF.
+
+    Pages that exceed ``page_timeout`` seconds come back as None. The timeout
+    relies on SIGALRM, which pool workers can use because tasks run on their
+    main thread; on platforms without it pages are never cut short.
+    """
+    use_alarm = page_timeout > 0 and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_page_timeout)
+
+    import PyPDF2
+
+    page_texts = []
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_number in range(start, stop):
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            try:
+                page_texts.append(pdf_reader.pages[page_number].extract_text() or '')
+            except PageExtractionTimeout:
+                page_texts.append(None)
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+    return page_texts
+
+_extraction_executor = None
+_extraction_executor_lock = threading.Lock()
+
+def get_extraction_executor():
+    """Lazily create the process pool used for parallel PDF extraction.
+
+    Workers are started from a forkserver (spawned where that is not
+    available), because forking a threaded server process can copy locks
+    that other threads hold at that moment.
+    """
+    global _extraction_executor
+    with _extraction_executor_lock:
+        if _extraction_executor is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _extraction_executor = ProcessPoolExecutor(
+                max_workers=app.config['EXTRACTION_WORKERS'],
+                mp_context=multiprocessing.get_context(start_method)
+            )
+        return _extraction_executor
+
+def iter_pdf_pages_parallel(file_path, page_count):
+    """Yield page texts in order while page ranges are parsed across the process pool"""
+    pages_per_task = app.config['EXTRACTION_PAGES_PER_TASK']
+    executor = get_extraction_executor()
+    futures = [
+        executor.submit(
+            _extract_pdf_page_range,
+            file_path,
+            start,
+            min(start + pages_per_task, page_count),
+            app.config['EXTRACTION_PAGE_TIMEOUT']
+        )
+        for start in range(0, page_count, pages_per_task)
+    ]
+    for future in futures:
+        yield from future.result()
+
+def open_binary(source):
+    """Open a path for reading, or rewind a binary file that the caller keeps open"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb')
+    source.seek(0)
+    return nullcontext(source)
+
+def extract_text_from_pdf(source, file_path=None):
+    """Extract text from a PDF, given as a path or a binary file.
+
+    The process pool reopens the PDF in its workers, so it is only used when
+    the PDF is also on disk (``source`` is a path, or ``file_path`` is given).
+    """
+    import PyPDF2
+
+    if isinstance(source, (str, os.PathLike)):
+        file_path = source
     try:
-        with open(file_path, 'rb') as file:
+        started = time.perf_counter()
+        with open_binary(source) as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            page_count = len(pdf_reader.pages)
+
+            max_pages = app.config['EXTRACTION_MAX_PAGES']
+            if max_pages and page_count > max_pages:
+                print(f"PDF has {page_count} pages, extracting only the first {max_pages}")
+                page_count = max_pages
+
+            use_pool = (app.config['EXTRACTION_PROCESS_POOL'] and file_path
+                        and page_count >= app.config['EXTRACTION_PARALLEL_MIN_PAGES'])
+            if use_pool:
+                page_texts = iter_pdf_pages_parallel(file_path, page_count)
+            else:
+                page_texts = iter_pdf_pages(pdf_reader, 0, page_count)
+
+            # Collect parts and join once; the form feed marks page boundaries
+            # for split_requirement_text
+            parts = []
+            timeouts = 0
+            for page_text in page_texts:
+                if page_text is None:
+                    timeouts += 1
+                    page_text = ''
+                parts.append(page_text)
+                parts.append('\n' + PAGE_BREAK)
+            text = ''.join(parts)
+
+        if timeouts:
+            print(f"Skipped {timeouts} PDF pages that exceeded the extraction timeout")
+        record_extraction('pdf', 'pages', page_count, text, time.perf_counter() - started, timeouts)
+        return text
     except Exception as e:
         print(f"Error extracting PDF: {e}")
         return None
 
-def extract_text_from_docx(file_path):
-    """Extract text from DOCX file"""
+def iter_docx_paragraphs(doc):
+    """Yield the text of each paragraph in a DOCX document"""
+    for paragraph in doc.paragraphs:
+        yield paragraph.text
+
+def extract_text_from_docx(source):
+    """Extract text from a DOCX, given as a path or a binary file"""
+    from docx import Document
+
     try:
-        doc = Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        started = time.perf_counter()
+        with open_binary(source) as file:
+            doc = Document(file)
+        paragraphs = list(iter_docx_paragraphs(doc))
+        text = ''.join(paragraph + '\n' for paragraph in paragraphs)
+        record_extraction('docx', 'paragraphs', len(paragraphs), text, time.perf_counter() - started)
         return text
     except Exception as e:
         print(f"Error extracting DOCX: {e}")
         return None
 
-def extract_text_from_txt(file_path):
-    """Extract text from TXT file"""
+def extract_text_from_txt(source):
+    """Extract text from a UTF-8 text file, given as a path or a binary file"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        started = time.perf_counter()
+        with open_binary(source) as file:
+            # Universal newlines, as text mode would give
+            text = file.read().decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        record_extraction('txt', 'lines', text.count('\n') + 1, text, time.perf_counter() - started)
+        return text
     except Exception as e:
         print(f"Error extracting TXT: {e}")
         return None
 
-def extract_text_from_file(file_path, file_extension):
-    """Extract text based on file type"""
+def extract_text_from_file(source, file_extension):
+    """Extract text based on file type, from a path or a SpooledUpload"""
+    file_path = None
+    if isinstance(source, SpooledUpload):
+        source, file_path = source.open(), source.path
     if file_extension == 'pdf':
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(source, file_path)
     elif file_extension == 'docx':
-        return extract_text_from_docx(file_path)
+        return extract_text_from_docx(source)
     elif file_extension == 'txt':
-        return extract_text_from_txt(file_path)
+        return extract_text_from_txt(source)
     return None
 
-def generate_test_cases_with_gemini(requirement_text):
-    """Use Gemini AI to generate test cases from requirements"""
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        prompt = f"""
-You are an expert QA engineer with 10+ years of experience. Analyze the following requirement document THOROUGHLY and generate COMPREHENSIVE test cases covering ALL functionality mentioned in the document.
+# Requirement text compaction. Extracted text, PDFs especially, carries page
+# furniture that costs prompt tokens without describing any requirement.
+PAGE_EDGE_LINES = 2
+PAGE_NUMBER_PATTERN = re.compile(r'^(?:page\s*)?[-–—(]?\s*\d{1,4}\s*[-–—)]?(?:\s*(?:of|/)\s*\d{1,4})?$', re.IGNORECASE)
+TOC_LEADER_PATTERN = re.compile(r'(?:\.\s?){4,}\s*\d{1,4}$|…{2,}\s*\d{1,4}$')
+INLINE_WHITESPACE_PATTERN = re.compile(r'[ \t\u00a0\u2000-\u200b\u3000]+')
 
-REQUIREMENT DOCUMENT:
-{requirement_text}
+def estimate_tokens(text):
+    """Rough Gemini token estimate (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+def _boilerplate_key(line):
+    # Page furniture differs only in its numbers ("Page 3 of 40", "Rev 2 - 3")
+    return re.sub(r'\d+', '#', line.lower())
+
+def page_edge_lines(lines):
+    """Indexes of the first and last PAGE_EDGE_LINES non-empty lines of a page"""
+    content = [index for index, line in enumerate(lines) if line]
+    return set(content[:PAGE_EDGE_LINES] + content[-PAGE_EDGE_LINES:])
+
+def find_repeated_page_lines(pages):
+    """Keys of lines that open or close at least half of the pages (running headers and footers)"""
+    if len(pages) < 3:
+        return set()
+    page_counts = {}
+    for lines in pages:
+        for key in {_boilerplate_key(lines[index]) for index in page_edge_lines(lines)}:
+            page_counts[key] = page_counts.get(key, 0) + 1
+    return {key for key, count in page_counts.items() if count >= max(3, len(pages) / 2)}
+
+def compact_requirement_text(text):
+    """Strip page furniture and noise from extracted text before it is sent to Gemini.
+
+    Removes running headers and footers, page numbers and table of contents
+    lines, collapses whitespace and drops paragraphs that repeat an earlier
+    one. Page furniture is only looked for on the first and last lines of
+    each page of paged (PDF) text, so a number on its own line in the body,
+    such as a table cell, is kept. Line breaks and page breaks are kept,
+    because section splitting relies on them. Returns ``(text, stats)``.
+    """
+    stats = {'header_footer_lines': 0, 'page_number_lines': 0, 'toc_lines': 0, 'duplicate_blocks': 0}
+    paged = PAGE_BREAK in text
+    pages = [
+        [INLINE_WHITESPACE_PATTERN.sub(' ', line).strip() for line in page.split('\n')]
+        for page in text.split(PAGE_BREAK)
+    ]
+    repeated = find_repeated_page_lines(pages)
+    min_block_chars = app.config['COMPACTION_MIN_DUPLICATE_CHARS']
+
+    seen_blocks = set()
+    compacted_pages = []
+    for lines in pages:
+        kept = []
+        edges = page_edge_lines(lines) if paged else ()
+        for index, line in enumerate(lines):
+            if index not in edges:
+                kept.append(line)
+            elif _boilerplate_key(line) in repeated:
+                stats['header_footer_lines'] += 1
+            elif PAGE_NUMBER_PATTERN.match(line):
+                stats['page_number_lines'] += 1
+            elif TOC_LEADER_PATTERN.search(line):
+                stats['toc_lines'] += 1
+            else:
+                kept.append(line)
+
+        blocks = []
+        for block in '\n'.join(kept).split('\n\n'):
+            block = block.strip('\n')
+            if not block:
+                continue
+            # Long paragraphs seen before are boilerplate (notices, disclaimers)
+            key = ' '.join(block.lower().split())
+            if len(key) >= min_block_chars:
+                if key in seen_blocks:
+                    stats['duplicate_blocks'] += 1
+                    continue
+                seen_blocks.add(key)
+            blocks.append(block)
+        if blocks:
+            compacted_pages.append('\n\n'.join(blocks))
+
+    return ('\n' + PAGE_BREAK).join(compacted_pages), stats
+
+def prepare_requirement_text(filename, text):
+    """Compact extracted text and enforce MAX_REQUIREMENT_TOKENS.
+
+    Returns ``(text, token_report)``; the report compares the extracted and
+    the compacted size. Raises UploadError (413) for documents over the budget.
+    """
+    extracted_tokens = estimate_tokens(text)
+    stats = {}
+    if app.config['COMPACTION_ENABLED']:
+        with timed_stage('compact'):
+            text, stats = compact_requirement_text(text)
+    compacted_tokens = estimate_tokens(text)
+    REQUIREMENT_TOKENS.observe(extracted_tokens, 'extracted')
+    REQUIREMENT_TOKENS.observe(compacted_tokens, 'compacted')
+
+    report = {
+        'extracted': extracted_tokens,
+        'compacted': compacted_tokens,
+        'saved': extracted_tokens - compacted_tokens,
+        'budget': app.config['MAX_REQUIREMENT_TOKENS'] or None,
+        **stats,
+    }
+    print(f"Compacted {filename}: {extracted_tokens} -> {compacted_tokens} estimated tokens (saved {report['saved']})")
+
+    budget = app.config['MAX_REQUIREMENT_TOKENS']
+    if budget and compacted_tokens > budget:
+        raise UploadError(
+            f'Requirement text is about {compacted_tokens} tokens, above the limit of {budget}. '
+            'Split the document into smaller files.',
+            413
+        )
+    return text, report
+
+# Static part of the generation prompt. It is sent as the model's system
+# instruction, so every request only carries the requirement text itself.
+SYSTEM_INSTRUCTION = """
+You are an expert QA engineer with 10+ years of experience. The user sends a requirement document; analyze it THOROUGHLY and generate COMPREHENSIVE test cases covering ALL functionality mentioned in the document.
 
 CRITICAL INSTRUCTIONS:
 1. READ THE ENTIRE DOCUMENT carefully and identify EVERY feature, function, and requirement
@@ -233,7 +1389,7 @@ Return ONLY a valid JSON array of test cases.
 
 Example format:
 [
-  {{
+  {
     "test_case_name": "Verify successful user login with valid credentials",
     "description": "Test that users can successfully log in using correct email and password",
     "preconditions": "1. User account exists in database\\n2. User is not already logged in\\n3. Account is not locked",
@@ -241,8 +1397,8 @@ Example format:
     "expected_result": "User is successfully authenticated, session is created, and user is redirected to dashboard with welcome message displaying their name",
     "priority": "High",
     "test_type": "Functional"
-  }},
-  {{
+  },
+  {
     "test_case_name": "Verify login fails with invalid password",
     "description": "Test that login is rejected when user enters incorrect password",
     "preconditions": "1. User account exists in database\\n2. User is not logged in",
@@ -250,8 +1406,8 @@ Example format:
     "expected_result": "Login fails, error message 'Invalid email or password' is displayed, user remains on login page, no session is created",
     "priority": "High",
     "test_type": "Functional"
-  }},
-  {{
+  },
+  {
     "test_case_name": "Verify SQL injection prevention in login form",
     "description": "Test that the login form properly sanitizes input and prevents SQL injection attacks",
     "preconditions": "Application is running and accessible",
@@ -259,8 +1415,8 @@ Example format:
     "expected_result": "Login fails, malicious input is sanitized/rejected, error message is displayed, no unauthorized access is granted, attempt is logged",
     "priority": "High",
     "test_type": "Security"
-  }},
-  {{
+  },
+  {
     "test_case_name": "Verify login page loads within acceptable time under normal load",
     "description": "Test that login page response time meets performance requirements with 100 concurrent users",
     "preconditions": "1. Application is deployed in production environment\\n2. Performance testing tool is configured\\n3. 100 concurrent users are simulated",
@@ -268,191 +1424,2367 @@ Example format:
     "expected_result": "Average response time is under 2 seconds, 95th percentile is under 3 seconds, no errors or timeouts occur, all users can access the page",
     "priority": "High",
     "test_type": "Performance"
-  }}
+  }
 ]
 """
-        
-        response = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
-        
-        response_text = response.text.strip()
-        
-        # Parse JSON response
-        test_cases = json.loads(response_text)
-        return test_cases
-    
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
-        print(f"Response text: {response.text if 'response' in locals() else 'No response'}")
-        return None
-    except Exception as e:
-        print(f"Error generating test cases: {e}")
-        return None
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+# Marks the sections of a multi-section generation, so test cases can be
+# traced back to the section they came from
+SECTION_MARKER = '[Section {number}]'
 
-@app.route('/upload', methods=['POST'])
-def upload_file():
-    """Handle file upload and generate test cases"""
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    if not allowed_file(file.filename):
-        return jsonify({'error': 'Invalid file type. Only PDF, DOCX, and TXT files are allowed'}), 400
-    
-    try:
-        # Save file
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        # Extract text from file
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        requirement_text = extract_text_from_file(file_path, file_extension)
-        
-        if not requirement_text:
-            return jsonify({'error': 'Failed to extract text from file'}), 500
-        
-        # Generate test cases using Gemini AI
-        test_cases = generate_test_cases_with_gemini(requirement_text)
-        
-        if not test_cases:
-            return jsonify({'error': 'Failed to generate test cases'}), 500
-        
-        # Connect to database
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        
-        # DELETE PREVIOUS TEST CASES FOR THIS FILE
-        cursor.execute('DELETE FROM test_cases WHERE requirement_file = ?', (filename,))
-        deleted_count = cursor.rowcount
-        
-        if deleted_count > 0:
-            print(f"Deleted {deleted_count} previous test cases for file: {filename}")
-        
-        # Save new test cases to database
-        saved_test_cases = []
-        for tc in test_cases:
-            # Handle list fields if Gemini returns them as arrays
-            test_steps = tc.get('test_steps', '')
-            if isinstance(test_steps, list):
-                test_steps = '\n'.join(test_steps)
-                
-            preconditions = tc.get('preconditions', '')
-            if isinstance(preconditions, list):
-                preconditions = '\n'.join(preconditions)
+def build_generation_prompt(requirement_text, section_title=None, numbered_sections=False):
+    """Build the per-request part of the generation prompt for a requirement text.
 
-            cursor.execute('''
-                INSERT INTO test_cases 
-                (requirement_file, test_case_name, description, preconditions, test_steps, expected_result, priority, test_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                filename,
-                tc.get('test_case_name', ''),
-                tc.get('description', ''),
-                preconditions,
-                test_steps,
-                tc.get('expected_result', ''),
-                tc.get('priority', 'Medium'),
-                tc.get('test_type', 'Functional')
-            ))
-            
-            test_case_id = cursor.lastrowid
-            saved_test_cases.append({
-                'id': test_case_id,
-                'requirement_file': filename,
-                **tc
+    When ``section_title`` is given the text is one chunk of a larger
+    document and the prompt asks for coverage of that chunk only. With
+    ``numbered_sections`` the text is split by SECTION_MARKER lines and every
+    test case is asked to name the section it tests.
+    """
+    scope_note = ""
+    if section_title:
+        scope_note = (
+            f'\nThis excerpt is the "{section_title}" section of a larger requirement document. '
+            "Generate test cases ONLY for the requirements in this excerpt, and scale the number of "
+            "test cases to its size (the 20-30 minimum applies to the whole document).\n"
+        )
+    if numbered_sections:
+        scope_note += (
+            '\nThe document is divided into numbered sections, each starting with a "'
+            + SECTION_MARKER.format(number='N') + '" line. Add a "section" field to every test case '
+            "holding the number N of the section it tests.\n"
+        )
+
+    return f"""Generate test cases for the following requirement document, following your instructions.
+{scope_note}
+REQUIREMENT DOCUMENT:
+{requirement_text}
+"""
+
+SYSTEM_INSTRUCTION_TOKENS = estimate_tokens(SYSTEM_INSTRUCTION)
+GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+_gemini_model = None
+_gemini_model_lock = threading.Lock()
+
+def get_gemini_model():
+    """Return the shared Gemini client, or the stand-in named by GEMINI_MODEL_FACTORY.
+
+    The model carries the system instruction and generation config, so it is
+    built once per process (and again only if GEMINI_MODEL_FACTORY changes).
+    """
+    global _gemini_model
+    factory = app.config['GEMINI_MODEL_FACTORY']
+    with _gemini_model_lock:
+        if _gemini_model is not None and _gemini_model[0] == factory:
+            return _gemini_model[1]
+
+        if factory:
+            create = factory
+        else:
+            # Imported here because loading the SDK takes about a second, and
+            # configured after fork so each worker gets its own gRPC channel
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            create = genai.GenerativeModel
+        if isinstance(create, str):
+            # "package.module:attribute", e.g. benchmarks.fake_gemini:FakeGenerativeModel
+            module_name, _, attribute = create.partition(':')
+            create = getattr(importlib.import_module(module_name), attribute)
+        model = create(GEMINI_MODEL_NAME, system_instruction=SYSTEM_INSTRUCTION, generation_config=GENERATION_CONFIG)
+        _gemini_model = (factory, model)
+        return model
+
+def record_gemini_usage(response, prompt, response_text):
+    """Record the token counts Gemini reports, or estimates when it reports none.
+
+    Returns the total so the scheduler can settle its token reservation.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimate_tokens(prompt) + SYSTEM_INSTRUCTION_TOKENS
+    response_tokens = getattr(usage, 'candidates_token_count', None) or estimate_tokens(response_text)
+    GEMINI_TOKENS.observe(prompt_tokens, 'prompt')
+    GEMINI_TOKENS.observe(response_tokens, 'response')
+    return prompt_tokens + response_tokens
+
+class GeminiUnavailableError(Exception):
+    """Gemini could not be reached: circuit open, retries exhausted or queue wait timed out"""
+
+# HTTP statuses (and google.api_core error codes) worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def is_retryable_gemini_error(error):
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(error, 'code', None) in RETRYABLE_STATUS_CODES
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute, up to one minute's worth"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount):
+        """Seconds until ``amount`` units are available (0 when they are now)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        return 0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        # May go negative when a call used more than it reserved
+        self.tokens -= amount
+
+# Fairness key of the current caller (the uploaded file), see llm_caller()
+_llm_caller = contextvars.ContextVar('llm_caller', default='default')
+
+@contextmanager
+def llm_caller(key):
+    """Queue the Gemini calls made inside this block under ``key``"""
+    token = _llm_caller.set(key)
+    try:
+        yield
+    finally:
+        _llm_caller.reset(token)
+
+class LLMScheduler:
+    """Central gate for Gemini calls.
+
+    Callers wait in one queue per caller key, served round-robin so one
+    large document cannot starve the others. A call starts once both the
+    requests-per-minute and tokens-per-minute buckets allow it. Retryable
+    failures are retried with jittered exponential backoff. After
+    LLM_BREAKER_THRESHOLD consecutive failures the circuit opens and calls
+    fail fast for LLM_BREAKER_COOLDOWN seconds, then a single probe call
+    decides whether it closes again.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()
+        self._requests = TokenBucket(config['LLM_REQUESTS_PER_MINUTE'])
+        self._tokens = TokenBucket(config['LLM_TOKENS_PER_MINUTE'])
+        self._consecutive_failures = 0
+        self._opened_until = None
+        self._probe_in_flight = False
+        self.waiting = 0
+        self.in_flight = 0
+        self.counters = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+
+    def call(self, fn, estimated_tokens):
+        """Run ``fn`` (one Gemini request) under the rate limits, retrying transient failures"""
+        max_retries = self.config['LLM_MAX_RETRIES']
+        for attempt in range(max_retries + 1):
+            probe = self._check_breaker()
+            try:
+                self._acquire(_llm_caller.get(), estimated_tokens)
+            except GeminiUnavailableError:
+                self._end_probe(probe)
+                raise
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable_gemini_error(e):
+                    self._end_probe(probe)
+                    raise
+                self._record_failure(probe)
+                if attempt == max_retries:
+                    raise GeminiUnavailableError(f'Gemini is unavailable after {attempt + 1} attempts: {e}') from e
+                delay = random.uniform(0, min(self.config['LLM_BACKOFF_MAX'], self.config['LLM_BACKOFF_BASE'] * 2 ** attempt))
+                print(f"Gemini call failed ({e}), retrying in {delay:.1f}s")
+                with self._cond:
+                    self.counters['retries'] += 1
+                time.sleep(delay)
+                continue
+            finally:
+                with self._cond:
+                    self.in_flight -= 1
+            self._record_success(probe)
+            return result
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Charge the difference between the reserved and the reported token count"""
+        with self._cond:
+            self._tokens.consume(actual_tokens - estimated_tokens)
+
+    def _check_breaker(self):
+        """Fail fast while the circuit is open; returns True when this call is the half-open probe"""
+        with self._cond:
+            if self._opened_until is None:
+                return False
+            if time.monotonic() < self._opened_until or self._probe_in_flight:
+                self.counters['rejected'] += 1
+                raise GeminiUnavailableError('Gemini is unavailable (circuit open), please retry shortly')
+            self._probe_in_flight = True
+            return True
+
+    def _end_probe(self, probe):
+        if probe:
+            with self._cond:
+                self._probe_in_flight = False
+
+    def _record_success(self, probe):
+        with self._cond:
+            self.counters['calls'] += 1
+            self._consecutive_failures = 0
+            self._opened_until = None
+            if probe:
+                self._probe_in_flight = False
+
+    def _record_failure(self, probe):
+        with self._cond:
+            self.counters['calls'] += 1
+            self.counters['failures'] += 1
+            self._consecutive_failures += 1
+            if probe or self._consecutive_failures >= self.config['LLM_BREAKER_THRESHOLD']:
+                if self._opened_until is None or probe:
+                    print(f"Opening the Gemini circuit after {self._consecutive_failures} consecutive failures")
+                self._opened_until = time.monotonic() + self.config['LLM_BREAKER_COOLDOWN']
+            if probe:
+                self._probe_in_flight = False
+
+    def _acquire(self, key, estimated_tokens):
+        """Wait for this caller's turn and for both rate limits to allow the call"""
+        ticket = object()
+        started = time.monotonic()
+        deadline = started + self.config['LLM_QUEUE_TIMEOUT']
+        with self._cond:
+            self._queues.setdefault(key, deque()).append(ticket)
+            self.waiting += 1
+            try:
+                while True:
+                    wait = None
+                    head_key = next(iter(self._queues))
+                    if head_key == key and self._queues[key][0] is ticket:
+                        wait = max(self._requests.wait_time(1), self._tokens.wait_time(estimated_tokens))
+                        if wait == 0:
+                            self._requests.consume(1)
+                            self._tokens.consume(min(estimated_tokens, self._tokens.capacity))
+                            self.in_flight += 1
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters['rejected'] += 1
+                        raise GeminiUnavailableError('Timed out waiting for a Gemini rate limit slot')
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                queue = self._queues[key]
+                queue.remove(ticket)
+                if queue:
+                    # Round-robin: this caller's next call goes behind everyone else's
+                    self._queues.move_to_end(key)
+                else:
+                    del self._queues[key]
+                self.waiting -= 1
+                self._cond.notify_all()
+        LLM_QUEUE_WAIT.observe(time.monotonic() - started)
+
+    def stats(self):
+        with self._cond:
+            if self._opened_until is None:
+                breaker = 'closed'
+            elif time.monotonic() < self._opened_until:
+                breaker = 'open'
+            else:
+                breaker = 'half-open'
+            return {
+                'queue_depth': self.waiting,
+                'queued_callers': len(self._queues),
+                'in_flight': self.in_flight,
+                'circuit': breaker,
+                'consecutive_failures': self._consecutive_failures,
+                'requests_available': round(max(self._requests.tokens, 0), 2),
+                'tokens_available': round(max(self._tokens.tokens, 0)),
+                **self.counters
+            }
+
+gemini_scheduler = LLMScheduler(app.config)
+METRICS.extend([
+    CallbackMetric('case10x_llm_queue_depth', 'Gemini calls waiting for the scheduler.', lambda: gemini_scheduler.waiting),
+    CallbackMetric('case10x_llm_in_flight', 'Gemini calls in progress.', lambda: gemini_scheduler.in_flight),
+    CallbackMetric('case10x_llm_circuit_open', '1 while the Gemini circuit breaker is open or half-open.',
+                   lambda: int(gemini_scheduler.stats()['circuit'] != 'closed')),
+    CallbackMetric('case10x_llm_retries_total', 'Gemini calls retried after a transient failure.',
+                   lambda: gemini_scheduler.counters['retries'], kind='counter'),
+    CallbackMetric('case10x_llm_rejected_total', 'Gemini calls rejected by the circuit breaker or queue timeout.',
+                   lambda: gemini_scheduler.counters['rejected'], kind='counter'),
+    CallbackMetric('case10x_llm_salvaged_responses_total', 'Malformed or truncated Gemini responses parsed by salvaging.',
+                   lambda: response_parse_stats['salvaged_responses'], kind='counter'),
+    CallbackMetric('case10x_llm_continuations_total', 'Continuation requests for truncated Gemini responses.',
+                   lambda: response_parse_stats['continuations'], kind='counter'),
+    CallbackMetric('case10x_llm_rejected_test_cases_total', 'Generated test cases dropped by schema validation.',
+                   lambda: response_parse_stats['rejected_test_cases'], kind='counter'),
+])
+
+# Schema of a generated test case. Gemini mostly follows it, but renamed
+# keys, odd enum spellings and list-valued text fields all occur in practice.
+TEST_CASE_PRIORITIES = ('High', 'Medium', 'Low')
+TEST_CASE_TYPES = ('Functional', 'Performance', 'Security', 'Usability', 'Reliability', 'Compatibility', 'Maintainability')
+PRIORITY_ALIASES = {'critical': 'High', 'p0': 'High', 'p1': 'High', 'p2': 'Medium', 'normal': 'Medium', 'p3': 'Low', 'minor': 'Low'}
+TEST_TYPE_ALIASES = {'integration': 'Functional', 'regression': 'Functional', 'load': 'Performance', 'stress': 'Performance',
+                     'accessibility': 'Usability', 'ui': 'Usability', 'ux': 'Usability'}
+TEST_CASE_KEY_ALIASES = {
+    'name': 'test_case_name', 'title': 'test_case_name', 'test_name': 'test_case_name',
+    'steps': 'test_steps', 'expected': 'expected_result', 'expected_results': 'expected_result',
+    'precondition': 'preconditions', 'type': 'test_type', 'category': 'test_type',
+}
+# Small integer codes stored for the enums. Append only: the codes are in
+# every test case row and in the lookup tables.
+PRIORITY_IDS = {name: code for code, name in enumerate(TEST_CASE_PRIORITIES, 1)}
+TEST_TYPE_IDS = {name: code for code, name in enumerate(TEST_CASE_TYPES, 1)}
+TEST_CASE_TEXT_FIELDS = ('test_case_name', 'description', 'preconditions', 'test_steps', 'expected_result')
+TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+CODE_FENCE_PATTERN = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+
+# Per-process counters for /llm/stats and /metrics
+response_parse_stats = {'salvaged_responses': 0, 'continuations': 0, 'rejected_test_cases': 0}
+_response_parse_stats_lock = threading.Lock()
+
+def _count_parse_stat(name, amount=1):
+    with _response_parse_stats_lock:
+        response_parse_stats[name] += amount
+
+def _text_value(value):
+    if isinstance(value, list):
+        return '\n'.join(str(item).strip() for item in value if item is not None)
+    return '' if value is None else str(value).strip()
+
+def _enum_value(value, choices, aliases, default):
+    key = re.sub(r'\s*(?:testing|tests?)$', '', _text_value(value).lower()).strip()
+    for choice in choices:
+        if key == choice.lower():
+            return choice
+    return aliases.get(key, default)
+
+def normalize_test_case(test_case):
+    """Validate one generated test case against the schema and normalize it.
+
+    Renamed keys are mapped back, list-valued text fields (typically
+    ``test_steps``) are joined into lines, and ``priority``/``test_type`` are
+    coerced to their enums. Returns None for anything that is not a usable
+    test case.
+    """
+    if not isinstance(test_case, dict):
+        return None
+    normalized = {}
+    for key, value in test_case.items():
+        key = TEST_CASE_KEY_ALIASES.get(key, key)
+        if key not in normalized:
+            normalized[key] = value
+
+    for field in TEST_CASE_TEXT_FIELDS:
+        normalized[field] = _text_value(normalized.get(field))
+    if not normalized['test_case_name']:
+        return None
+    normalized['priority'] = _enum_value(normalized.get('priority'), TEST_CASE_PRIORITIES, PRIORITY_ALIASES, 'Medium')
+    normalized['test_type'] = _enum_value(normalized.get('test_type'), TEST_CASE_TYPES, TEST_TYPE_ALIASES, 'Functional')
+    return normalized
+
+def normalize_test_cases(items):
+    """Normalize a list of generated test cases, dropping (and counting) invalid ones"""
+    test_cases = []
+    for item in items:
+        tc = normalize_test_case(item)
+        if tc is None:
+            _count_parse_stat('rejected_test_cases')
+            print(f"Skipping invalid generated test case: {str(item)[:200]}")
+            continue
+        test_cases.append(tc)
+    return test_cases
+
+def decode_json_object(text):
+    """Decode one JSON value, repairing trailing commas and raw control characters"""
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(TRAILING_COMMA_PATTERN.sub(r'\1', text), strict=False)
+
+def parse_test_cases_response(response_text):
+    """Parse Gemini's test case array, salvaging what it can from broken output.
+
+    Valid JSON takes the fast path. Otherwise every complete object is pulled
+    out of the text, so a response cut off mid-array keeps the test cases
+    before the cut. Returns ``(test_cases, truncated)``.
+    """
+    text = CODE_FENCE_PATTERN.sub('', response_text)
+    try:
+        items = decode_json_object(text)
+        truncated = False
+    except json.JSONDecodeError:
+        parser = IncrementalJSONArrayParser()
+        items = parser.feed(text)
+        truncated = not parser.complete
+        _count_parse_stat('salvaged_responses')
+        print(f"Salvaged {len(items)} test cases from malformed response (truncated: {truncated})")
+
+    if isinstance(items, dict):
+        # {"test_cases": [...]} instead of a bare array
+        items = items.get('test_cases', [items])
+    if not isinstance(items, list):
+        items = []
+    return normalize_test_cases(items), truncated
+
+def build_continuation_prompt(prompt, test_cases):
+    """Ask for the rest of a response that was cut off after ``test_cases``"""
+    received = '\n'.join(f"- {tc['test_case_name']}" for tc in test_cases)
+    return f"""{prompt}
+Your previous answer was cut off. These test cases were already received:
+{received}
+
+Continue with the remaining test cases only. Return a JSON array that does not repeat any test case listed above.
+"""
+
+def request_test_cases(model, prompt):
+    """One rate-limited Gemini generation, parsed with parse_test_cases_response"""
+    estimated_tokens = estimate_tokens(prompt) + SYSTEM_INSTRUCTION_TOKENS + app.config['LLM_RESPONSE_TOKEN_ESTIMATE']
+
+    def request_generation():
+        response = model.generate_content(prompt)
+        return response, response.text.strip()
+
+    # Rate limited and retried by the scheduler; GeminiUnavailableError propagates
+    with timed_stage('gemini'):
+        response, response_text = gemini_scheduler.call(request_generation, estimated_tokens)
+    gemini_scheduler.settle(estimated_tokens, record_gemini_usage(response, prompt, response_text))
+
+    with timed_stage('parse'):
+        test_cases, truncated = parse_test_cases_response(response_text)
+    if not test_cases:
+        print(f"No usable test cases in response: {response_text[:500]}")
+    return test_cases, truncated
+
+def continue_test_cases(model, prompt, test_cases):
+    """Request the missing tail of a truncated response, up to GEMINI_CONTINUATION_ATTEMPTS times.
+
+    Returns only the test cases that are new.
+    """
+    seen = {test_case_dedupe_key(tc) for tc in test_cases}
+    received = list(test_cases)
+    added = []
+    for _ in range(app.config['GEMINI_CONTINUATION_ATTEMPTS']):
+        _count_parse_stat('continuations')
+        more, truncated = request_test_cases(model, build_continuation_prompt(prompt, received))
+        for tc in more:
+            key = test_case_dedupe_key(tc)
+            if key not in seen:
+                seen.add(key)
+                received.append(tc)
+                added.append(tc)
+        if not truncated or not more:
+            break
+    return added
+
+def generate_test_cases_with_gemini(requirement_text, section_title=None, numbered_sections=False):
+    """Use Gemini AI to generate test cases from requirements"""
+    try:
+        model = get_gemini_model()
+        prompt = build_generation_prompt(requirement_text, section_title, numbered_sections)
+        test_cases, truncated = request_test_cases(model, prompt)
+        if truncated and test_cases:
+            test_cases += continue_test_cases(model, prompt, test_cases)
+        return test_cases or None
+
+    except GeminiUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error generating test cases: {e}")
+        return None
+
+class IncrementalJSONArrayParser:
+    """Pull complete objects out of a JSON array while it is still being streamed.
+
+    ``feed`` takes the next fragment of the response text and returns every
+    top-level object that the fragment closed, already decoded. ``complete``
+    turns true once the array's closing bracket has been seen, so a stream
+    that ends without it was cut off.
+    """
+
+    def __init__(self):
+        self._object_chars = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.complete = False
+
+    def feed(self, fragment):
+        completed = []
+        for char in fragment:
+            if self._depth == 0:
+                # Between objects: skip the array brackets, commas and whitespace
+                if char == '{':
+                    self._depth = 1
+                    self._object_chars = [char]
+                elif char == ']':
+                    self.complete = True
+                continue
+
+            self._object_chars.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(decode_json_object(''.join(self._object_chars)))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed streamed test case: {e}")
+                    self._object_chars = []
+        return completed
+
+def stream_test_cases_with_gemini(requirement_text, section_title=None, numbered_sections=False):
+    """Yield test cases one by one as Gemini streams its JSON array back.
+
+    A stream that is cut off before the array closes is completed with
+    continuation requests (see continue_test_cases).
+    """
+    model = get_gemini_model()
+    prompt = build_generation_prompt(requirement_text, section_title, numbered_sections)
+    estimated_tokens = estimate_tokens(prompt) + SYSTEM_INSTRUCTION_TOKENS + app.config['LLM_RESPONSE_TOKEN_ESTIMATE']
+
+    def start_stream():
+        # Failures before the first chunk are retried by the scheduler; once
+        # test cases have been yielded the stream cannot be restarted
+        response = model.generate_content(prompt, stream=True)
+        chunks = iter(response)
+        return response, chunks, next(chunks, None)
+
+    started = time.perf_counter()
+    response, chunks, chunk = gemini_scheduler.call(start_stream, estimated_tokens)
+
+    # Only the time spent waiting for Gemini and parsing counts; the consumer
+    # saves each test case between chunks
+    gemini_seconds = time.perf_counter() - started
+    parse_seconds = 0.0
+    response_parts = []
+    streamed = []
+    parser = IncrementalJSONArrayParser()
+    while chunk is not None:
+        started = time.perf_counter()
+        response_parts.append(chunk.text)
+        test_cases = normalize_test_cases(parser.feed(chunk.text))
+        parse_seconds += time.perf_counter() - started
+        for tc in test_cases:
+            streamed.append(tc)
+            yield tc
+
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        gemini_seconds += time.perf_counter() - started
+
+    record_stage('gemini', gemini_seconds)
+    record_stage('parse', parse_seconds)
+    gemini_scheduler.settle(estimated_tokens, record_gemini_usage(response, prompt, ''.join(response_parts)))
+
+    if streamed and not parser.complete:
+        print(f"Streamed response was cut off after {len(streamed)} test cases, requesting the rest")
+        yield from continue_test_cases(model, prompt, streamed)
+
+def normalize_requirement_text(text):
+    """Normalize extracted text so that formatting-only differences share a cache entry"""
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def generation_cache_key(requirement_text, model_name=GEMINI_MODEL_NAME, prompt_version=PROMPT_VERSION, section_title=None):
+    """Content address of a generation: normalized text + model + prompt version"""
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_version, section_title or '', normalize_requirement_text(requirement_text)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _bump_cache_counter(cursor, name, amount=1):
+    cursor.execute('''
+        INSERT INTO generation_cache_stats (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+    ''', (name, amount))
+
+def get_cached_generation(cache_key):
+    """Return cached test cases for a cache key, or None on a miss"""
+    with transaction() as cursor:
+        cursor.execute('''
+            SELECT test_cases FROM generation_cache
+            WHERE cache_key = ? AND created_at >= datetime('now', ?)
+        ''', (cache_key, f"-{app.config['GENERATION_CACHE_MAX_AGE_DAYS']} days"))
+        row = cursor.fetchone()
+        if row is None:
+            _bump_cache_counter(cursor, 'misses')
+            return None
+
+        cursor.execute('''
+            UPDATE generation_cache
+            SET hit_count = hit_count + 1, last_accessed_at = CURRENT_TIMESTAMP
+            WHERE cache_key = ?
+        ''', (cache_key,))
+        _bump_cache_counter(cursor, 'hits')
+    return json.loads(row['test_cases'])
+
+def evict_generation_cache(cursor):
+    """Drop expired entries, then least recently used ones until under the size limits"""
+    cursor.execute(
+        "DELETE FROM generation_cache WHERE created_at < datetime('now', ?)",
+        (f"-{app.config['GENERATION_CACHE_MAX_AGE_DAYS']} days",)
+    )
+    evicted = cursor.rowcount
+
+    cursor.execute('SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM generation_cache')
+    entries, total_bytes = cursor.fetchone()
+    max_entries = app.config['GENERATION_CACHE_MAX_ENTRIES']
+    max_bytes = app.config['GENERATION_CACHE_MAX_BYTES']
+    if entries <= max_entries and total_bytes <= max_bytes:
+        return evicted
+
+    cursor.execute('SELECT cache_key, size_bytes FROM generation_cache ORDER BY last_accessed_at ASC')
+    stale_keys = []
+    for cache_key, size_bytes in cursor.fetchall():
+        if entries <= max_entries and total_bytes <= max_bytes:
+            break
+        stale_keys.append((cache_key,))
+        entries -= 1
+        total_bytes -= size_bytes
+    cursor.executemany('DELETE FROM generation_cache WHERE cache_key = ?', stale_keys)
+    return evicted + len(stale_keys)
+
+def store_cached_generation(cache_key, test_cases):
+    """Persist a successful generation and enforce the cache limits"""
+    payload = json.dumps(test_cases)
+    with transaction() as cursor:
+        cursor.execute('''
+            INSERT OR REPLACE INTO generation_cache
+            (cache_key, model, prompt_version, test_cases, size_bytes)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (cache_key, GEMINI_MODEL_NAME, PROMPT_VERSION, payload, len(payload.encode('utf-8'))))
+        evicted = evict_generation_cache(cursor)
+        if evicted:
+            _bump_cache_counter(cursor, 'evictions', evicted)
+
+def generate_test_cases_cached(requirement_text, force_regenerate=False, section_title=None, numbered_sections=False):
+    """Generate test cases, serving repeated documents from the generation cache.
+
+    Returns a ``(test_cases, cache_hit)`` tuple.
+    """
+    if not app.config['GENERATION_CACHE_ENABLED']:
+        return generate_test_cases_with_gemini(requirement_text, section_title, numbered_sections), False
+
+    cache_key = generation_cache_key(requirement_text, section_title=section_title)
+    if not force_regenerate:
+        try:
+            with timed_stage('cache_lookup'):
+                cached = get_cached_generation(cache_key)
+            if cached is not None:
+                return cached, True
+        except sqlite3.Error as e:
+            print(f"Generation cache lookup failed: {e}")
+
+    test_cases = generate_test_cases_with_gemini(requirement_text, section_title, numbered_sections)
+    if test_cases:
+        try:
+            store_cached_generation(cache_key, test_cases)
+        except sqlite3.Error as e:
+            print(f"Generation cache store failed: {e}")
+    return test_cases, False
+
+def stream_test_cases_cached(requirement_text, force_regenerate=False, section_title=None, numbered_sections=False):
+    """Streaming counterpart of generate_test_cases_cached.
+
+    Cache hits are replayed immediately; fresh generations are cached once
+    the stream has finished.
+    """
+    use_cache = app.config['GENERATION_CACHE_ENABLED']
+    cache_key = generation_cache_key(requirement_text, section_title=section_title) if use_cache else None
+
+    if use_cache and not force_regenerate:
+        try:
+            with timed_stage('cache_lookup'):
+                cached = get_cached_generation(cache_key)
+            if cached is not None:
+                yield from cached
+                return
+        except sqlite3.Error as e:
+            print(f"Generation cache lookup failed: {e}")
+
+    test_cases = []
+    for tc in stream_test_cases_with_gemini(requirement_text, section_title, numbered_sections):
+        test_cases.append(tc)
+        yield tc
+
+    if use_cache and test_cases:
+        try:
+            store_cached_generation(cache_key, test_cases)
+        except sqlite3.Error as e:
+            print(f"Generation cache store failed: {e}")
+
+HEADING_PATTERN = re.compile(
+    r'^(?:#{1,6}\s+\S.*'                         # Markdown headings: "## Login"
+    r'|(?:\d+\.)*\d+\.?\s+[A-Z][^.!?:;]{0,80}'    # Numbered headings: "3.2 User Login"
+    r'|[A-Z][A-Z0-9 &/,()\-]{3,80})$'              # ALL CAPS headings: "USER MANAGEMENT"
+)
+
+def split_requirement_sections(text):
+    """Split text into ``(title, body)`` sections at heading lines"""
+    sections = []
+    title, lines = None, []
+    for line in text.split('\n'):
+        candidate = line.strip(PAGE_BREAK + ' \t')
+        is_heading = bool(candidate) and HEADING_PATTERN.match(candidate) is not None
+        if is_heading and any(l.strip() for l in lines):
+            sections.append((title, '\n'.join(lines)))
+            title, lines = None, []
+        if title is None and candidate:
+            title = candidate[:100]
+        lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((title, '\n'.join(lines)))
+    return sections
+
+def _split_oversized_section(body, token_budget, separators=(PAGE_BREAK, '\n\n', '\n')):
+    """Break a section that exceeds the budget at pages, then paragraphs, then lines"""
+    if estimate_tokens(body) <= token_budget:
+        return [body]
+
+    for position, separator in enumerate(separators):
+        parts = [part for part in body.split(separator) if part.strip()]
+        if len(parts) < 2:
+            continue
+
+        finer_separators = separators[position + 1:]
+        pieces, current = [], ''
+        for part in parts:
+            candidate = current + separator + part if current else part
+            if estimate_tokens(candidate) <= token_budget:
+                current = candidate
+            elif estimate_tokens(part) > token_budget:
+                # Keep the preceding text (e.g. the heading) with the oversized part
+                pieces.extend(_split_oversized_section(candidate, token_budget, finer_separators))
+                current = ''
+            else:
+                pieces.append(current)
+                current = part
+        if current:
+            pieces.append(current)
+        return pieces
+
+    max_chars = token_budget * 4
+    return [body[i:i + max_chars] for i in range(0, len(body), max_chars)]
+
+def split_requirement_text(text, token_budget):
+    """Split a document into chunks under ``token_budget`` along headings or page boundaries.
+
+    Returns a list of ``{'index', 'title', 'text'}`` dicts in document order.
+    """
+    pieces = []
+    for title, body in split_requirement_sections(text):
+        parts = _split_oversized_section(body, token_budget)
+        for part_number, part in enumerate(parts, 1):
+            part_title = title or 'Untitled section'
+            if len(parts) > 1:
+                part_title = f'{part_title} (part {part_number})'
+            pieces.append((part_title, part))
+
+    # Pack consecutive small sections together so chunks use the budget well
+    chunks = []
+    for title, body in pieces:
+        if chunks and estimate_tokens(chunks[-1]['text'] + '\n' + body) <= token_budget:
+            chunks[-1]['text'] += '\n' + body
+            chunks[-1]['sections'] += 1
+        else:
+            chunks.append({'title': title, 'text': body, 'sections': 1})
+
+    for index, chunk in enumerate(chunks, 1):
+        chunk['index'] = index
+        if chunk.pop('sections') > 1:
+            chunk['title'] += ' (and following sections)'
+    return chunks
+
+def test_case_dedupe_key(test_case):
+    """Key under which two generated test cases count as the same case"""
+    name = str(test_case.get('test_case_name', '')).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', name).strip()
+
+def generate_test_cases_chunked(requirement_text, force_regenerate=False):
+    """Map-reduce generation: generate per chunk concurrently, then merge and dedupe.
+
+    Returns a ``(test_cases, cache_hit, chunk_count)`` tuple; every test case
+    carries a ``source_section`` naming the chunk it was generated from.
+    """
+    chunks = split_requirement_text(requirement_text, app.config['CHUNK_TOKEN_BUDGET'])
+    if not chunks:
+        return None, False, 0
+
+    def generate_chunk(chunk):
+        return generate_test_cases_cached(
+            chunk['text'],
+            force_regenerate=force_regenerate,
+            section_title=chunk['title']
+        )
+
+    max_workers = max(1, min(app.config['CHUNK_CONCURRENCY'], len(chunks)))
+    # Each chunk runs in a copy of the caller's context, so its Gemini calls
+    # keep the caller's scheduler queue (see llm_caller)
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chunk-generation') as executor:
+        futures = [executor.submit(context.copy().run, generate_chunk, chunk) for chunk in chunks]
+        results = [future.result() for future in futures]
+
+    merged = []
+    seen = set()
+    failed_chunks = 0
+    for chunk, (chunk_cases, _) in zip(chunks, results):
+        if not chunk_cases:
+            failed_chunks += 1
+            print(f"No test cases generated for chunk {chunk['index']}: {chunk['title']}")
+            continue
+        for tc in chunk_cases:
+            key = test_case_dedupe_key(tc)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append({**tc, 'source_section': f"Chunk {chunk['index']}/{len(chunks)}: {chunk['title']}"})
+
+    if failed_chunks:
+        print(f"{failed_chunks} of {len(chunks)} chunks failed to generate test cases")
+
+    cache_hit = all(hit for _, hit in results)
+    return merged or None, cache_hit, len(chunks)
+
+def split_requirement_units(text, token_budget=None, min_tokens=None):
+    """Split a document into the sections that incremental regeneration tracks.
+
+    Each unit is a heading section (oversized ones split like chunks) plus any
+    following sections under ``min_tokens``. Units are keyed by a hash of their
+    normalized text, so editing one section leaves every other key unchanged.
+    Returns a list of ``{'key', 'title', 'text'}`` dicts in document order.
+    """
+    if token_budget is None:
+        token_budget = app.config['CHUNK_TOKEN_BUDGET']
+    if min_tokens is None:
+        min_tokens = app.config['INCREMENTAL_MIN_SECTION_TOKENS']
+
+    units = []
+    for title, body in split_requirement_sections(text):
+        parts = _split_oversized_section(body, token_budget)
+        for part_number, part in enumerate(parts, 1):
+            part_title = title or 'Untitled section'
+            if len(parts) > 1:
+                part_title = f'{part_title} (part {part_number})'
+            # Only the size of the small section itself decides the merge, so
+            # an edit elsewhere in the document cannot move this boundary
+            if (units and estimate_tokens(part) < min_tokens
+                    and estimate_tokens(units[-1]['text'] + '\n' + part) <= token_budget):
+                units[-1]['text'] += '\n' + part
+            else:
+                units.append({'title': part_title, 'text': part})
+
+    occurrences = {}
+    for unit in units:
+        key = hashlib.sha256(normalize_requirement_text(unit['text']).encode('utf-8')).hexdigest()
+        # Repeated boilerplate sections still need distinct keys
+        occurrences[key] = occurrences.get(key, 0) + 1
+        unit['key'] = key if occurrences[key] == 1 else f'{key}:{occurrences[key]}'
+    return units
+
+def describe_document(upload, file_extension, extracted_text):
+    """Size, SHA-256 and page count of a SpooledUpload, for its documents row"""
+    return {
+        'file_type': file_extension,
+        'size_bytes': upload.size,
+        'content_hash': upload.content_hash,
+        # Only PDF text carries page breaks (one after every page)
+        'page_count': extracted_text.count(PAGE_BREAK) if file_extension == 'pdf' else None,
+    }
+
+def save_document(cursor, filename, document, requirement_text):
+    """Create or refresh the documents row of an upload and return its ID.
+
+    ``document`` comes from describe_document; ``requirement_text`` is the
+    compacted text that generation used. Recorded sections are left alone.
+    """
+    cursor.execute('''
+        INSERT INTO documents (filename, file_type, size_bytes, content_hash, page_count, requirement_text)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (filename) DO UPDATE SET
+            file_type = excluded.file_type, size_bytes = excluded.size_bytes,
+            content_hash = excluded.content_hash, page_count = excluded.page_count,
+            requirement_text = excluded.requirement_text, updated_at = CURRENT_TIMESTAMP
+    ''', (filename, document['file_type'], document['size_bytes'], document['content_hash'],
+          document['page_count'], requirement_text))
+    return cursor.execute('SELECT id FROM documents WHERE filename = ?', (filename,)).fetchone()[0]
+
+def load_requirement_snapshot(cursor, filename):
+    """Sections recorded for the last upload of ``filename``, or None if there is none"""
+    row = cursor.execute('SELECT sections FROM documents WHERE filename = ?', (filename,)).fetchone()
+    return json.loads(row['sections']) if row and row['sections'] else None
+
+def save_requirement_snapshot(cursor, document_id, units):
+    """Record the sections generated from the latest upload of a document, with their batches"""
+    sections = [{'key': unit['key'], 'title': unit['title'], 'batch': unit['batch']} for unit in units]
+    cursor.execute('UPDATE documents SET sections = ? WHERE id = ?', (json.dumps(sections), document_id))
+
+def plan_incremental_generation(filename, requirement_text, force_regenerate=False):
+    """Diff a new upload of ``filename`` against the snapshot of the previous one.
+
+    Test cases are tied to the section they were generated from, so only
+    added and changed sections are generated again. Cases that Gemini did
+    not place in a section are tied to their whole batch (see
+    tag_batch_test_case) and are kept only while every section of that
+    batch is unchanged. Returns ``{'units', 'unchanged', 'changed',
+    'kept_keys', 'removed'}``: every unit of the new text, the units whose
+    test cases are kept (with their ``batch``), the units to generate, the
+    section and batch keys whose test cases are kept and the number of
+    previous sections that no longer exist. With ``force_regenerate`` every
+    unit counts as changed.
+    """
+    units = split_requirement_units(requirement_text)
+    previous = None if force_regenerate else load_requirement_snapshot(get_db(), filename)
+    batches = {}
+    for section in previous or []:
+        # Snapshots from before batching recorded one batch per section
+        batches.setdefault(section.get('batch', section['key']), set()).add(section['key'])
+    previous_keys = set().union(*batches.values())
+    current_keys = {unit['key'] for unit in units}
+    kept_batches = {batch for batch, keys in batches.items() if keys <= current_keys}
+    unit_batches = {key: batch for batch, keys in batches.items() for key in keys}
+
+    for unit in units:
+        if unit['key'] in previous_keys:
+            batch = unit_batches[unit['key']]
+            # The batch-wide cases of a broken-up batch are deleted, so the
+            # section stands on its own from now on
+            unit['batch'] = batch if batch in kept_batches else unit['key']
+    return {
+        'units': units,
+        'unchanged': [unit for unit in units if 'batch' in unit],
+        'changed': [unit for unit in units if 'batch' not in unit],
+        'kept_keys': sorted((previous_keys & current_keys) | kept_batches),
+        'removed': len(previous_keys - current_keys),
+    }
+
+def group_generation_batches(plan, chunked=False):
+    """Group the changed units of a plan into batches, one Gemini call each.
+
+    Like non-incremental generation, the changed text goes out in a single
+    call unless it is above CHUNK_AUTO_THRESHOLD_TOKENS or ``chunked`` is set,
+    in which case consecutive units are packed up to CHUNK_TOKEN_BUDGET. The
+    units of a batch with several are numbered with SECTION_MARKER lines.
+    Each batch gets a ``key`` (that of its unit when it has only one) and a
+    ``title`` for the prompt, None when it covers the whole document.
+    """
+    units = plan['changed']
+    if not units:
+        return []
+    budget = None
+    if chunked or sum(estimate_tokens(unit['text']) for unit in units) > app.config['CHUNK_AUTO_THRESHOLD_TOKENS']:
+        budget = app.config['CHUNK_TOKEN_BUDGET']
+
+    batches = []
+    for unit in units:
+        if batches and (budget is None or estimate_tokens(batches[-1]['text'] + '\n' + unit['text']) <= budget):
+            batches[-1]['units'].append(unit)
+            batches[-1]['text'] += '\n' + unit['text']
+        else:
+            batches.append({'units': [unit], 'text': unit['text']})
+
+    for batch in batches:
+        keys = [unit['key'] for unit in batch['units']]
+        titles = [unit['title'] for unit in batch['units']]
+        batch['key'] = keys[0] if len(keys) == 1 else hashlib.sha256('\n'.join(keys).encode('utf-8')).hexdigest()
+        if len(batch['units']) == len(plan['units']):
+            batch['title'] = None
+        else:
+            batch['title'] = titles[0] if len(titles) == 1 else f'{titles[0]} to {titles[-1]}'
+        batch['numbered'] = len(batch['units']) > 1
+        if batch['numbered']:
+            batch['text'] = '\n'.join(
+                f"{SECTION_MARKER.format(number=number)}\n{unit['text']}"
+                for number, unit in enumerate(batch['units'], 1)
+            )
+    return batches
+
+def tag_batch_test_case(batch, test_case):
+    """Attach the section a test case was generated from.
+
+    In a numbered batch Gemini names the section of every case; a case
+    without a usable section number is tied to the whole batch instead.
+    """
+    test_case = dict(test_case)
+    number = test_case.pop('section', None)
+    if batch['numbered'] and not isinstance(number, bool):
+        match = re.search(r'\d+', str(number)) if number is not None else None
+        if match and 1 <= int(match.group()) <= len(batch['units']):
+            unit = batch['units'][int(match.group()) - 1]
+            return {**test_case, 'source_section': unit['title'], 'section_key': unit['key']}
+    return {**test_case, 'source_section': batch['title'], 'section_key': batch['key']}
+
+def mark_batch_generated(batch, generated_units):
+    """Record that ``batch`` produced test cases, so its units enter the snapshot"""
+    for unit in batch['units']:
+        unit['batch'] = batch['key']
+        generated_units.append(unit)
+
+def generate_test_cases_for_batches(batches, force_regenerate=False):
+    """Generate test cases for each batch of changed units concurrently.
+
+    Returns a ``(test_cases, cache_hit, generated_units)`` tuple, where
+    ``generated_units`` are the units of the batches that produced test cases.
+    """
+    if not batches:
+        return [], False, []
+
+    def generate_batch(batch):
+        return generate_test_cases_cached(batch['text'], force_regenerate=force_regenerate, section_title=batch['title'],
+                                          numbered_sections=batch['numbered'])
+
+    max_workers = max(1, min(app.config['CHUNK_CONCURRENCY'], len(batches)))
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='section-generation') as executor:
+        futures = [executor.submit(context.copy().run, generate_batch, batch) for batch in batches]
+        results = [future.result() for future in futures]
+
+    test_cases = []
+    generated_units = []
+    seen = set()
+    for batch, (batch_cases, _) in zip(batches, results):
+        if not batch_cases:
+            print(f"No test cases generated for section: {batch['title'] or 'whole document'}")
+            continue
+        mark_batch_generated(batch, generated_units)
+        for tc in batch_cases:
+            key = test_case_dedupe_key(tc)
+            if key in seen:
+                continue
+            seen.add(key)
+            test_cases.append(tag_batch_test_case(batch, tc))
+
+    cache_hit = all(hit for _, hit in results)
+    return test_cases, cache_hit, generated_units
+
+def delete_replaced_test_cases(cursor, document_id, plan=None):
+    """Delete the stored test cases of a document that a new upload replaces.
+
+    With an incremental ``plan`` the cases of kept sections and batches are
+    kept, and so is every case edited with PUT or PATCH; everything else of
+    the document is deleted, including cases stored before sections were
+    tracked. Without a plan every case of the document goes, together with
+    its recorded sections. Returns the deleted count.
+    """
+    if plan is None:
+        cursor.execute('UPDATE documents SET sections = NULL WHERE id = ?', (document_id,))
+        cursor.execute('DELETE FROM test_cases WHERE document_id = ?', (document_id,))
+    else:
+        kept_keys = plan['kept_keys']
+        placeholders = ', '.join('?' * len(kept_keys))
+        cursor.execute(
+            f'''DELETE FROM test_cases
+                WHERE document_id = ? AND edited_at IS NULL
+                  AND (section_key IS NULL OR section_key NOT IN ({placeholders}))''',
+            [document_id, *kept_keys]
+        )
+    deleted_count = cursor.rowcount
+    prune_tombstones(cursor)
+    return deleted_count
+
+def incremental_summary(plan, generated_units):
+    """Section counts of an incremental upload, for the API response"""
+    return {
+        'total': len(plan['units']),
+        'unchanged': len(plan['unchanged']),
+        'regenerated': len(generated_units),
+        'failed': len(plan['changed']) - len(generated_units),
+        'removed': plan['removed'],
+    }
+
+def finish_incremental_update(cursor, document_id, plan, generated_units):
+    """Save the snapshot of an incremental upload and return how many test cases it kept.
+
+    Sections that failed to generate are left out of the snapshot, so the
+    next upload of the file retries them.
+    """
+    recorded_keys = {unit['key'] for unit in plan['unchanged'] + generated_units}
+    save_requirement_snapshot(cursor, document_id, [unit for unit in plan['units'] if unit['key'] in recorded_keys])
+
+    kept_keys = plan['kept_keys']
+    placeholders = ', '.join('?' * len(kept_keys))
+    return cursor.execute(
+        f'''SELECT COUNT(*) FROM test_cases
+            WHERE document_id = ? AND (edited_at IS NOT NULL OR section_key IN ({placeholders}))''',
+        [document_id, *kept_keys]
+    ).fetchone()[0]
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def ensure_app_ready():
+    # `flask run` and servers pointed at app:app skip create_app()
+    if not _app_ready:
+        create_app()
+    start_storage_janitor()
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe the request duration and add the Server-Timing header when enabled"""
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    REQUEST_DURATION.observe(elapsed, current_route(), request.method, str(response.status_code))
+
+    if app.config['SERVER_TIMING_ENABLED']:
+        # Streamed responses only include what finished before the headers were sent
+        entries = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in g.get('stage_timings', [])]
+        if g.get('db_queries'):
+            entries.append(f'db;dur={g.db_seconds * 1000:.1f};desc="{g.db_queries} queries"')
+        entries.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+# The document is looked up by filename, so it must exist first
+DOCUMENT_ENSURE_SQL = 'INSERT OR IGNORE INTO documents (filename) VALUES (?)'
+TEST_CASE_INSERT_SQL = '''
+    INSERT INTO test_cases 
+    (document_id, test_case_name, description, preconditions, test_steps, expected_result, priority_id, test_type_id, source_section, section_key)
+    VALUES ((SELECT id FROM documents WHERE filename = ?), ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def prepare_test_case(filename, tc):
+    """Normalize a generated test case into its INSERT parameters and saved form"""
+    # Handle list fields if Gemini returns them as arrays
+    test_steps = tc.get('test_steps', '')
+    if isinstance(test_steps, list):
+        test_steps = '\n'.join(test_steps)
+
+    preconditions = tc.get('preconditions', '')
+    if isinstance(preconditions, list):
+        preconditions = '\n'.join(preconditions)
+
+    params = (
+        filename,
+        tc.get('test_case_name', ''),
+        tc.get('description', ''),
+        preconditions,
+        test_steps,
+        tc.get('expected_result', ''),
+        PRIORITY_IDS.get(tc.get('priority'), PRIORITY_IDS['Medium']),
+        TEST_TYPE_IDS.get(tc.get('test_type'), TEST_TYPE_IDS['Functional']),
+        tc.get('source_section'),
+        tc.get('section_key')
+    )
+    saved = {
+        'requirement_file': filename,
+        **tc,
+        'preconditions': preconditions,
+        'test_steps': test_steps
+    }
+    return params, saved
+
+def insert_test_case(cursor, filename, tc):
+    """Insert one generated test case and return it as saved, with its new ID"""
+    params, saved = prepare_test_case(filename, tc)
+    cursor.execute(DOCUMENT_ENSURE_SQL, (filename,))
+    cursor.execute(TEST_CASE_INSERT_SQL, params)
+    saved = {'id': cursor.lastrowid, **saved}
+    index_test_case_signatures(cursor, [saved])
+    return saved
+
+def insert_test_cases(cursor, filename, test_cases):
+    """Bulk insert generated test cases with executemany and return them with their IDs.
+
+    Must run inside transaction(): the write lock guarantees that the rows
+    above the previous maximum ID are exactly the ones inserted here.
+    """
+    prepared = [prepare_test_case(filename, tc) for tc in test_cases]
+    cursor.execute(DOCUMENT_ENSURE_SQL, (filename,))
+    last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM test_cases').fetchone()[0]
+    cursor.executemany(TEST_CASE_INSERT_SQL, [params for params, _ in prepared])
+    new_ids = [row[0] for row in cursor.execute('SELECT id FROM test_cases WHERE id > ? ORDER BY id', (last_id,))]
+    saved_test_cases = [{'id': test_case_id, **saved} for test_case_id, (_, saved) in zip(new_ids, prepared)]
+    index_test_case_signatures(cursor, saved_test_cases)
+    return saved_test_cases
+
+def find_stored_duplicate(cursor, signature, buckets, threshold):
+    """Most similar stored test case sharing an LSH bucket with ``signature``, if similar enough"""
+    band_clauses = ' OR '.join(['(l.band = ? AND l.bucket = ?)'] * len(buckets))
+    candidates = cursor.execute(
+        f'''SELECT DISTINCT t.id, t.test_case_name, t.requirement_file, s.signature
+            FROM test_case_lsh l
+            JOIN test_case_signatures s ON s.test_case_id = l.test_case_id
+            JOIN test_case_details t ON t.id = l.test_case_id
+            WHERE {band_clauses}''',
+        [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+    ).fetchall()
+    best = None
+    for row in candidates:
+        similarity = signature_similarity(signature, load_signature(row['signature']))
+        if similarity >= threshold and (best is None or similarity > best[0]):
+            best = (similarity, {'id': row['id'], 'test_case_name': row['test_case_name'],
+                                 'requirement_file': row['requirement_file']})
+    return best
+
+def split_duplicate_test_cases(cursor, test_cases, threshold=None):
+    """Separate near-duplicates from the test cases about to be inserted.
+
+    Each case is compared with the earlier cases of the same batch and with
+    the stored ones. Returns ``(unique, duplicates)``; every duplicate names
+    the case it matched in ``duplicate_of`` (stored cases include their ``id``).
+    """
+    if threshold is None:
+        threshold = app.config['DEDUP_THRESHOLD']
+    unique, duplicates = [], []
+    batch_buckets = {}
+    for tc in test_cases:
+        signature = minhash_signature(tc)
+        buckets = lsh_buckets(signature)
+
+        match = find_stored_duplicate(cursor, signature, buckets, threshold)
+        candidates = {index for key in enumerate(buckets) for index in batch_buckets.get(key, ())}
+        for index in candidates:
+            similarity = signature_similarity(signature, unique[index][1])
+            if similarity >= threshold and (match is None or similarity > match[0]):
+                match = (similarity, {'test_case_name': unique[index][0].get('test_case_name')})
+
+        if match:
+            duplicates.append({
+                'test_case_name': tc.get('test_case_name'),
+                'similarity': round(match[0], 3),
+                'duplicate_of': match[1]
             })
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'message': f'Successfully generated {len(saved_test_cases)} test cases for {filename}',
-            'filename': filename,
-            'test_cases': saved_test_cases,
-            'replaced': deleted_count > 0
-        }), 200
+            continue
+        for key in enumerate(buckets):
+            batch_buckets.setdefault(key, []).append(len(unique))
+        unique.append((tc, signature))
+    return [tc for tc, _ in unique], duplicates
+
+class UploadError(Exception):
+    """Upload processing failure that maps to an HTTP error response"""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+def process_requirement_file(filename, upload, force_regenerate=False, chunked=False, on_stage=None):
+    """Extract text from a SpooledUpload, generate test cases and store them.
+
+    With INCREMENTAL_REGENERATION the document is generated section by
+    section and a re-upload only regenerates the sections that changed.
+    Otherwise documents above CHUNK_AUTO_THRESHOLD_TOKENS (or any document
+    when ``chunked`` is set) are generated chunk by chunk. ``on_stage`` is called
+    with the name of each stage as it starts so that background jobs can
+    report progress. Raises UploadError on failure.
+    """
+    def enter_stage(stage):
+        if on_stage:
+            on_stage(stage)
+
+    # Extract text from file
+    enter_stage('extracting')
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    with timed_stage('extract'):
+        requirement_text = extract_text_from_file(upload, file_extension)
+
+    if not requirement_text:
+        raise UploadError('Failed to extract text from file')
+    document = describe_document(upload, file_extension, requirement_text)
+
+    # Strip page furniture and enforce the token budget before any Gemini call
+    requirement_text, token_report = prepare_requirement_text(filename, requirement_text)
+    if not requirement_text:
+        raise UploadError('Failed to extract text from file')
+
+    # Generate test cases using Gemini AI (re-uploads are served from the cache)
+    enter_stage('generating')
+    plan = None
+    try:
+        # Gemini calls for this file share one fair-queueing slot in the scheduler
+        with llm_caller(filename):
+            if app.config['INCREMENTAL_REGENERATION']:
+                plan = plan_incremental_generation(filename, requirement_text, force_regenerate)
+                batches = group_generation_batches(plan, chunked)
+                test_cases, cache_hit, generated_units = generate_test_cases_for_batches(
+                    batches,
+                    force_regenerate=force_regenerate
+                )
+                chunk_count = len(batches)
+            elif chunked or estimate_tokens(requirement_text) > app.config['CHUNK_AUTO_THRESHOLD_TOKENS']:
+                test_cases, cache_hit, chunk_count = generate_test_cases_chunked(
+                    requirement_text,
+                    force_regenerate=force_regenerate
+                )
+            else:
+                test_cases, cache_hit = generate_test_cases_cached(requirement_text, force_regenerate=force_regenerate)
+                chunk_count = 1
+    except GeminiUnavailableError as e:
+        raise UploadError(str(e), 503)
+
+    # An unchanged re-upload has nothing to generate, which is not a failure
+    if not test_cases and (plan is None or plan['changed']):
+        raise UploadError('Failed to generate test cases')
+
+    enter_stage('saving')
+    kept_count = 0
+    with transaction() as cursor:
+        # DELETE PREVIOUS TEST CASES FOR THIS FILE (except those of unchanged sections)
+        document_id = save_document(cursor, filename, document, requirement_text)
+        deleted_count = delete_replaced_test_cases(cursor, document_id, plan)
+
+        # Drop near-duplicates of each other and of the test cases already stored
+        duplicates = []
+        if app.config['DEDUP_ENABLED']:
+            with timed_stage('dedupe'):
+                test_cases, duplicates = split_duplicate_test_cases(cursor, test_cases)
+
+        # Save new test cases to database in one batch
+        with timed_stage('insert'):
+            saved_test_cases = insert_test_cases(cursor, filename, test_cases)
+
+        if plan is not None:
+            kept_count = finish_incremental_update(cursor, document_id, plan, generated_units)
+
+    if deleted_count > 0:
+        print(f"Deleted {deleted_count} previous test cases for file: {filename}")
+    if duplicates:
+        print(f"Skipped {len(duplicates)} near-duplicate test cases for file: {filename}")
+
+    message = f'Successfully generated {len(saved_test_cases)} test cases for {filename}'
+    if kept_count:
+        message += f' (kept {kept_count} from unchanged sections)'
+    result = {
+        'message': message,
+        'filename': filename,
+        'test_cases': saved_test_cases,
+        'replaced': deleted_count > 0,
+        'cached': cache_hit,
+        'chunks': chunk_count,
+        'duplicates_skipped': len(duplicates),
+        'duplicates': duplicates,
+        'kept': kept_count,
+        'tokens': token_report
+    }
+    if plan is not None:
+        result['sections'] = incremental_summary(plan, generated_units)
+    return result
+
+# Background upload jobs. Job state lives in the database so that any worker
+# process can answer /jobs/<id>, while the work itself runs on a bounded
+# thread pool inside the process that accepted the upload.
+JOB_FINISHED_STATUSES = ('completed', 'failed')
+
+_job_executor = None
+_job_slots = None
+_job_executor_lock = threading.Lock()
+
+def get_job_executor():
+    """Lazily create the upload job worker pool and its queue slots"""
+    global _job_executor, _job_slots
+    with _job_executor_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(
+                max_workers=app.config['JOB_WORKERS'],
+                thread_name_prefix='upload-job'
+            )
+            _job_slots = threading.BoundedSemaphore(app.config['JOB_WORKERS'] + app.config['JOB_QUEUE_SIZE'])
+        return _job_executor, _job_slots
+
+def update_job(job_id, **fields):
+    """Persist job status fields and bump updated_at"""
+    columns = ', '.join(f'{name} = ?' for name in fields)
+    with transaction() as cursor:
+        cursor.execute(
+            f'UPDATE upload_jobs SET {columns}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+            (*fields.values(), job_id)
+        )
+
+def get_job(job_id):
+    """Load a job as a JSON-serializable dict, or None if it does not exist"""
+    row = get_db().execute('SELECT * FROM upload_jobs WHERE id = ?', (job_id,)).fetchone()
+
+    if row is None:
+        return None
+
+    return {
+        'job_id': row['id'],
+        'filename': row['filename'],
+        'status': row['status'],
+        'stage': row['stage'],
+        'error': row['error'],
+        'result': json.loads(row['result']) if row['result'] else None,
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at']
+    }
+
+def run_upload_job(job_id, filename, upload, force_regenerate, chunked):
+    """Worker entry point: run the upload pipeline and record each stage"""
+    try:
+        update_job(job_id, status='running')
+        result = process_requirement_file(
+            filename,
+            upload,
+            force_regenerate=force_regenerate,
+            chunked=chunked,
+            on_stage=lambda stage: update_job(job_id, stage=stage)
+        )
+        update_job(job_id, status='completed', stage='done', result=json.dumps(result))
+    except Exception as e:
+        print(f"Error processing job {job_id}: {e}")
+        update_job(job_id, status='failed', error=str(e))
+    finally:
+        upload.close()
+
+def submit_upload_job(filename, upload, force_regenerate=False, chunked=False):
+    """Queue a SpooledUpload for background processing and return the job ID.
+
+    The job takes the upload over and closes it when done.
+    """
+    executor, slots = get_job_executor()
+    if not slots.acquire(blocking=False):
+        raise UploadError('Upload queue is full, please retry shortly', 503)
+
+    job_id = uuid.uuid4().hex
+    with transaction() as cursor:
+        cursor.execute(
+            "DELETE FROM upload_jobs WHERE updated_at < datetime('now', ?)",
+            (f"-{app.config['JOB_RETENTION_HOURS']} hours",)
+        )
+        cursor.execute(
+            "INSERT INTO upload_jobs (id, filename, status, stage) VALUES (?, ?, 'queued', 'queued')",
+            (job_id, filename)
+        )
+
+    future = executor.submit(run_upload_job, job_id, filename, upload, force_regenerate, chunked)
+    future.add_done_callback(lambda _: slots.release())
+    return job_id
+
+@app.route('/upload', methods=['POST'])
+def upload_file():
+    """Handle file upload and generate test cases.
+
+    With ``async=1`` the upload is queued as a background job and the
+    response (202) only carries the job ID and its status URLs.
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type. Only PDF, DOCX, and TXT files are allowed'}), 400
     
+    upload = None
+    try:
+        filename = secure_filename(file.filename)
+        upload = read_upload(file)
+
+        force_regenerate = request_flag('force_regenerate')
+        chunked = request_flag('chunked')
+
+        if request_flag('async'):
+            job_id = submit_upload_job(filename, upload, force_regenerate, chunked)
+            upload = None  # Closed by the job
+            return jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'filename': filename,
+                'status_url': url_for('get_job_status', job_id=job_id),
+                'events_url': url_for('stream_job_events', job_id=job_id)
+            }), 202
+
+        result = process_requirement_file(filename, upload, force_regenerate=force_regenerate, chunked=chunked)
+        return jsonify(result), 200
+    
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         print(f"Error processing file: {e}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        if upload is not None:
+            upload.close()
+
+@app.route('/upload/stream', methods=['POST'])
+def upload_file_stream():
+    """Handle file upload and stream test cases back as NDJSON while they are generated.
+
+    Each line is a JSON event: ``stage`` while extracting/generating,
+    ``sections`` with the incremental diff against the previous upload,
+    ``test_case`` for every saved test case, then ``completed`` or ``error``.
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type. Only PDF, DOCX, and TXT files are allowed'}), 400
+
+    filename = secure_filename(file.filename)
+    upload = read_upload(file)
+    force_regenerate = request_flag('force_regenerate')
+    chunked = request_flag('chunked')
+
+    def event(name, **payload):
+        return json.dumps({'event': name, **payload}) + '\n'
+
+    def events():
+        # Gemini calls for this upload share one fair-queueing slot in the scheduler
+        try:
+            with llm_caller(filename):
+                yield from upload_events()
+        finally:
+            upload.close()
+
+    def upload_events():
+        yield event('stage', stage='extracting', filename=filename)
+        file_extension = filename.rsplit('.', 1)[1].lower()
+        with timed_stage('extract'):
+            requirement_text = extract_text_from_file(upload, file_extension)
+        if not requirement_text:
+            yield event('error', error='Failed to extract text from file')
+            return
+        document = describe_document(upload, file_extension, requirement_text)
+        try:
+            requirement_text, token_report = prepare_requirement_text(filename, requirement_text)
+        except UploadError as e:
+            yield event('error', error=str(e))
+            return
+        if not requirement_text:
+            yield event('error', error='Failed to extract text from file')
+            return
+
+        yield event('stage', stage='generating', filename=filename)
+        plan = None
+        generated_units = []
+        if app.config['INCREMENTAL_REGENERATION']:
+            plan = plan_incremental_generation(filename, requirement_text, force_regenerate)
+            yield event('sections', filename=filename, total=len(plan['units']), unchanged=len(plan['unchanged']),
+                        changed=len(plan['changed']), removed=plan['removed'])
+
+            def stream_changed_batches():
+                # One streamed generation per batch of changed sections, in document order
+                for batch in group_generation_batches(plan, chunked):
+                    produced = False
+                    for tc in stream_test_cases_cached(batch['text'], force_regenerate, section_title=batch['title'],
+                                                       numbered_sections=batch['numbered']):
+                        produced = True
+                        yield tag_batch_test_case(batch, tc)
+                    if produced:
+                        mark_batch_generated(batch, generated_units)
+
+            test_cases = stream_changed_batches()
+        elif chunked or estimate_tokens(requirement_text) > app.config['CHUNK_AUTO_THRESHOLD_TOKENS']:
+            # Too large for one prompt: fall back to map-reduce generation
+            try:
+                test_cases, _, _ = generate_test_cases_chunked(requirement_text, force_regenerate=force_regenerate)
+            except GeminiUnavailableError as e:
+                yield event('error', error=str(e))
+                return
+            test_cases = iter(test_cases or [])
+        else:
+            test_cases = stream_test_cases_cached(requirement_text, force_regenerate=force_regenerate)
+
+        saved_count = 0
+        deleted_count = None
+        duplicate_count = 0
+        try:
+            for tc in test_cases:
+                # Commit each case as it arrives so other readers see it immediately
+                with transaction() as cursor:
+                    if deleted_count is None:
+                        # Only replace the previous test cases once the new ones start arriving
+                        document_id = save_document(cursor, filename, document, requirement_text)
+                        deleted_count = delete_replaced_test_cases(cursor, document_id, plan)
+                    # Earlier cases of this upload are already stored, so this
+                    # also catches duplicates within the response
+                    duplicates = []
+                    if app.config['DEDUP_ENABLED']:
+                        with timed_stage('dedupe'):
+                            _, duplicates = split_duplicate_test_cases(cursor, [tc])
+                    if not duplicates:
+                        with timed_stage('insert'):
+                            saved = insert_test_case(cursor, filename, tc)
+                if duplicates:
+                    duplicate_count += 1
+                    yield event('duplicate', **duplicates[0])
+                    continue
+                saved_count += 1
+                yield event('test_case', test_case=saved)
+        except Exception as e:
+            print(f"Error streaming test cases: {e}")
+            yield event('error', error=str(e), saved=saved_count)
+            return
+
+        # An unchanged re-upload has nothing to generate, which is not a failure
+        if saved_count == 0 and duplicate_count == 0 and (plan is None or plan['changed']):
+            yield event('error', error='Failed to generate test cases')
+            return
+
+        kept_count = 0
+        if plan is not None:
+            with transaction() as cursor:
+                if deleted_count is None:
+                    document_id = save_document(cursor, filename, document, requirement_text)
+                    deleted_count = delete_replaced_test_cases(cursor, document_id, plan)
+                kept_count = finish_incremental_update(cursor, document_id, plan, generated_units)
+
+        message = f'Successfully generated {saved_count} test cases for {filename}'
+        if kept_count:
+            message += f' (kept {kept_count} from unchanged sections)'
+        yield event(
+            'completed',
+            message=message,
+            filename=filename,
+            count=saved_count,
+            replaced=deleted_count > 0,
+            duplicates_skipped=duplicate_count,
+            kept=kept_count,
+            tokens=token_report
+        )
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+def get_batch_executor():
+    """Lazily create the pool that caps how many batch files are processed at once"""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=app.config['BATCH_CONCURRENCY'],
+                thread_name_prefix='upload-batch'
+            )
+        return _batch_executor
+
+def process_batch_file(filename, upload, force_regenerate, chunked):
+    """Process one file of a batch, turning failures into a per-file result"""
+    try:
+        result = process_requirement_file(filename, upload, force_regenerate=force_regenerate, chunked=chunked)
+        return {'status': 'completed', **result}
+    except UploadError as e:
+        return {'status': 'failed', 'filename': filename, 'error': str(e)}
+    except Exception as e:
+        print(f"Error processing batch file {filename}: {e}")
+        return {'status': 'failed', 'filename': filename, 'error': str(e)}
+    finally:
+        upload.close()
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """Handle many requirement files in one multipart request.
+
+    Files are sent as repeated ``files`` fields. Up to BATCH_CONCURRENCY of
+    them are extracted and generated at the same time, each saved in its own
+    transaction, and the response lists the outcome of every file in upload
+    order. With ``async=1`` every file becomes a background job instead.
+    """
+    # Several documents may be larger than the single-file request limit together
+    request.max_content_length = app.config['BATCH_MAX_CONTENT_LENGTH']
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    if len(files) > app.config['BATCH_MAX_FILES']:
+        return jsonify({'error': f"Too many files, at most {app.config['BATCH_MAX_FILES']} per batch"}), 400
+
+    try:
+        force_regenerate = request_flag('force_regenerate')
+        chunked = request_flag('chunked')
+        run_async = request_flag('async')
+
+        # Spool every file first; the uploaded streams belong to this request
+        results = [None] * len(files)
+        saved = []
+        seen = set()
+        for index, file in enumerate(files):
+            filename = secure_filename(file.filename or '')
+            if not filename:
+                results[index] = {'status': 'failed', 'filename': file.filename, 'error': 'No file selected'}
+            elif not allowed_file(filename):
+                results[index] = {'status': 'failed', 'filename': filename,
+                                  'error': 'Invalid file type. Only PDF, DOCX, and TXT files are allowed'}
+            elif filename in seen:
+                results[index] = {'status': 'failed', 'filename': filename, 'error': 'Duplicate filename in batch'}
+            else:
+                seen.add(filename)
+                try:
+                    upload = read_upload(file, max_size=app.config['MAX_CONTENT_LENGTH'])
+                except UploadError as e:
+                    results[index] = {'status': 'failed', 'filename': filename, 'error': str(e)}
+                    continue
+                saved.append((index, filename, upload))
+
+        if run_async:
+            for index, filename, upload in saved:
+                try:
+                    job_id = submit_upload_job(filename, upload, force_regenerate, chunked)
+                    results[index] = {
+                        'status': 'queued',
+                        'filename': filename,
+                        'job_id': job_id,
+                        'status_url': url_for('get_job_status', job_id=job_id),
+                        'events_url': url_for('stream_job_events', job_id=job_id)
+                    }
+                except UploadError as e:
+                    upload.close()
+                    results[index] = {'status': 'failed', 'filename': filename, 'error': str(e)}
+        else:
+            executor = get_batch_executor()
+            futures = [
+                (index, executor.submit(process_batch_file, filename, upload, force_regenerate, chunked))
+                for index, filename, upload in saved
+            ]
+            for index, future in futures:
+                results[index] = future.result()
+
+        failed = sum(1 for result in results if result['status'] == 'failed')
+        return jsonify({
+            'message': f'Processed {len(results) - failed} of {len(results)} files',
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'files': results
+        }), 202 if run_async else 200
+
+    except Exception as e:
+        print(f"Error processing batch upload: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Get the status of an upload job, including test cases once completed"""
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job), 200
+
+    except Exception as e:
+        print(f"Error fetching job: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-sent events stream of an upload job's stage changes"""
+    if get_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        last_state = None
+        deadline = time.monotonic() + app.config['JOB_EVENTS_TIMEOUT']
+        while time.monotonic() < deadline:
+            job = get_job(job_id)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Job not found"}\n\n'
+                return
+
+            state = (job['status'], job['stage'])
+            if state != last_state:
+                last_state = state
+                event = 'done' if job['status'] in JOB_FINISHED_STATUSES else 'status'
+                yield f'event: {event}\ndata: {json.dumps(job)}\n\n'
+                if event == 'done':
+                    return
+            else:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+            time.sleep(app.config['JOB_EVENTS_POLL_INTERVAL'])
+
+        yield 'event: timeout\ndata: {}\n\n'
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Columns exposed by the test case API, in response order
+TEST_CASE_FIELDS = (
+    'id', 'requirement_file', 'test_case_name', 'description', 'preconditions',
+    'test_steps', 'expected_result', 'priority', 'test_type', 'source_section', 'created_at', 'updated_at'
+)
+# Query parameters that filter the list, export and other test case queries,
+# with the condition each one adds. They compare the integer columns, which
+# test_cases and the test_case_details view both have.
+TEST_CASE_FILTERS = {
+    'filename': 'document_id = (SELECT id FROM documents WHERE filename = ?)',
+    'test_type': 'test_type_id = ?',
+    'priority': 'priority_id = ?',
+}
+# Enum filters take the name and compare its code; an unknown name matches nothing
+TEST_CASE_FILTER_CODES = {'test_type': TEST_TYPE_IDS, 'priority': PRIORITY_IDS}
+MAX_PAGE_SIZE = 500
+
+def test_case_to_dict(row, fields=TEST_CASE_FIELDS):
+    """Serialize a test_cases row for the JSON API"""
+    return {field: row[field] for field in fields}
+
+def parse_fields_param(value):
+    """Parse a ``fields=`` projection; ``id`` is always included"""
+    if not value:
+        return TEST_CASE_FIELDS
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(TEST_CASE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add('id')
+    return tuple(field for field in TEST_CASE_FIELDS if field in requested)
+
+def build_test_case_filters(args):
+    """Build a WHERE clause and its parameters from the filename/test_type/priority arguments"""
+    clauses, params = [], []
+    for arg, condition in TEST_CASE_FILTERS.items():
+        value = args.get(arg)
+        if value:
+            clauses.append(condition)
+            params.append(TEST_CASE_FILTER_CODES[arg].get(value) if arg in TEST_CASE_FILTER_CODES else value)
+    return clauses, params
+
+def load_sync_state(conn=None):
+    """Current test case version, the oldest version ?since= can serve from and the database epoch"""
+    rows = (conn or get_db()).execute('SELECT name, value FROM test_case_sync').fetchall()
+    return {row['name']: row['value'] for row in rows}
+
+def sync_etag(state):
+    return f"{state['epoch']}-{state['version']}"
+
+def tag_sync_response(response, state):
+    """Add the ETag and version headers that conditional and ?since= requests build on"""
+    response.set_etag(sync_etag(state))
+    # Browsers revalidate on every use, so a cached list is never shown stale
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Test-Cases-Version'] = str(state['version'])
+    return response
+
+def prune_tombstones(cursor, retention_hours=None):
+    """Forget deletions older than SYNC_TOMBSTONE_RETENTION_HOURS, or all of them with 0.
+
+    Clients that last synced before a forgotten deletion are told to reload.
+    """
+    if retention_hours is None:
+        retention_hours = app.config['SYNC_TOMBSTONE_RETENTION_HOURS']
+    if retention_hours:
+        horizon = cursor.execute(
+            "SELECT MAX(version) FROM test_case_tombstones WHERE deleted_at < datetime('now', ?)",
+            (f'-{retention_hours} hours',)
+        ).fetchone()[0]
+    else:
+        horizon = cursor.execute("SELECT value FROM test_case_sync WHERE name = 'version'").fetchone()[0]
+    if horizon is None:
+        return
+    cursor.execute('DELETE FROM test_case_tombstones WHERE version <= ?', (horizon,))
+    cursor.execute("UPDATE test_case_sync SET value = MAX(value, ?) WHERE name = 'pruned_version'", (horizon,))
+
+def parse_since_param(args):
+    """Read ``since`` for a delta request; it does not combine with pagination"""
+    if 'limit' in args or 'cursor' in args:
+        raise ValueError('since cannot be combined with limit or cursor')
+    try:
+        return int(args['since'])
+    except ValueError as e:
+        raise ValueError('since must be a version number') from e
+
+def test_case_changes(since, fields, clauses, params, state):
+    """The delta for GET /test-cases?since=<version>.
+
+    Changed rows that match the filters come back in ``test_cases``. Rows
+    deleted since then, and changed rows that no longer match the filters,
+    are listed by ID in ``deleted``. When ``since`` predates the remembered
+    deletions, or belongs to another database, only ``reset`` is returned
+    and the client has to reload.
+    """
+    if since < state['pruned_version'] or since > state['version']:
+        return {'version': state['version'], 'reset': True}
+
+    # The filters are evaluated per row rather than in WHERE, so the version
+    # index drives the query and changed rows that left the view are found too
+    in_view = f"COALESCE({' AND '.join(clauses)}, 0)" if clauses else '1'
+    conn = get_db()
+    rows = conn.execute(
+        f"""SELECT {', '.join(fields)}, {in_view} AS in_view FROM test_case_details
+            WHERE version > ? ORDER BY +created_at DESC, +id DESC""",
+        [*params, since]
+    ).fetchall()
+    deleted = [row[0] for row in conn.execute(
+        'SELECT test_case_id FROM test_case_tombstones WHERE version > ? ORDER BY test_case_id', (since,)
+    )]
+    deleted += [row['id'] for row in rows if not row['in_view']]
+    return {
+        'version': state['version'],
+        'reset': False,
+        'test_cases': [test_case_to_dict(row, fields) for row in rows if row['in_view']],
+        'deleted': deleted
+    }
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past ``row``"""
+    payload = json.dumps([row['created_at'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def decode_cursor(cursor_value):
+    try:
+        created_at, test_case_id = json.loads(base64.urlsafe_b64decode(cursor_value.encode('ascii')))
+        return str(created_at), int(test_case_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def encode_search_cursor(row):
+    """Keyset cursor for search results, which are ordered by (rank, id)"""
+    payload = json.dumps([row['rank'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def decode_search_cursor(cursor_value):
+    try:
+        rank, test_case_id = json.loads(base64.urlsafe_b64decode(cursor_value.encode('ascii')))
+        return float(rank), int(test_case_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
 
 @app.route('/test-cases', methods=['GET'])
 def get_test_cases():
-    """Get all test cases or filter by filename"""
+    """Get test cases, optionally filtered, projected and paginated.
+
+    Filters: ``filename``, ``test_type``, ``priority``. ``fields`` selects the
+    returned columns. Passing ``limit`` (and then ``cursor``) switches to
+    keyset pagination on ``(created_at, id)`` and wraps the list in an object
+    with ``next_cursor``; without them the response is the full list as a plain array.
+    ``since`` returns only what changed after that version (see
+    test_case_changes). Responses carry an ETag, and ``If-None-Match``
+    gets a 304 while nothing has changed.
+    """
     try:
-        # Get optional filename parameter
-        filename = request.args.get('filename', None)
-        conn = sqlite3.connect('database.db')
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Filter by filename if provided
-        if filename:
-            cursor.execute('SELECT * FROM test_cases WHERE requirement_file = ? ORDER BY created_at DESC', (filename,))
-        else:
-            cursor.execute('SELECT * FROM test_cases ORDER BY created_at DESC')
-        rows = cursor.fetchall()
-        
-        test_cases = []
-        for row in rows:
-            test_cases.append({
-                'id': row['id'],
-                'requirement_file': row['requirement_file'],
-                'test_case_name': row['test_case_name'],
-                'description': row['description'],
-                'preconditions': row['preconditions'],
-                'test_steps': row['test_steps'],
-                'expected_result': row['expected_result'],
-                'priority': row['priority'],
-                'test_type': row['test_type'],
-                'created_at': row['created_at']
-            })
-        
-        conn.close()
-        return jsonify(test_cases), 200
+        try:
+            fields = parse_fields_param(request.args.get('fields'))
+            clauses, params = build_test_case_filters(request.args)
+            since = parse_since_param(request.args) if 'since' in request.args else None
+
+            paginated = 'limit' in request.args or 'cursor' in request.args
+            limit = None
+            if paginated:
+                limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_SIZE)
+                if request.args.get('cursor'):
+                    created_at, test_case_id = decode_cursor(request.args['cursor'])
+                    clauses.append('(created_at, id) < (?, ?)')
+                    params.extend([created_at, test_case_id])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Read the version before the rows: a change landing in between is
+        # then sent again on the next sync rather than missed
+        state = load_sync_state()
+        if request.if_none_match.contains(sync_etag(state)):
+            return tag_sync_response(Response(status=304), state)
+        if since is not None:
+            return tag_sync_response(jsonify(test_case_changes(since, fields, clauses, params, state)), state), 200
+
+        # created_at and id are always read because the cursor is built from them
+        columns = ', '.join(sorted(set(fields) | {'id', 'created_at'}, key=TEST_CASE_FIELDS.index))
+        query = f'SELECT {columns} FROM test_case_details'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY created_at DESC, id DESC'
+        if paginated:
+            # Fetch one extra row to learn whether another page exists
+            query += ' LIMIT ?'
+            params.append(limit + 1)
+
+        rows = get_db().execute(query, params).fetchall()
+
+        if not paginated:
+            return tag_sync_response(jsonify([test_case_to_dict(row, fields) for row in rows]), state), 200
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return tag_sync_response(jsonify({
+            'test_cases': [test_case_to_dict(row, fields) for row in rows],
+            'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+            'has_more': has_more
+        }), state), 200
     
     except Exception as e:
         print(f"Error fetching test cases: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/test-cases/summary', methods=['GET'])
+def get_test_case_summary():
+    """Count test cases by priority and type, so paginated views can show totals"""
+    try:
+        clauses, params = build_test_case_filters(request.args)
+        state = load_sync_state()
+        if request.if_none_match.contains(sync_etag(state)):
+            return tag_sync_response(Response(status=304), state)
+
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        rows = get_db().execute(
+            f'SELECT priority_id, test_type_id, COUNT(*) AS count FROM test_cases{where} GROUP BY priority_id, test_type_id',
+            params
+        ).fetchall()
+
+        # Group on the integer codes, then name them
+        by_priority, by_test_type = {}, {}
+        for row in rows:
+            priority = TEST_CASE_PRIORITIES[row['priority_id'] - 1]
+            test_type = TEST_CASE_TYPES[row['test_type_id'] - 1]
+            by_priority[priority] = by_priority.get(priority, 0) + row['count']
+            by_test_type[test_type] = by_test_type.get(test_type, 0) + row['count']
+
+        return tag_sync_response(jsonify({
+            'total': sum(row['count'] for row in rows),
+            'by_priority': by_priority,
+            'by_test_type': by_test_type
+        }), state), 200
+
+    except Exception as e:
+        print(f"Error summarizing test cases: {e}")
+        return jsonify({'error': str(e)}), 500
+
+SEARCH_TERM_PATTERN = re.compile(r'\w+')
+
+def build_search_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in the input are
+    searched for literally instead of raising syntax errors.
+    """
+    terms = SEARCH_TERM_PATTERN.findall(text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+@app.route('/test-cases/search', methods=['GET'])
+def search_test_cases():
+    """Full-text search over test case names, descriptions, steps and expected results.
+
+    Results are ranked by BM25 (best first) and carry a ``snippet`` with the
+    matched words wrapped in ``<mark>``. Accepts the same filters, ``fields``,
+    ``limit`` and ``cursor`` parameters as ``GET /test-cases``.
+    """
+    try:
+        try:
+            match = build_search_query(request.args.get('q', ''))
+            if not match:
+                raise ValueError('Query parameter q is required')
+            fields = parse_fields_param(request.args.get('fields'))
+            clauses, params = build_test_case_filters(request.args)
+            clauses = [f't.{clause}' for clause in clauses]
+            limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_SIZE)
+            if request.args.get('cursor'):
+                rank, test_case_id = decode_search_cursor(request.args['cursor'])
+                clauses.append('(test_cases_fts.rank, t.id) > (?, ?)')
+                params.extend([rank, test_case_id])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        state = load_sync_state()
+        if request.if_none_match.contains(sync_etag(state)):
+            return tag_sync_response(Response(status=304), state)
+
+        columns = ', '.join(f't.{field}' for field in fields)
+        where = ''.join(f' AND {clause}' for clause in clauses)
+        rows = get_db().execute(
+            f'''SELECT {columns}, test_cases_fts.rank AS rank,
+                       snippet(test_cases_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+                FROM test_cases_fts JOIN test_case_details t ON t.id = test_cases_fts.rowid
+                WHERE test_cases_fts MATCH ?{where}
+                ORDER BY test_cases_fts.rank, t.id
+                LIMIT ?''',
+            [match, *params, limit + 1]
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        results = []
+        for row in rows:
+            result = test_case_to_dict(row, fields)
+            result['snippet'] = row['snippet']
+            result['score'] = -row['rank']
+            results.append(result)
+        return tag_sync_response(jsonify({
+            'test_cases': results,
+            'next_cursor': encode_search_cursor(rows[-1]) if has_more else None,
+            'has_more': has_more
+        }), state), 200
+
+    except Exception as e:
+        print(f"Error searching test cases: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _fetch_by_ids(conn, query, ids, batch_size=500):
+    """Run ``query`` with its ``IN ({})`` placeholder filled in batches of IDs"""
+    ids = list(ids)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        yield from conn.execute(query.format(', '.join('?' * len(batch))), batch)
+
+@app.route('/test-cases/duplicates', methods=['GET'])
+def get_duplicate_clusters():
+    """Report clusters of near-duplicate test cases already in the database.
+
+    Candidate pairs come from shared LSH buckets and are kept when their
+    estimated similarity reaches ``threshold`` (default DEDUP_THRESHOLD).
+    Pairs are joined transitively into clusters, largest first. Accepts the
+    ``filename``, ``test_type`` and ``priority`` filters.
+    """
+    try:
+        try:
+            threshold = float(request.args.get('threshold', app.config['DEDUP_THRESHOLD']))
+            if not 0 < threshold <= 1:
+                raise ValueError('threshold must be between 0 and 1')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        clauses, params = build_test_case_filters(request.args)
+        scope = ''
+        if clauses:
+            scope = 'WHERE ' + ' AND '.join(clauses)
+        conn = get_db()
+        pairs = conn.execute(
+            f'''WITH scoped AS (
+                    SELECT l.test_case_id, l.band, l.bucket FROM test_case_lsh l
+                    WHERE l.test_case_id IN (SELECT id FROM test_cases {scope})
+                )
+                SELECT DISTINCT a.test_case_id AS first_id, b.test_case_id AS second_id
+                FROM scoped a JOIN scoped b
+                  ON b.band = a.band AND b.bucket = a.bucket AND b.test_case_id > a.test_case_id''',
+            params
+        ).fetchall()
+
+        candidate_ids = {row[key] for row in pairs for key in ('first_id', 'second_id')}
+        signatures = {}
+        for row in _fetch_by_ids(conn, 'SELECT test_case_id, signature FROM test_case_signatures WHERE test_case_id IN ({})', candidate_ids):
+            signatures[row['test_case_id']] = load_signature(row['signature'])
+
+        # Union-find over the pairs that pass the similarity check
+        parent = {}
+        def find(test_case_id):
+            root = parent.setdefault(test_case_id, test_case_id)
+            while root != parent[root]:
+                root = parent[root]
+            parent[test_case_id] = root
+            return root
+
+        for row in pairs:
+            first, second = row['first_id'], row['second_id']
+            if signature_similarity(signatures[first], signatures[second]) >= threshold:
+                parent[find(second)] = find(first)
+
+        members = {}
+        for test_case_id in parent:
+            members.setdefault(find(test_case_id), []).append(test_case_id)
+        cluster_ids = [sorted(ids) for ids in members.values() if len(ids) > 1]
+
+        details = {}
+        for row in _fetch_by_ids(conn, 'SELECT id, requirement_file, test_case_name, priority, test_type FROM test_case_details WHERE id IN ({})',
+                                 {test_case_id for ids in cluster_ids for test_case_id in ids}):
+            details[row['id']] = dict(row)
+
+        clusters = sorted(
+            ({'size': len(ids), 'test_cases': [details[test_case_id] for test_case_id in ids]} for ids in cluster_ids),
+            key=lambda cluster: (-cluster['size'], cluster['test_cases'][0]['id'])
+        )
+        return jsonify({
+            'threshold': threshold,
+            'cluster_count': len(clusters),
+            'duplicate_count': sum(cluster['size'] - 1 for cluster in clusters),
+            'clusters': clusters
+        }), 200
+
+    except Exception as e:
+        print(f"Error finding duplicate test cases: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Columns that PATCH /test-cases may change
+BULK_EDITABLE_FIELDS = ('test_case_name', 'description', 'preconditions', 'test_steps', 'expected_result', 'priority', 'test_type')
+
+def resolve_bulk_selection(cursor, data):
+    """IDs of the test cases a bulk request targets, from ``ids`` or a ``filter`` object.
+
+    A filter takes the same keys as the list filters (filename, test_type,
+    priority) and must name at least one, so that a missing filter never
+    selects every test case. Raises ValueError for a bad selection.
+    """
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError('ids must be a list of integers')
+        return list(dict.fromkeys(ids))
+
+    filters = data.get('filter')
+    if not isinstance(filters, dict):
+        raise ValueError('Provide ids or a filter')
+    unknown = set(filters) - set(TEST_CASE_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+    clauses, params = build_test_case_filters(filters)
+    if not clauses:
+        raise ValueError('A filter must set at least one of: ' + ', '.join(TEST_CASE_FILTERS))
+    cursor.execute(f"SELECT id FROM test_cases WHERE {' AND '.join(clauses)}", params)
+    return [row[0] for row in cursor.fetchall()]
+
+def validate_test_case_changes(changes):
+    """Check the fields of a bulk edit; raises ValueError"""
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError('changes must be a non-empty object')
+    unknown = set(changes) - set(BULK_EDITABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Fields cannot be changed: {', '.join(sorted(unknown))}")
+    if 'priority' in changes and changes['priority'] not in TEST_CASE_PRIORITIES:
+        raise ValueError(f"priority must be one of: {', '.join(TEST_CASE_PRIORITIES)}")
+    if 'test_type' in changes and changes['test_type'] not in TEST_CASE_TYPES:
+        raise ValueError(f"test_type must be one of: {', '.join(TEST_CASE_TYPES)}")
+    if 'test_case_name' in changes and not str(changes['test_case_name'] or '').strip():
+        raise ValueError('test_case_name cannot be empty')
+
+def stored_test_case_changes(changes):
+    """Column values for validated changes: priority and test_type become their integer codes"""
+    stored = dict(changes)
+    if 'priority' in stored:
+        stored['priority_id'] = PRIORITY_IDS[stored.pop('priority')]
+    if 'test_type' in stored:
+        stored['test_type_id'] = TEST_TYPE_IDS[stored.pop('test_type')]
+    return stored
+
+def bulk_update_statements(data, cursor):
+    """Group a PATCH body into ``{columns: [params, ...]}`` for one executemany per column set.
+
+    Accepts ``{"ids" | "filter", "changes"}`` to apply the same changes to
+    every selected case, or ``{"updates": [{"id", ...fields}]}`` for
+    per-case changes.
+    """
+    statements = {}
+    if 'updates' in data:
+        updates = data['updates']
+        if not isinstance(updates, list) or not updates:
+            raise ValueError('updates must be a non-empty list')
+        for update in updates:
+            if not isinstance(update, dict) or not isinstance(update.get('id'), int) or isinstance(update['id'], bool):
+                raise ValueError('Every update needs an integer id')
+            changes = {field: value for field, value in update.items() if field != 'id'}
+            validate_test_case_changes(changes)
+            changes = stored_test_case_changes(changes)
+            columns = tuple(sorted(changes))
+            statements.setdefault(columns, []).append([changes[column] for column in columns] + [update['id']])
+        return statements
+
+    changes = data.get('changes')
+    validate_test_case_changes(changes)
+    changes = stored_test_case_changes(changes)
+    columns = tuple(sorted(changes))
+    values = [changes[column] for column in columns]
+    statements[columns] = [values + [test_case_id] for test_case_id in resolve_bulk_selection(cursor, data)]
+    return statements
+
+@app.route('/test-cases', methods=['PATCH'])
+def bulk_update_test_cases():
+    """Apply changes to many test cases in one transaction and return the updated rows"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        with transaction() as cursor:
+            try:
+                statements = bulk_update_statements(data, cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            ids = []
+            resign = False
+            for columns, rows in statements.items():
+                assignments = ', '.join(f'{column} = ?' for column in columns)
+                cursor.executemany(f'UPDATE test_cases SET {assignments}, edited_at = CURRENT_TIMESTAMP WHERE id = ?', rows)
+                ids.extend(row[-1] for row in rows)
+                resign = resign or 'test_case_name' in columns or 'test_steps' in columns
+
+            updated = [test_case_to_dict(row) for row in _fetch_by_ids(
+                cursor.connection, 'SELECT * FROM test_case_details WHERE id IN ({}) ORDER BY id', dict.fromkeys(ids)
+            )]
+            if resign:
+                # Keep the duplicate index in step with the edited text
+                index_test_case_signatures(cursor, updated)
+
+        return jsonify({'updated': len(updated), 'test_cases': updated}), 200
+
+    except Exception as e:
+        print(f"Error updating test cases: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/test-cases/bulk-delete', methods=['POST'])
+def bulk_delete_test_cases():
+    """Delete many test cases, by ID list or filter, in one transaction"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        with transaction() as cursor:
+            try:
+                ids = resolve_bulk_selection(cursor, data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            deleted_ids = [row[0] for row in _fetch_by_ids(
+                cursor.connection, 'SELECT id FROM test_cases WHERE id IN ({}) ORDER BY id', ids
+            )]
+            cursor.executemany('DELETE FROM test_cases WHERE id = ?', [(test_case_id,) for test_case_id in deleted_ids])
+            prune_tombstones(cursor)
+
+        return jsonify({'deleted': len(deleted_ids), 'ids': deleted_ids}), 200
+
+    except Exception as e:
+        print(f"Error deleting test cases: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/test-cases/<int:test_case_id>', methods=['PUT'])
 def update_test_case(test_case_id):
     """Update a test case"""
     try:
         data = request.json
+        try:
+            validate_test_case_changes({field: data.get(field) for field in ('priority', 'test_type')})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE test_cases 
-            SET test_case_name = ?, description = ?, preconditions = ?, 
-                test_steps = ?, expected_result = ?, priority = ?, test_type = ?
-            WHERE id = ?
-        ''', (
-            data.get('test_case_name'),
-            data.get('description'),
-            data.get('preconditions'),
-            data.get('test_steps'),
-            data.get('expected_result'),
-            data.get('priority'),
-            data.get('test_type'),
-            test_case_id
-        ))
-        
-        conn.commit()
-        conn.close()
+        with transaction() as cursor:
+            cursor.execute('''
+                UPDATE test_cases 
+                SET test_case_name = ?, description = ?, preconditions = ?, 
+                    test_steps = ?, expected_result = ?, priority_id = ?, test_type_id = ?,
+                    edited_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (
+                data.get('test_case_name'),
+                data.get('description'),
+                data.get('preconditions'),
+                data.get('test_steps'),
+                data.get('expected_result'),
+                PRIORITY_IDS[data['priority']],
+                TEST_TYPE_IDS[data['test_type']],
+                test_case_id
+            ))
+            if cursor.rowcount:
+                # Keep the duplicate index in step with the edited text
+                index_test_case_signatures(cursor, [{**data, 'id': test_case_id}])
         
         return jsonify({'message': 'Test case updated successfully'}), 200
     
@@ -464,13 +3796,9 @@ def update_test_case(test_case_id):
 def delete_test_case(test_case_id):
     """Delete a test case"""
     try:
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM test_cases WHERE id = ?', (test_case_id,))
-        
-        conn.commit()
-        conn.close()
+        with transaction() as cursor:
+            cursor.execute('DELETE FROM test_cases WHERE id = ?', (test_case_id,))
+            prune_tombstones(cursor)
         
         return jsonify({'message': 'Test case deleted successfully'}), 200
     
@@ -482,14 +3810,12 @@ def delete_test_case(test_case_id):
 def clear_all_test_cases():
     """Delete all test cases"""
     try:
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM test_cases')
-        deleted_count = cursor.rowcount
-        
-        conn.commit()
-        conn.close()
+        with transaction() as cursor:
+            cursor.execute('DELETE FROM test_cases')
+            deleted_count = cursor.rowcount
+            cursor.execute('DELETE FROM documents')
+            # Nothing is left to sync: every client reloads
+            prune_tombstones(cursor, retention_hours=0)
         
         return jsonify({'message': f'Successfully deleted {deleted_count} test cases'}), 200
     
@@ -497,102 +3823,287 @@ def clear_all_test_cases():
         print(f"Error clearing test cases: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/test-cases/clear-all', methods=['DELETE'])
-def clear_all_test_cases():
-    """Delete all test cases"""
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Report generation cache hit/miss counters and current size"""
     try:
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM test_cases')
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({'message': 'All test cases deleted successfully'}), 200
-    
+        db = get_db()
+        counters = {row['name']: row['value'] for row in db.execute('SELECT name, value FROM generation_cache_stats')}
+        entries, total_bytes = db.execute('SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM generation_cache').fetchone()
+
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return jsonify({
+            'enabled': app.config['GENERATION_CACHE_ENABLED'],
+            'hits': hits,
+            'misses': misses,
+            'evictions': counters.get('evictions', 0),
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'total_bytes': total_bytes,
+            'max_entries': app.config['GENERATION_CACHE_MAX_ENTRIES'],
+            'max_bytes': app.config['GENERATION_CACHE_MAX_BYTES'],
+            'max_age_days': app.config['GENERATION_CACHE_MAX_AGE_DAYS']
+        }), 200
+
     except Exception as e:
-        print(f"Error deleting all test cases: {e}")
+        print(f"Error fetching cache stats: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/llm/stats', methods=['GET'])
+def get_llm_stats():
+    """Report the Gemini scheduler's queue, rate limit and circuit breaker state for this process"""
+    with _response_parse_stats_lock:
+        parsing = dict(response_parse_stats)
+    return jsonify({**gemini_scheduler.stats(), 'parsing': parsing}), 200
+
+@app.route('/extraction/stats', methods=['GET'])
+def get_extraction_stats():
+    """Report text extraction throughput per file type for this process"""
+    with _extraction_stats_lock:
+        stats = {file_type: dict(values) for file_type, values in _extraction_stats.items()}
+
+    for values in stats.values():
+        values['bytes_per_second'] = round(values['bytes'] / values['seconds'], 1) if values['seconds'] else 0.0
+        values['seconds'] = round(values['seconds'], 4)
+
+    return jsonify({
+        'process_pool': app.config['EXTRACTION_PROCESS_POOL'],
+        'max_pages': app.config['EXTRACTION_MAX_PAGES'],
+        # Pages are only cut short in the pool
+        'page_timeout': app.config['EXTRACTION_PAGE_TIMEOUT'] if app.config['EXTRACTION_PROCESS_POOL'] else None,
+        'parallel_min_pages': app.config['EXTRACTION_PARALLEL_MIN_PAGES'],
+        'file_types': stats
+    }), 200
+
+@app.route('/storage/stats', methods=['GET'])
+def get_storage_stats():
+    """Report the size of uploads/ as of the last janitor sweep of this process"""
+    with _storage_stats_lock:
+        stats = dict(_storage_stats)
+    return jsonify({
+        **stats,
+        'keep_originals': app.config['UPLOAD_KEEP_ORIGINALS'],
+        'spool_max_memory': app.config['UPLOAD_SPOOL_MAX_MEMORY'],
+        'max_age_days': app.config['STORAGE_MAX_AGE_DAYS'],
+        'max_bytes': app.config['STORAGE_MAX_MB'] * 1024 * 1024,
+        'janitor_interval': app.config['STORAGE_JANITOR_INTERVAL']
+    }), 200
+
+# Excel export layout: header, row field and column width for each column
+EXPORT_COLUMNS = [
+    ('ID', 'id', 8),
+    ('Test Case Name', 'test_case_name', 30),
+    ('Description', 'description', 35),
+    ('Preconditions', 'preconditions', 25),
+    ('Test Steps', 'test_steps', 40),
+    ('Expected Result', 'expected_result', 35),
+    ('Priority', 'priority', 12),
+    ('Test Type', 'test_type', 15),
+    ('Requirement File', 'requirement_file', 25),
+    ('Created At', 'created_at', 20),
+]
+# Long text columns that wrap in the exported sheet
+EXPORT_WRAPPED_FIELDS = {'test_case_name', 'description', 'preconditions', 'test_steps', 'expected_result'}
+EXPORT_STREAM_CHUNK_SIZE = 64 * 1024
+EXPORT_BATCH_ROWS = 500
+# Download metadata for each /export?format= value
+EXPORT_FORMATS = {
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('csv', 'text/csv'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+def iter_test_case_rows(args, columns='*'):
+    """Iterate test case rows matching the list API filters without loading them all.
+
+    The filters are read immediately, so the returned iterator can be consumed
+    by a streaming response after the request context is gone.
+    """
+    clauses, params = build_test_case_filters(args)
+    query = f'SELECT {columns} FROM test_case_details'
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    query += ' ORDER BY created_at DESC, id DESC'
+    return _iter_query(query, params)
+
+def _iter_query(query, params):
+    # A dedicated connection keeps the long-running read off the pooled one
+    conn = connect_db()
+    try:
+        yield from conn.execute(query, params)
+    finally:
+        conn.close()
+
+def write_excel_export(rows, output):
+    """Write rows to ``output`` as a styled .xlsx using openpyxl's write-only mode.
+
+    Rows are streamed to the sheet one at a time and the style objects are
+    created once and shared, so memory stays flat regardless of row count.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Test Cases")
+
+    # Column widths and the frozen header must be set before any row is written
+    for col_num, (_, _, width) in enumerate(EXPORT_COLUMNS, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    ws.freeze_panes = 'A2'
+
+    # Style for headers
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    wrap_alignment = Alignment(wrap_text=True, vertical='top')
+
+    header_row = []
+    for header, _, _ in EXPORT_COLUMNS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_row.append(cell)
+    ws.append(header_row)
+
+    for row in rows:
+        values = []
+        for _, field, _ in EXPORT_COLUMNS:
+            if field in EXPORT_WRAPPED_FIELDS:
+                # Apply text wrapping for long content
+                cell = WriteOnlyCell(ws, value=row[field])
+                cell.alignment = wrap_alignment
+                values.append(cell)
+            else:
+                values.append(row[field])
+        ws.append(values)
+
+    wb.save(output)
+
+def iter_csv_export(rows):
+    """Yield CSV text for rows selected in TEST_CASE_FIELDS order, a batch at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TEST_CASE_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_ndjson_export(rows):
+    """Yield one JSON object per line for rows selected in TEST_CASE_FIELDS order"""
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(dict(zip(TEST_CASE_FIELDS, row))))
+        if len(batch) == EXPORT_BATCH_ROWS:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+def write_parquet_export(rows, output):
+    """Write rows to ``output`` as Parquet, one row group per PARQUET_ROW_GROUP_SIZE rows"""
+    # pyarrow is optional and only needed for this format
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (field, pa.int64() if field == 'id' else pa.string())
+        for field in TEST_CASE_FIELDS
+    ])
+
+    def write_batch(writer, batch):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)],
+            schema=schema
+        ))
+
+    row_group_size = app.config['PARQUET_ROW_GROUP_SIZE']
+    writer = pq.ParquetWriter(output, schema, compression='snappy')
+    try:
+        batch = []
+        for row in rows:
+            batch.append(tuple(row))
+            if len(batch) == row_group_size:
+                write_batch(writer, batch)
+                batch = []
+        if batch:
+            write_batch(writer, batch)
+    finally:
+        writer.close()
+
+def stream_file(file, chunk_size=EXPORT_STREAM_CHUNK_SIZE):
+    """Yield a file's contents from the start, closing it once streamed"""
+    try:
+        file.seek(0)
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this process"""
+    return Response(''.join(metric.render() for metric in METRICS), mimetype='text/plain; version=0.0.4')
+
 @app.route('/export', methods=['GET'])
 def export_test_cases():
-    """Export all test cases as Excel file"""
+    """Export test cases, honoring the list API filters.
+
+    ``format`` selects xlsx (default), csv, ndjson or parquet. CSV and NDJSON
+    are generated row by row straight into the response. Excel and Parquet
+    are built in an anonymous temporary file that is removed as soon as it
+    has been streamed, so exports never accumulate in uploads/.
+    """
+    export_format = request.args.get('format', 'xlsx').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    extension, mimetype = EXPORT_FORMATS[export_format]
+    export_filename = f'test_cases_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+    headers = {'Content-Disposition': f'attachment; filename={export_filename}'}
+
+    if export_format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        return jsonify({'error': 'Parquet export requires pyarrow (pip install pyarrow)'}), 501
+
     try:
-        conn = sqlite3.connect('database.db')
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM test_cases ORDER BY created_at DESC')
-        rows = cursor.fetchall()
-        
-        conn.close()
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Test Cases"
-        
-        # Define headers
-        headers = ['ID', 'Test Case Name', 'Description', 'Preconditions', 
-                   'Test Steps', 'Expected Result', 'Priority', 'Test Type', 
-                   'Requirement File', 'Created At']
-        
-        # Style for headers
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        
-        # Write headers
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        
-        # Write data
-        for row_num, row in enumerate(rows, 2):
-            ws.cell(row=row_num, column=1, value=row['id'])
-            ws.cell(row=row_num, column=2, value=row['test_case_name'])
-            ws.cell(row=row_num, column=3, value=row['description'])
-            ws.cell(row=row_num, column=4, value=row['preconditions'])
-            ws.cell(row=row_num, column=5, value=row['test_steps'])
-            ws.cell(row=row_num, column=6, value=row['expected_result'])
-            ws.cell(row=row_num, column=7, value=row['priority'])
-            ws.cell(row=row_num, column=8, value=row['test_type'])
-            ws.cell(row=row_num, column=9, value=row['requirement_file'])
-            ws.cell(row=row_num, column=10, value=row['created_at'])
-            
-            # Apply text wrapping for long content
-            for col in [2, 3, 4, 5, 6]:
-                ws.cell(row=row_num, column=col).alignment = Alignment(wrap_text=True, vertical='top')
-        
-        # Adjust column widths
-        ws.column_dimensions['A'].width = 8
-        ws.column_dimensions['B'].width = 30
-        ws.column_dimensions['C'].width = 35
-        ws.column_dimensions['D'].width = 25
-        ws.column_dimensions['E'].width = 40
-        ws.column_dimensions['F'].width = 35
-        ws.column_dimensions['G'].width = 12
-        ws.column_dimensions['H'].width = 15
-        ws.column_dimensions['I'].width = 25
-        ws.column_dimensions['J'].width = 20
-        
-        # Freeze the header row
-        ws.freeze_panes = 'A2'
-        
-        # Save Excel file
-        export_filename = f'test_cases_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        export_path = os.path.join(app.config['UPLOAD_FOLDER'], export_filename)
-        
-        wb.save(export_path)
-        
-        return send_file(export_path, as_attachment=True, download_name=export_filename)
+        if export_format in ('csv', 'ndjson'):
+            rows = iter_test_case_rows(request.args, columns=', '.join(TEST_CASE_FIELDS))
+            body = iter_csv_export(rows) if export_format == 'csv' else iter_ndjson_export(rows)
+            return Response(body, mimetype=mimetype, headers=headers)
+
+        export_file = tempfile.TemporaryFile()
+        try:
+            if export_format == 'parquet':
+                write_parquet_export(
+                    iter_test_case_rows(request.args, columns=', '.join(TEST_CASE_FIELDS)),
+                    export_file
+                )
+            else:
+                write_excel_export(iter_test_case_rows(request.args), export_file)
+            size = export_file.tell()
+        except BaseException:
+            export_file.close()
+            raise
+
+        headers['Content-Length'] = str(size)
+        return Response(stream_file(export_file), mimetype=mimetype, headers=headers)
     
     except Exception as e:
         print(f"Error exporting test cases: {e}")
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
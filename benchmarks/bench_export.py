@@ -0,0 +1,89 @@
+"""Compare /export throughput and peak memory across formats.
+
+Seeds a throwaway database with N test cases, then runs each export format
+in its own subprocess so that peak RSS is measured per format:
+
+    python benchmarks/bench_export.py --rows 100000
+    python benchmarks/bench_export.py --rows 10000 --formats xlsx csv --output export.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import load_app, peak_rss_mb, seed_test_cases, write_results
+
+FORMATS = ['xlsx', 'csv', 'ndjson', 'parquet']
+
+
+def run_export(database_path, export_format):
+    """Worker mode: stream one export through the test client and report the numbers"""
+    app = load_app(database_path)
+    client = app.app.test_client()
+    baseline_rss = peak_rss_mb()
+
+    started = time.perf_counter()
+    response = client.get(f'/export?format={export_format}')
+    if response.status_code != 200:
+        return {'format': export_format, 'error': response.get_json()}
+    size = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - started
+
+    peak_rss = peak_rss_mb()
+    return {
+        'format': export_format,
+        'seconds': round(elapsed, 3),
+        'bytes': size,
+        'peak_rss_mb': peak_rss,
+        'export_rss_mb': round(peak_rss - baseline_rss, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='number of test cases to export')
+    parser.add_argument('--formats', nargs='+', default=FORMATS, choices=FORMATS)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == 'seed':
+        seed_test_cases(load_app(args.database), args.rows)
+        return
+    if args.worker:
+        print(json.dumps(run_export(args.database, args.worker)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='case10x-bench-')
+    database_path = os.path.join(workdir, 'bench.db')
+    subprocess.run([sys.executable, __file__, '--worker', 'seed', '--database', database_path,
+                    '--rows', str(args.rows)], check=True, stdout=subprocess.DEVNULL)
+
+    results = []
+    for export_format in args.formats:
+        completed = subprocess.run(
+            [sys.executable, __file__, '--worker', export_format, '--database', database_path],
+            check=True, capture_output=True, text=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if 'seconds' in result:
+            result['rows_per_second'] = round(args.rows / result['seconds']) if result['seconds'] else None
+        results.append(result)
+
+    print(f"{'format':<10}{'seconds':>10}{'rows/s':>12}{'MB out':>10}{'peak RSS MB':>14}{'export RSS MB':>15}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['format']:<10}  error: {result['error']}")
+            continue
+        print(f"{result['format']:<10}{result['seconds']:>10}{result['rows_per_second']:>12}"
+              f"{result['bytes'] / 1024 / 1024:>10.1f}{result['peak_rss_mb']:>14}{result['export_rss_mb']:>15}")
+
+    return write_results(args.output, 'export', {'rows': args.rows, 'formats': args.formats}, {'formats': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Time extract_text_from_pdf/docx/txt on large generated documents.
+
+    python benchmarks/bench_extraction.py --paragraphs 20000 --output extraction.json
+    python benchmarks/bench_extraction.py --process-pool
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from common import load_app, peak_rss_mb, write_results
+from fixtures import make_docx, make_pdf, make_txt, requirement_paragraphs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=20000, help='requirement paragraphs per document')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per document; the median is reported')
+    parser.add_argument('--process-pool', action='store_true', help='also time PDFs with EXTRACTION_PROCESS_POOL=1')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='case10x-bench-')
+    app = load_app(os.path.join(workdir, 'bench.db'))
+
+    paragraphs = requirement_paragraphs(args.paragraphs)
+    fixtures = {name: os.path.join(workdir, f'requirements.{name}') for name in ('pdf', 'docx', 'txt')}
+    pages = make_pdf(fixtures['pdf'], paragraphs)
+    make_docx(fixtures['docx'], paragraphs)
+    make_txt(fixtures['txt'], paragraphs)
+
+    runs = [('pdf', False), ('docx', False), ('txt', False)]
+    if args.process_pool:
+        runs.append(('pdf', True))
+
+    results = []
+    for file_type, process_pool in runs:
+        app.app.config['EXTRACTION_PROCESS_POOL'] = process_pool
+        timings, text = [], ''
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            text = app.extract_text_from_file(fixtures[file_type], file_type)
+            timings.append(time.perf_counter() - started)
+        seconds = statistics.median(timings)
+        size = os.path.getsize(fixtures[file_type])
+        results.append({
+            'file_type': file_type,
+            'process_pool': process_pool,
+            'file_bytes': size,
+            'pages': pages if file_type == 'pdf' else None,
+            'chars_extracted': len(text),
+            'seconds': round(seconds, 4),
+            'min_seconds': round(min(timings), 4),
+            'file_mb_per_second': round(size / 1024 / 1024 / seconds, 2),
+        })
+
+    print(f"{'type':<14}{'file MB':>9}{'chars':>12}{'seconds':>10}{'MB/s':>8}")
+    for result in results:
+        label = result['file_type'] + (' (pool)' if result['process_pool'] else '')
+        print(f"{label:<14}{result['file_bytes'] / 1024 / 1024:>9.2f}{result['chars_extracted']:>12}"
+              f"{result['seconds']:>10}{result['file_mb_per_second']:>8}")
+
+    parameters = {'paragraphs': args.paragraphs, 'repeat': args.repeat, 'pdf_pages': pages}
+    return write_results(args.output, 'extraction', parameters, {'documents': results, 'peak_rss_mb': peak_rss_mb()})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""GET /test-cases latency as the table grows to 1k, 10k and 100k rows.
+
+    python benchmarks/bench_list.py --sizes 1000 10000 100000 --output list.json
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import load_app, seed_test_cases, summarize_latencies, write_results
+
+LIST_FIELDS = 'id,requirement_file,test_case_name,description,preconditions,test_steps,expected_result,priority,test_type'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='table sizes to measure')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per query and size')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='case10x-bench-')
+    app = load_app(os.path.join(workdir, 'bench.db'))
+    client = app.app.test_client()
+
+    results = []
+    seeded = 0
+    for size in sorted(args.sizes):
+        # Grow the same table instead of reseeding from scratch for every size
+        seed_test_cases(app, size - seeded, seed=seeded)
+        seeded = size
+
+        # A cursor into the middle of the table, for the deep page query
+        middle = app.get_db().execute(
+            'SELECT id, created_at FROM test_cases ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?', (size // 2,)
+        ).fetchone()
+        queries = [
+            ('first_page', '/test-cases', {'limit': 50, 'fields': LIST_FIELDS}),
+            ('deep_page', '/test-cases', {'limit': 50, 'fields': LIST_FIELDS, 'cursor': app.encode_cursor(middle)}),
+            ('filtered_page', '/test-cases', {'limit': 50, 'fields': LIST_FIELDS, 'test_type': 'Security', 'priority': 'High'}),
+            ('full_list', '/test-cases', {}),
+            ('summary', '/test-cases/summary', {}),
+            ('search', '/test-cases/search', {'q': 'password reset', 'limit': 50}),
+        ]
+
+        timings = {}
+        for name, path, params in queries:
+            # The unpaginated list serializes every row, so it gets fewer runs
+            repeat = min(args.repeat, 3) if name == 'full_list' else args.repeat
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.get(path, query_string=params)
+                response.get_data()
+                samples.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{path} returned {response.status_code}: {response.get_data(as_text=True)}')
+            timings[name] = summarize_latencies(samples)
+        results.append({'rows': size, 'queries': timings})
+
+    names = list(results[0]['queries'])
+    print(f"{'rows':>8}" + ''.join(f'{name:>15}' for name in names) + '   (p50 ms)')
+    for result in results:
+        print(f"{result['rows']:>8}" + ''.join(f"{result['queries'][name]['p50_ms']:>15}" for name in names))
+
+    return write_results(args.output, 'list', {'sizes': args.sizes, 'repeat': args.repeat}, {'sizes': results})
+
+
+if __name__ == '__main__':
+    main()
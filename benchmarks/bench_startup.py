@@ -0,0 +1,100 @@
+"""Cold start cost: importing app.py, preparing it and serving the first requests.
+
+Every trial runs in a fresh interpreter with a fresh database, so nothing is
+warm. ``--app-dir`` points at another checkout to measure it the same way:
+
+    python benchmarks/bench_startup.py --repeat 5 --output startup.json
+    python benchmarks/bench_startup.py --app-dir ../case10x-main --output startup-main.json
+
+The first upload goes to the fake Gemini backend, which skips the Gemini SDK;
+``sdk_import_s`` reports what importing it costs on top, where it has not
+already been imported at startup.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BENCHMARKS_DIR, REPO_ROOT, write_results
+from fixtures import requirement_paragraphs
+
+MEASUREMENTS = ['import_s', 'create_app_s', 'first_index_s', 'first_list_s', 'first_upload_s', 'sdk_import_s']
+
+
+def run_trial(app_dir):
+    """Time one cold start in this process and print the timings as JSON"""
+    workdir = tempfile.mkdtemp(prefix='case10x-bench-')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['GEMINI_MODEL_FACTORY'] = 'fake_gemini:FakeGenerativeModel'
+    os.environ.setdefault('GEMINI_API_KEY', 'offline-benchmark')
+    os.chdir(workdir)
+    sys.path[:0] = [app_dir, BENCHMARKS_DIR]
+    timings = {}
+
+    started = time.perf_counter()
+    import app
+    timings['import_s'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Checkouts from before create_app() set everything up on import
+    flask_app = app.create_app() if hasattr(app, 'create_app') else app.app
+    timings['create_app_s'] = time.perf_counter() - started
+
+    client = flask_app.test_client()
+    document = '\n\n'.join(requirement_paragraphs(30)).encode('utf-8')
+    requests = [
+        ('first_index_s', lambda: client.get('/')),
+        ('first_list_s', lambda: client.get('/test-cases')),
+        ('first_upload_s', lambda: client.post('/upload', data={'file': (io.BytesIO(document), 'startup.txt')})),
+    ]
+    for name, send in requests:
+        started = time.perf_counter()
+        response = send()
+        timings[name] = time.perf_counter() - started
+        if response.status_code != 200:
+            raise SystemExit(f'{name}: HTTP {response.status_code}')
+
+    started = time.perf_counter()
+    import google.generativeai  # noqa: F401
+    timings['sdk_import_s'] = time.perf_counter() - started
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app-dir', default=REPO_ROOT, help='checkout whose app.py is measured')
+    parser.add_argument('--repeat', type=int, default=5, help='cold starts to measure')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--trial', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+
+    if args.trial:
+        run_trial(app_dir)
+        return
+
+    trials = []
+    for _ in range(args.repeat):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--trial', '--app-dir', app_dir],
+            capture_output=True, text=True, check=True
+        )
+        # The app prints its own progress; the timings are the last line
+        trials.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    results = {}
+    for name in MEASUREMENTS:
+        values = [trial[name] for trial in trials]
+        results[name] = {'median_ms': round(statistics.median(values) * 1000, 1), 'max_ms': round(max(values) * 1000, 1)}
+        print(f"{name:16} median {results[name]['median_ms']:8.1f} ms   max {results[name]['max_ms']:8.1f} ms")
+
+    write_results(args.output, 'startup', {'app_dir': app_dir, 'repeat': args.repeat}, results)
+
+
+if __name__ == '__main__':
+    main()
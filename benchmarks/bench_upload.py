@@ -0,0 +1,87 @@
+"""End-to-end /upload throughput with N concurrent clients against the fake Gemini backend.
+
+Every upload is a distinct document, so each one misses the generation cache
+and goes through extraction, generation, deduplication and the insert:
+
+    python benchmarks/bench_upload.py --clients 8 --uploads 64 --latency 0.5
+    python benchmarks/bench_upload.py --endpoint /upload/stream --output upload.json
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fake_gemini
+from common import load_app, peak_rss_mb, summarize_latencies, write_results
+from fixtures import requirement_paragraphs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16], help='concurrent clients, one run per value')
+    parser.add_argument('--uploads', type=int, default=32, help='uploads per run')
+    parser.add_argument('--paragraphs', type=int, default=60, help='requirement paragraphs per uploaded document')
+    parser.add_argument('--latency', type=float, default=0.5, help='fake Gemini response latency in seconds')
+    parser.add_argument('--cases', type=int, default=12, help='test cases per fake response')
+    parser.add_argument('--endpoint', default='/upload', choices=['/upload', '/upload/stream'])
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='case10x-bench-')
+    app = load_app(os.path.join(workdir, 'bench.db'))
+    fake_gemini.configure(latency=args.latency, cases=args.cases)
+
+    document_number = 0
+    results = []
+    for clients in args.clients:
+        documents = []
+        for _ in range(args.uploads):
+            document_number += 1
+            text = '\n\n'.join(requirement_paragraphs(args.paragraphs, seed=document_number))
+            documents.append((f'requirements_{document_number}.txt', text.encode('utf-8')))
+
+        def upload(document):
+            filename, content = document
+            client = app.app.test_client()
+            started = time.perf_counter()
+            response = client.post(args.endpoint, data={'file': (io.BytesIO(content), filename)})
+            body = response.get_data()  # Drains streamed responses
+            return time.perf_counter() - started, response.status_code, body
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            outcomes = list(pool.map(upload, documents))
+        elapsed = time.perf_counter() - started
+
+        failures = [status for _, status, _ in outcomes if status != 200]
+        results.append({
+            'clients': clients,
+            'uploads': args.uploads,
+            'failures': len(failures),
+            'seconds': round(elapsed, 3),
+            'uploads_per_second': round(args.uploads / elapsed, 2),
+            'latency': summarize_latencies([seconds for seconds, _, _ in outcomes]),
+        })
+
+    print(f"{'clients':>8}{'uploads/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'failures':>10}")
+    for result in results:
+        print(f"{result['clients']:>8}{result['uploads_per_second']:>11}{result['latency']['p50_ms']:>10}"
+              f"{result['latency']['p95_ms']:>10}{result['failures']:>10}")
+
+    stored = app.get_db().execute('SELECT COUNT(*) FROM test_cases').fetchone()[0]
+    parameters = {
+        'endpoint': args.endpoint, 'uploads': args.uploads, 'paragraphs': args.paragraphs,
+        'fake_latency': args.latency, 'cases_per_response': args.cases,
+    }
+    return write_results(args.output, 'upload', parameters, {
+        'runs': results,
+        'gemini_calls': fake_gemini.stats['calls'],
+        'test_cases_stored': stored,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Shared helpers for the benchmark scripts: loading the app offline, seeding and reporting"""
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PRIORITIES = ['High', 'Medium', 'Low']
+TEST_TYPES = ['Functional', 'Performance', 'Security', 'Usability', 'Reliability', 'Compatibility', 'Maintainability']
+
+
+def load_app(database_path):
+    """Import app.py against a benchmark database, from a scratch working directory.
+
+    Gemini is replaced by benchmarks/fake_gemini.py, so no API key or
+    network access is needed.
+    """
+    os.environ['DATABASE_PATH'] = database_path
+    os.environ['GEMINI_MODEL_FACTORY'] = 'fake_gemini:FakeGenerativeModel'
+    os.environ.setdefault('GEMINI_API_KEY', 'offline-benchmark')
+    os.chdir(os.path.dirname(database_path))
+    for path in (REPO_ROOT, BENCHMARKS_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    import app
+    app.create_app()
+    return app
+
+
+def seed_test_cases(app, rows, batch_size=5000, seed=0):
+    """Insert ``rows`` synthetic test cases spread over files, priorities and types"""
+    rng = random.Random(seed)
+    words = 'account login password reset email session token upload export report search filter admin user'.split()
+    for start in range(0, rows, batch_size):
+        params = []
+        for index in range(start, min(start + batch_size, rows)):
+            test_case = {
+                'test_case_name': f"Verify {' '.join(rng.sample(words, 3))} case {index}",
+                'description': ' '.join(rng.choices(words, k=30)),
+                'preconditions': '1. User account exists\n2. Mail server is reachable',
+                'test_steps': '\n'.join(f"{step}. {' '.join(rng.choices(words, k=8))}" for step in range(1, 9)),
+                'expected_result': ' '.join(rng.choices(words, k=20)),
+                'priority': rng.choice(PRIORITIES),
+                'test_type': rng.choice(TEST_TYPES),
+            }
+            params.append(app.prepare_test_case(f'spec_{index % 50}.pdf', test_case)[0])
+        with app.transaction() as cursor:
+            cursor.executemany(app.DOCUMENT_ENSURE_SQL, [(f'spec_{index}.pdf',) for index in range(50)])
+            cursor.executemany(app.TEST_CASE_INSERT_SQL, params)
+
+
+def summarize_latencies(seconds):
+    """Latency statistics in milliseconds"""
+    ordered = sorted(seconds)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 3),
+        'p50_ms': round(percentile(0.50) * 1000, 3),
+        'p95_ms': round(percentile(0.95) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(peak * scale / 1024 / 1024, 1)
+
+
+def run_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_results(path, benchmark, parameters, results):
+    """Build the JSON report for one benchmark and write it to ``path`` when given"""
+    report = {'benchmark': benchmark, **run_metadata(), 'parameters': parameters, 'results': results}
+    if path is None:
+        return report
+    with open(path, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f'Wrote {path}')
+    return report
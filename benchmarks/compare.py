@@ -0,0 +1,64 @@
+"""Compare two benchmark result files and show how every timing changed.
+
+    python benchmarks/compare.py baseline.json results.json --threshold 10
+
+Numbers are matched by their path in the JSON (list entries by their
+clients/rows/format/file_type key). Positive changes in time, memory and
+latency are regressions; for throughput (``*_per_second``) lower is worse.
+"""
+import argparse
+import json
+
+LIST_KEYS = ('clients', 'rows', 'format', 'file_type')
+METRIC_SUFFIXES = ('seconds', '_ms', 'rss_mb', '_per_second')
+
+
+def flatten(value, path=''):
+    """Yield (path, number) for every metric in a results document"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f'{path}.{key}' if path else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = index
+            if isinstance(item, dict):
+                label = '/'.join(str(item[key]) for key in LIST_KEYS if key in item) or index
+                if item.get('process_pool'):
+                    label = f'{label}/pool'
+            yield from flatten(item, f'{path}[{label}]')
+    elif isinstance(value, (int, float)) and not isinstance(value, bool) and path.endswith(METRIC_SUFFIXES):
+        yield path, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0, help='only show changes above this many percent')
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline = dict(flatten(json.load(baseline_file)))
+        candidate = dict(flatten(json.load(candidate_file)))
+
+    regressions = 0
+    for path in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[path], candidate[path]
+        if not before:
+            continue
+        change = (after - before) / before * 100
+        if abs(change) < args.threshold:
+            continue
+        worse = change < 0 if path.endswith('_per_second') else change > 0
+        regressions += worse
+        label = 'WORSE ' if worse else 'better' if change else 'same  '
+        print(f"{label} {change:+8.1f}%  {before:>12} -> {after:<12} {path}")
+
+    only_one = baseline.keys() ^ candidate.keys()
+    if only_one:
+        print(f'{len(only_one)} metrics appear in only one file')
+    print(f'{regressions} regressions')
+
+
+if __name__ == '__main__':
+    main()
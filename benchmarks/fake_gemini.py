@@ -0,0 +1,110 @@
+"""Local stand-in for genai.GenerativeModel, so benchmarks never spend API quota.
+
+Point the app at it with GEMINI_MODEL_FACTORY=benchmarks.fake_gemini:FakeGenerativeModel
+(or by setting app.config['GEMINI_MODEL_FACTORY'] to the class). Behaviour is
+tuned with environment variables or configure():
+
+- FAKE_GEMINI_LATENCY - seconds before the response (or the first streamed chunk) arrives (default 0)
+- FAKE_GEMINI_CASES - test cases per response (default 12)
+- FAKE_GEMINI_RESPONSE - path to a JSON file returned verbatim instead of generated cases
+- FAKE_GEMINI_CHUNK_SIZE - characters per streamed chunk (default 64)
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+WORDS = (
+    'account admin audit browser cache checkout config dashboard database email export filter form '
+    'invoice locale login logout mobile network notification order password payment permission profile '
+    'queue report request reset role search session settings signup timeout token upload user'
+).split()
+PRIORITIES = ['High', 'Medium', 'Low']
+TEST_TYPES = ['Functional', 'Performance', 'Security', 'Usability', 'Reliability', 'Compatibility', 'Maintainability']
+
+settings = {
+    'latency': float(os.getenv('FAKE_GEMINI_LATENCY', '0')),
+    'cases': int(os.getenv('FAKE_GEMINI_CASES', '12')),
+    'response_path': os.getenv('FAKE_GEMINI_RESPONSE'),
+    'chunk_size': int(os.getenv('FAKE_GEMINI_CHUNK_SIZE', '64')),
+}
+# Sections numbered by the app's SECTION_MARKER; cases are spread across them
+SECTION_MARKER_PATTERN = re.compile(r'^\[Section (\d+)\]$', re.MULTILINE)
+stats = {'calls': 0, 'prompt_chars': 0}
+_stats_lock = threading.Lock()
+
+
+def configure(**overrides):
+    """Override the FAKE_GEMINI_* settings for this process"""
+    unknown = set(overrides) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    settings.update(overrides)
+
+
+def canned_test_cases(prompt, count):
+    """Test cases derived from the prompt, so different documents get different (non-duplicate) cases.
+
+    When the prompt numbers its sections, each case names one of them, as
+    the prompt asks.
+    """
+    rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).digest())
+    sections = [int(number) for number in SECTION_MARKER_PATTERN.findall(prompt)]
+    test_cases = []
+    for index in range(count):
+        topic = ' '.join(rng.sample(WORDS, 3))
+        test_cases.append({
+            'test_case_name': f'Verify {topic} scenario {index + 1}',
+            'description': f'Checks the {topic} behaviour described in the requirement. ' + ' '.join(rng.choices(WORDS, k=25)),
+            'preconditions': [f'{rng.choice(WORDS).capitalize()} is configured', 'User is signed in'],
+            'test_steps': [f'{step}. ' + ' '.join(rng.choices(WORDS, k=8)) for step in range(1, 7)],
+            'expected_result': 'The system ' + ' '.join(rng.choices(WORDS, k=15)),
+            'priority': rng.choice(PRIORITIES),
+            'test_type': rng.choice(TEST_TYPES),
+        })
+        if sections:
+            test_cases[-1]['section'] = sections[index % len(sections)]
+    return test_cases
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    """Mimics a Gemini response: ``.text`` when complete, iterable chunks when streamed"""
+
+    def __init__(self, text, latency, chunk_size):
+        self.text = text
+        self._latency = latency
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        time.sleep(self._latency)
+        for start in range(0, len(self.text), self._chunk_size):
+            yield FakeChunk(self.text[start:start + self._chunk_size])
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        with _stats_lock:
+            stats['calls'] += 1
+            stats['prompt_chars'] += len(prompt)
+
+        if settings['response_path']:
+            with open(settings['response_path'], encoding='utf-8') as response_file:
+                text = response_file.read()
+        else:
+            text = json.dumps(canned_test_cases(prompt, settings['cases']))
+
+        response = FakeResponse(text, settings['latency'], settings['chunk_size'])
+        if not stream:
+            time.sleep(settings['latency'])
+        return response
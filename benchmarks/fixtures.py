@@ -0,0 +1,80 @@
+"""Synthetic requirement documents for the extraction and upload benchmarks"""
+import random
+
+from docx import Document
+
+SENTENCE_WORDS = (
+    'the system shall allow each registered user to reset a forgotten password through a single use '
+    'link sent by email within one minute and lock the account after five failed login attempts while '
+    'administrators can export audit reports filter sessions by role and revoke tokens from the dashboard'
+).split()
+
+
+def requirement_paragraphs(count, seed=0):
+    """Numbered requirement paragraphs with a heading every ten paragraphs"""
+    rng = random.Random(seed)
+    paragraphs = []
+    for index in range(count):
+        if index % 10 == 0:
+            paragraphs.append(f'{index // 10 + 1}. Feature area {index // 10 + 1}')
+        sentence = ' '.join(rng.choices(SENTENCE_WORDS, k=rng.randint(18, 40)))
+        paragraphs.append(f'REQ-{index + 1:05d}: {sentence.capitalize()}.')
+    return paragraphs
+
+
+def make_txt(path, paragraphs):
+    with open(path, 'w', encoding='utf-8') as output:
+        output.write('\n\n'.join(paragraphs))
+
+
+def make_docx(path, paragraphs):
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(path, paragraphs, lines_per_page=60, line_width=95):
+    """Write a plain text-only PDF (Helvetica, one text object per page) without extra dependencies"""
+    lines = []
+    for paragraph in paragraphs:
+        words, line = paragraph.split(), ''
+        for word in words:
+            if line and len(line) + len(word) + 1 > line_width:
+                lines.append(line)
+                line = word
+            else:
+                line = f'{line} {word}' if line else word
+        lines.extend([line, ''])
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)]
+
+    # Object 1 is the font, 2 the page tree, then a content stream and a page per page
+    objects = [b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>', None]
+    page_ids = []
+    for page in pages:
+        stream = ('BT /F1 10 Tf 40 800 Td 12 TL ' + ' '.join(f"({_pdf_escape(line)}) '" for line in page) + ' ET')
+        stream = stream.encode('latin-1', 'replace')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 1 0 R >> >> /Contents %d 0 R >>' % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % i for i in page_ids), len(page_ids))
+    objects.append(b'<< /Type /Catalog /Pages 2 0 R >>')
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref_offset = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, len(objects), xref_offset)
+    with open(path, 'wb') as pdf_file:
+        pdf_file.write(output)
+    return len(pages)
@@ -0,0 +1,56 @@
+"""Run every benchmark and collect the results into one JSON file.
+
+    python benchmarks/run_all.py --output results.json
+    python benchmarks/run_all.py --quick --output quick.json
+    python benchmarks/compare.py baseline.json results.json
+
+Each benchmark runs in its own process with its own scratch database.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import BENCHMARKS_DIR, run_metadata
+
+# Arguments per benchmark for a full and a quick (smoke) run
+SUITES = {
+    'extraction': (['--paragraphs', '20000'], ['--paragraphs', '2000', '--repeat', '1']),
+    'upload': (['--clients', '1', '4', '16', '--uploads', '32'],
+               ['--clients', '1', '4', '--uploads', '8', '--latency', '0.1']),
+    'list': (['--sizes', '1000', '10000', '100000'], ['--sizes', '1000', '10000', '--repeat', '5']),
+    'export': (['--rows', '100000'], ['--rows', '5000']),
+    'startup': (['--repeat', '5'], ['--repeat', '2']),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='small sizes, for checking that everything runs')
+    parser.add_argument('--only', nargs='+', choices=list(SUITES), help='run only these benchmarks')
+    parser.add_argument('--output', required=True, help='write the combined results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='case10x-bench-')
+    for name in args.only or SUITES:
+        full_args, quick_args = SUITES[name]
+        output = os.path.join(workdir, f'{name}.json')
+        print(f'== {name}')
+        subprocess.run(
+            [sys.executable, os.path.join(BENCHMARKS_DIR, f'bench_{name}.py'),
+             *(quick_args if args.quick else full_args), '--output', output],
+            check=True
+        )
+        with open(output) as suite_output:
+            results[name] = json.load(suite_output)
+
+    with open(args.output, 'w') as output:
+        json.dump({**run_metadata(), 'quick': args.quick, 'suites': results}, output, indent=2)
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
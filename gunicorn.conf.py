@@ -0,0 +1,43 @@
+"""Gunicorn settings for running Case10X in production.
+
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py
+
+Flask is a WSGI app, so gunicorn's threaded workers fit it directly; an ASGI
+server such as uvicorn would only add a translation layer. Every value can be
+overridden with the GUNICORN_* variables below.
+"""
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Threaded workers: uploads spend most of their time waiting for Gemini
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Import the app and migrate the database once in the master, then fork
+preload_app = True
+
+# Streamed uploads of large documents can take minutes
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '300'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth from parsing large files
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    # The Gemini client is not fork-safe, so it is created in each worker
+    # rather than preloaded; do it here so the first upload does not pay for it
+    from app import get_gemini_model
+    try:
+        get_gemini_model()
+    except Exception as e:
+        worker.log.warning(f'Could not create the Gemini model ahead of the first request: {e}')
@@ -5,6 +5,17 @@ let currentTestCases = [];
 let currentEditingId = null;
 let currentFilter = 'all';
 let currentFilename = null; // Track the current file
+let selectedFiles = []; // Files picked or dropped, waiting for "Generate"
+let currentQuery = ''; // Full-text search, empty for the plain list
+let searchTimer = null;
+let nextCursor = null; // Keyset cursor for the next page of test cases
+let loadingPage = false;
+let listGeneration = 0; // Bumped on every reload so stale page responses are dropped
+let listVersion = null; // Server version the loaded list reflects, for delta syncs
+let sentinelVisible = false;
+const selectedIds = new Set(); // Test cases ticked for bulk actions
+const PAGE_SIZE = 50;
+const LIST_FIELDS = 'id,requirement_file,test_case_name,description,preconditions,test_steps,expected_result,priority,test_type';
 
 // ===================================
 // DOM Elements
@@ -17,11 +28,21 @@ const fileName = document.getElementById('fileName');
 const removeFileBtn = document.getElementById('removeFileBtn');
 const generateBtn = document.getElementById('generateBtn');
 const loadingIndicator = document.getElementById('loadingIndicator');
+const loadingSubtext = document.getElementById('loadingSubtext');
 const statsSection = document.getElementById('statsSection');
 const testCasesSection = document.getElementById('testCasesSection');
 const testCasesGrid = document.getElementById('testCasesGrid');
+const loadMoreSentinel = document.getElementById('loadMoreSentinel');
 const exportBtn = document.getElementById('exportBtn');
 const refreshBtn = document.getElementById('refreshBtn');
+const searchInput = document.getElementById('searchInput');
+const bulkActions = document.getElementById('bulkActions');
+const selectAllCheckbox = document.getElementById('selectAllCheckbox');
+const selectedCount = document.getElementById('selectedCount');
+const bulkPriority = document.getElementById('bulkPriority');
+const bulkTestType = document.getElementById('bulkTestType');
+const bulkDeleteBtn = document.getElementById('bulkDeleteBtn');
+const clearSelectionBtn = document.getElementById('clearSelectionBtn');
 const editModal = document.getElementById('editModal');
 const closeModalBtn = document.getElementById('closeModalBtn');
 const cancelEditBtn = document.getElementById('cancelEditBtn');
@@ -56,50 +77,66 @@ uploadArea.addEventListener('drop', (e) => {
 
     const files = e.dataTransfer.files;
     if (files.length > 0) {
-        handleFileSelect(files[0]);
+        handleFileSelect(files);
     }
 });
 
 fileInput.addEventListener('change', (e) => {
     if (e.target.files.length > 0) {
-        handleFileSelect(e.target.files[0]);
+        handleFileSelect(e.target.files);
     }
 });
 
 removeFileBtn.addEventListener('click', (e) => {
     e.stopPropagation();
-    fileInput.value = '';
+    clearSelectedFiles();
     uploadArea.style.display = 'block';
     selectedFile.style.display = 'none';
 });
 
-function handleFileSelect(file) {
+function handleFileSelect(files) {
     const allowedTypes = ['application/pdf', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain'];
 
-    if (!allowedTypes.includes(file.type)) {
-        showToast('Invalid file type. Please upload PDF, DOCX, or TXT files.');
-        return;
+    const accepted = [];
+    for (const file of files) {
+        if (!allowedTypes.includes(file.type)) {
+            showToast(`Skipped "${file.name}": please upload PDF, DOCX, or TXT files.`);
+        } else if (file.size > 16 * 1024 * 1024) {
+            showToast(`Skipped "${file.name}": file size exceeds 16MB limit.`);
+        } else {
+            accepted.push(file);
+        }
     }
-
-    if (file.size > 16 * 1024 * 1024) {
-        showToast('File size exceeds 16MB limit.');
+    if (accepted.length === 0) {
         return;
     }
 
-    fileName.textContent = file.name;
+    selectedFiles = accepted;
+    fileName.textContent = accepted.length === 1
+        ? accepted[0].name
+        : `${accepted.length} files: ${accepted.map(file => file.name).join(', ')}`;
     uploadArea.style.display = 'none';
     selectedFile.style.display = 'block';
 }
 
+function clearSelectedFiles() {
+    selectedFiles = [];
+    fileInput.value = '';
+}
+
 // ===================================
 // Generate Test Cases
 // ===================================
 generateBtn.addEventListener('click', async () => {
-    const file = fileInput.files[0];
-    if (!file) {
+    if (selectedFiles.length === 0) {
         showToast('Please select a file first.');
         return;
     }
+    if (selectedFiles.length > 1) {
+        await uploadBatch(selectedFiles);
+        return;
+    }
+    const file = selectedFiles[0];
 
     const formData = new FormData();
     formData.append('file', file);
@@ -107,63 +144,207 @@ generateBtn.addEventListener('click', async () => {
     // Show loading
     selectedFile.style.display = 'none';
     loadingIndicator.style.display = 'block';
+    loadingSubtext.textContent = STAGE_MESSAGES.extracting;
 
+    let received = 0;
     try {
-        const response = await fetch('/upload', {
+        const response = await fetch('/upload/stream', {
             method: 'POST',
             body: formData
         });
 
-        const data = await response.json();
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error || 'Failed to generate test cases');
+        }
 
-        if (response.ok) {
-            const message = data.replaced
-                ? `Replaced previous test cases. Generated ${data.test_cases.length} new test cases for "${data.filename}"`
-                : `Successfully generated ${data.test_cases.length} test cases for "${data.filename}"`;
-            showToast(message);
-            loadingIndicator.style.display = 'none';
-
-            // Reset upload area
-            fileInput.value = '';
-            uploadArea.style.display = 'block';
+        const data = await readUploadStream(response, (tc) => {
+            if (received === 0) {
+                startStreamingDisplay();
+            }
+            received++;
+            appendTestCase(tc);
+            loadingSubtext.textContent = `${received} test cases generated so far...`;
+        });
 
-            // Load and display test cases for this file only
-            currentFilename = data.filename;
+        let message = data.replaced
+            ? `Replaced previous test cases. Generated ${data.count} new test cases for "${data.filename}"`
+            : `Successfully generated ${data.count} test cases for "${data.filename}"`;
+        if (data.duplicates_skipped) {
+            message += ` (${data.duplicates_skipped} near-duplicates skipped)`;
+        }
+        if (data.kept) {
+            message += `. Kept ${data.kept} test cases from unchanged sections`;
+        }
+        showToast(message);
+        loadingIndicator.style.display = 'none';
+
+        // Reset upload area
+        clearSelectedFiles();
+        uploadArea.style.display = 'block';
+
+        if (data.kept) {
+            // Show the kept test cases alongside the newly generated ones
             await loadTestCases(data.filename);
         } else {
-            throw new Error(data.error || 'Failed to generate test cases');
+            currentFilename = data.filename;
         }
     } catch (error) {
         console.error('Error:', error);
         showToast('Error: ' + error.message);
         loadingIndicator.style.display = 'none';
-        selectedFile.style.display = 'block';
+        if (received > 0) {
+            // Keep the test cases that were already saved before the failure
+            clearSelectedFiles();
+            uploadArea.style.display = 'block';
+        } else {
+            selectedFile.style.display = 'block';
+        }
     }
 });
 
 // ===================================
-// Load Test Cases
+// Streaming Upload
+// ===================================
+const STAGE_MESSAGES = {
+    extracting: 'Extracting text from your document...',
+    generating: 'Generating test cases with AI (they will appear as they are ready)...'
+};
+
+async function readUploadStream(response, onTestCase) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const handleLine = (line) => {
+        if (!line.trim()) return null;
+        const event = JSON.parse(line);
+        if (event.event === 'stage') {
+            loadingSubtext.textContent = STAGE_MESSAGES[event.stage] || loadingSubtext.textContent;
+        } else if (event.event === 'test_case') {
+            onTestCase(event.test_case);
+        } else if (event.event === 'error') {
+            throw new Error(event.error || 'Failed to generate test cases');
+        } else if (event.event === 'completed') {
+            return event;
+        }
+        return null;
+    };
+
+    let completed = null;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            completed = handleLine(line) || completed;
+        }
+    }
+    completed = handleLine(buffer) || completed;
+
+    if (!completed) {
+        throw new Error('Connection closed before all test cases were generated');
+    }
+    return completed;
+}
+
+function startStreamingDisplay() {
+    listGeneration++;
+    currentTestCases = [];
+    nextCursor = null;
+    clearSelection();
+    currentFilter = 'all';
+    currentQuery = '';
+    searchInput.value = '';
+    document.querySelectorAll('.filter-btn').forEach(btn => {
+        btn.classList.toggle('active', btn.dataset.filter === 'all');
+    });
+    testCasesGrid.innerHTML = '';
+    statsSection.style.display = 'grid';
+    document.getElementById('typeBreakdown').style.display = 'block';
+    document.getElementById('filterButtons').style.display = 'flex';
+    testCasesSection.style.display = 'block';
+}
+
+function appendTestCase(tc) {
+    currentTestCases.push(tc);
+    testCasesGrid.insertAdjacentHTML('beforeend', renderTestCaseCard(tc));
+    updateStats(summarizeTestCases(currentTestCases));
+}
+
+// ===================================
+// Batch Upload
 // ===================================
-async function loadTestCases(filename = null) {
+async function uploadBatch(files) {
+    const formData = new FormData();
+    files.forEach(file => formData.append('files', file));
+
+    // Show loading
+    selectedFile.style.display = 'none';
+    loadingIndicator.style.display = 'block';
+    loadingSubtext.textContent = `Generating test cases for ${files.length} files...`;
+
     try {
-        // Build URL with optional filename parameter
-        let url = '/test-cases';
-        if (filename) {
-            url += `?filename=${encodeURIComponent(filename)}`;
-            currentFilename = filename;
+        const response = await fetch('/upload/batch', {
+            method: 'POST',
+            body: formData
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to process files');
         }
 
-        const response = await fetch(url);
-        const testCases = await response.json();
+        let message = `Generated test cases for ${data.succeeded} of ${data.files.length} files`;
+        const failures = data.files.filter(result => result.status === 'failed');
+        if (failures.length > 0) {
+            message += `. Failed: ${failures.map(result => `${result.filename} (${result.error})`).join(', ')}`;
+        }
+        showToast(message);
+        loadingIndicator.style.display = 'none';
+
+        // Reset upload area
+        clearSelectedFiles();
+        uploadArea.style.display = 'block';
+
+        // Show the test cases of every file in the batch
+        currentFilter = 'all';
+        document.querySelectorAll('.filter-btn').forEach(btn => {
+            btn.classList.toggle('active', btn.dataset.filter === 'all');
+        });
+        await loadTestCases(null);
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error: ' + error.message);
+        loadingIndicator.style.display = 'none';
+        selectedFile.style.display = 'block';
+    }
+}
 
-        currentTestCases = testCases;
-        displayTestCases(testCases);
-        updateStats(testCases);
+// ===================================
+// Load Test Cases
+// ===================================
+async function loadTestCases(filename = currentFilename) {
+    try {
+        currentFilename = filename;
+        currentTestCases = [];
+        nextCursor = null;
+        listVersion = null;
+        listGeneration++;
+        testCasesGrid.innerHTML = '';
+        clearSelection();
+
+        const [summary] = await Promise.all([refreshSummary(), loadNextPage(true)]);
+        if (currentTestCases.length === 0) {
+            displayTestCases([]);
+        }
 
         // Show sections
         statsSection.style.display = 'grid';
-        document.getElementById('typeBreakdown').style.display = testCases.length > 0 ? 'block' : 'none';
-        document.getElementById('filterButtons').style.display = testCases.length > 0 ? 'flex' : 'none';
+        document.getElementById('typeBreakdown').style.display = summary.total > 0 ? 'block' : 'none';
+        document.getElementById('filterButtons').style.display = summary.total > 0 ? 'flex' : 'none';
         testCasesSection.style.display = 'block';
     } catch (error) {
         console.error('Error loading test cases:', error);
@@ -171,6 +352,129 @@ async function loadTestCases(filename = null) {
     }
 }
 
+function buildListParams(extra = {}) {
+    const params = new URLSearchParams(extra);
+    if (currentFilename) {
+        params.set('filename', currentFilename);
+    }
+    return params;
+}
+
+async function refreshSummary() {
+    const response = await fetch(`/test-cases/summary?${buildListParams()}`);
+    const summary = await response.json();
+    if (!response.ok) {
+        throw new Error(summary.error || 'Failed to load summary');
+    }
+    updateStats(summary);
+    return summary;
+}
+
+async function loadNextPage(first = false) {
+    if (!first && (loadingPage || !nextCursor)) return;
+
+    const generation = listGeneration;
+    loadingPage = true;
+    try {
+        const params = buildListParams({ limit: PAGE_SIZE, fields: LIST_FIELDS });
+        if (currentFilter !== 'all') {
+            params.set('test_type', currentFilter);
+        }
+        if (nextCursor) {
+            params.set('cursor', nextCursor);
+        }
+
+        // Searches are ranked by relevance on the server and page the same way
+        let url = '/test-cases';
+        if (currentQuery) {
+            params.set('q', currentQuery);
+            url = '/test-cases/search';
+        }
+        const response = await fetch(`${url}?${params}`);
+        const page = await response.json();
+        if (!response.ok) {
+            throw new Error(page.error || 'Failed to load test cases');
+        }
+        if (generation !== listGeneration) return; // A newer reload replaced this list
+
+        if (first) {
+            listVersion = response.headers.get('X-Test-Cases-Version');
+        }
+        currentTestCases.push(...page.test_cases);
+        testCasesGrid.insertAdjacentHTML('beforeend', page.test_cases.map(renderTestCaseCard).join(''));
+        nextCursor = page.next_cursor;
+    } finally {
+        if (generation === listGeneration) {
+            loadingPage = false;
+        }
+    }
+
+    // Keep filling the screen while the end of the list is still visible
+    if (sentinelVisible && nextCursor) {
+        await loadNextPage();
+    }
+}
+
+// Fetch only what changed since the list was loaded and patch it in place
+async function syncTestCases() {
+    if (listVersion === null) {
+        return loadTestCases(currentFilename);
+    }
+
+    const generation = listGeneration;
+    const params = buildListParams({ since: listVersion, fields: LIST_FIELDS });
+    if (currentFilter !== 'all') {
+        params.set('test_type', currentFilter);
+    }
+    const response = await fetch(`/test-cases?${params}`);
+    const delta = await response.json();
+    if (!response.ok) {
+        throw new Error(delta.error || 'Failed to sync test cases');
+    }
+    if (generation !== listGeneration) return;
+    if (delta.reset) {
+        // Too far behind (or the database was cleared): start over
+        return loadTestCases(currentFilename);
+    }
+
+    // IDs only grow, so unknown rows above the newest loaded one are new;
+    // older unknown rows arrive with their page
+    const newestId = currentTestCases.reduce((max, tc) => Math.max(max, tc.id), 0);
+    const added = [];
+    delta.test_cases.forEach(changed => {
+        const index = currentTestCases.findIndex(tc => tc.id === changed.id);
+        if (index !== -1) {
+            currentTestCases[index] = changed;
+            const card = testCasesGrid.querySelector(`[data-id="${changed.id}"]`);
+            if (card) card.outerHTML = renderTestCaseCard(changed);
+        } else if (changed.id > newestId && !currentQuery) {
+            added.push(changed);
+        }
+    });
+    if (added.length > 0) {
+        if (currentTestCases.length === 0) {
+            testCasesGrid.innerHTML = '';
+        }
+        currentTestCases.unshift(...added);
+        testCasesGrid.insertAdjacentHTML('afterbegin', added.map(renderTestCaseCard).join(''));
+    }
+    removeTestCaseCards(delta.deleted);
+    updateSelectionBar();
+    listVersion = delta.version;
+}
+
+// Load the next page when the end of the grid scrolls into view
+const pageObserver = new IntersectionObserver((entries) => {
+    sentinelVisible = entries.some(entry => entry.isIntersecting);
+    if (sentinelVisible && nextCursor) {
+        loadNextPage().catch(error => {
+            console.error('Error loading test cases:', error);
+            showToast('Error loading test cases');
+        });
+    }
+}, { rootMargin: '400px' });
+pageObserver.observe(loadMoreSentinel);
+
 // ===================================
 // Display Test Cases
 // ===================================
@@ -184,11 +488,15 @@ function displayTestCases(testCases) {
         return;
     }
 
-    testCasesGrid.innerHTML = testCases.map(tc => `
-        <div class="test-case-card" data-id="${tc.id}">
+    testCasesGrid.innerHTML = testCases.map(renderTestCaseCard).join('');
+}
+
+function renderTestCaseCard(tc) {
+    return `
+        <div class="test-case-card${selectedIds.has(tc.id) ? ' selected' : ''}" data-id="${tc.id}">
             <div class="test-case-header">
                 <div class="test-case-title">
-                    <h3>${escapeHtml(tc.test_case_name)}</h3>
+                    <h3><input type="checkbox" class="select-checkbox" data-id="${tc.id}" title="Select"${selectedIds.has(tc.id) ? ' checked' : ''}>${escapeHtml(tc.test_case_name)}</h3>
                     <div class="test-case-meta">
                         <span class="badge badge-priority-${tc.priority.toLowerCase()}">${tc.priority}</span>
                         <span class="badge badge-type">${tc.test_type}</span>
@@ -230,30 +538,32 @@ function displayTestCases(testCases) {
                 </div>
             </div>
         </div>
-    `).join('');
+    `;
 }
 
 // ===================================
 // Update Statistics
 // ===================================
-function updateStats(testCases) {
-    const total = testCases.length;
-    const high = testCases.filter(tc => tc.priority === 'High').length;
+function summarizeTestCases(testCases) {
+    const summary = { total: testCases.length, by_priority: {}, by_test_type: {} };
+    testCases.forEach(tc => {
+        summary.by_priority[tc.priority] = (summary.by_priority[tc.priority] || 0) + 1;
+        summary.by_test_type[tc.test_type] = (summary.by_test_type[tc.test_type] || 0) + 1;
+    });
+    return summary;
+}
+
+function updateStats(summary) {
+    const total = summary.total;
+    const high = summary.by_priority.High || 0;
+    const countType = (type) => summary.by_test_type[type] || 0;
 
     // Define non-functional test types
     const nonFunctionalTypes = ['Performance', 'Security', 'Usability', 'Reliability', 'Compatibility', 'Maintainability'];
 
     // Count functional vs non-functional
-    const functional = testCases.filter(tc => !nonFunctionalTypes.includes(tc.test_type)).length;
-    const nonFunctional = testCases.filter(tc => nonFunctionalTypes.includes(tc.test_type)).length;
-
-    // Count by specific non-functional types
-    const performance = testCases.filter(tc => tc.test_type === 'Performance').length;
-    const security = testCases.filter(tc => tc.test_type === 'Security').length;
-    const usability = testCases.filter(tc => tc.test_type === 'Usability').length;
-    const reliability = testCases.filter(tc => tc.test_type === 'Reliability').length;
-    const compatibility = testCases.filter(tc => tc.test_type === 'Compatibility').length;
-    const maintainability = testCases.filter(tc => tc.test_type === 'Maintainability').length;
+    const nonFunctional = nonFunctionalTypes.reduce((sum, type) => sum + countType(type), 0);
+    const functional = total - nonFunctional;
 
     // Update main stats
     document.getElementById('totalTestCases').textContent = total;
@@ -262,12 +572,12 @@ function updateStats(testCases) {
     document.getElementById('highPriority').textContent = high;
 
     // Update type breakdown
-    document.getElementById('performanceCount').textContent = performance;
-    document.getElementById('securityCount').textContent = security;
-    document.getElementById('usabilityCount').textContent = usability;
-    document.getElementById('reliabilityCount').textContent = reliability;
-    document.getElementById('compatibilityCount').textContent = compatibility;
-    document.getElementById('maintainabilityCount').textContent = maintainability;
+    document.getElementById('performanceCount').textContent = countType('Performance');
+    document.getElementById('securityCount').textContent = countType('Security');
+    document.getElementById('usabilityCount').textContent = countType('Usability');
+    document.getElementById('reliabilityCount').textContent = countType('Reliability');
+    document.getElementById('compatibilityCount').textContent = countType('Compatibility');
+    document.getElementById('maintainabilityCount').textContent = countType('Maintainability');
 }
 
 // ===================================
@@ -308,7 +618,10 @@ async function deleteTestCase(id) {
 
         if (response.ok) {
             showToast('Test case deleted successfully');
-            await loadTestCases();
+            // Patch the loaded list instead of re-downloading it
+            removeTestCaseCards([id]);
+            updateSelectionBar();
+            await refreshSummary();
         } else {
             throw new Error('Failed to delete test case');
         }
@@ -318,6 +631,141 @@ async function deleteTestCase(id) {
     }
 }
 
+// ===================================
+// Bulk Actions
+// ===================================
+function updateSelectionBar() {
+    bulkActions.style.display = selectedIds.size > 0 ? 'flex' : 'none';
+    selectedCount.textContent = `${selectedIds.size} selected`;
+    selectAllCheckbox.checked = currentTestCases.length > 0 && currentTestCases.every(tc => selectedIds.has(tc.id));
+}
+
+function setSelected(id, selected) {
+    if (selected) {
+        selectedIds.add(id);
+    } else {
+        selectedIds.delete(id);
+    }
+    const card = testCasesGrid.querySelector(`[data-id="${id}"]`);
+    if (card) {
+        card.classList.toggle('selected', selected);
+        card.querySelector('.select-checkbox').checked = selected;
+    }
+}
+
+function clearSelection() {
+    selectedIds.clear();
+    testCasesGrid.querySelectorAll('.test-case-card.selected').forEach(card => {
+        card.classList.remove('selected');
+        card.querySelector('.select-checkbox').checked = false;
+    });
+    updateSelectionBar();
+}
+
+testCasesGrid.addEventListener('change', (e) => {
+    if (!e.target.classList.contains('select-checkbox')) return;
+    setSelected(parseInt(e.target.dataset.id, 10), e.target.checked);
+    updateSelectionBar();
+});
+
+// Selects the test cases loaded so far; scrolling loads more
+selectAllCheckbox.addEventListener('change', () => {
+    currentTestCases.forEach(tc => setSelected(tc.id, selectAllCheckbox.checked));
+    updateSelectionBar();
+});
+
+clearSelectionBtn.addEventListener('click', clearSelection);
+
+function removeTestCaseCards(ids) {
+    const removed = new Set(ids);
+    currentTestCases = currentTestCases.filter(tc => !removed.has(tc.id));
+    removed.forEach(id => {
+        selectedIds.delete(id);
+        const card = testCasesGrid.querySelector(`[data-id="${id}"]`);
+        if (card) card.remove();
+    });
+    if (currentTestCases.length === 0 && !nextCursor) {
+        displayTestCases([]);
+    }
+}
+
+async function bulkUpdateSelected(changes) {
+    try {
+        const response = await fetch('/test-cases', {
+            method: 'PATCH',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ids: [...selectedIds], changes })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to update test cases');
+        }
+
+        // Patch only the returned rows instead of re-downloading the list
+        const hidden = [];
+        data.test_cases.forEach(updated => {
+            const index = currentTestCases.findIndex(tc => tc.id === updated.id);
+            if (index === -1) return;
+            if (currentFilter !== 'all' && updated.test_type !== currentFilter) {
+                hidden.push(updated.id);
+                return;
+            }
+            currentTestCases[index] = updated;
+            const card = testCasesGrid.querySelector(`[data-id="${updated.id}"]`);
+            if (card) card.outerHTML = renderTestCaseCard(updated);
+        });
+        removeTestCaseCards(hidden);
+        updateSelectionBar();
+        showToast(`Updated ${data.updated} test cases`);
+        await refreshSummary();
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error: ' + error.message);
+    }
+}
+
+bulkPriority.addEventListener('change', async () => {
+    if (!bulkPriority.value) return;
+    await bulkUpdateSelected({ priority: bulkPriority.value });
+    bulkPriority.value = '';
+});
+
+bulkTestType.addEventListener('change', async () => {
+    if (!bulkTestType.value) return;
+    await bulkUpdateSelected({ test_type: bulkTestType.value });
+    bulkTestType.value = '';
+});
+
+bulkDeleteBtn.addEventListener('click', async () => {
+    if (!confirm(`Are you sure you want to delete ${selectedIds.size} test cases?`)) {
+        return;
+    }
+
+    try {
+        const response = await fetch('/test-cases/bulk-delete', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ids: [...selectedIds] })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to delete test cases');
+        }
+
+        removeTestCaseCards(data.ids);
+        clearSelection();
+        showToast(`Deleted ${data.deleted} test cases`);
+        await refreshSummary();
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error: ' + error.message);
+    }
+});
+
 // ===================================
 // Modal Handlers
 // ===================================
@@ -338,7 +786,7 @@ editModal.addEventListener('click', (e) => {
 editForm.addEventListener('submit', async (e) => {
     e.preventDefault();
 
-    const id = document.getElementById('editTestCaseId').value;
+    const id = parseInt(document.getElementById('editTestCaseId').value, 10);
     const updatedTestCase = {
         test_case_name: document.getElementById('editTestCaseName').value,
         description: document.getElementById('editDescription').value,
@@ -361,7 +809,9 @@ editForm.addEventListener('submit', async (e) => {
         if (response.ok) {
             showToast('Test case updated successfully');
             editModal.classList.remove('active');
-            await loadTestCases();
+
+            // Patch the changed rows in place instead of re-downloading the list
+            await Promise.all([syncTestCases(), refreshSummary()]);
         } else {
             throw new Error('Failed to update test case');
         }
@@ -376,7 +826,12 @@ editForm.addEventListener('submit', async (e) => {
 // ===================================
 exportBtn.addEventListener('click', async () => {
     try {
-        window.location.href = '/export';
+        // Export what is on screen: the current file and type filter
+        const params = buildListParams();
+        if (currentFilter !== 'all') {
+            params.set('test_type', currentFilter);
+        }
+        window.location.href = `/export?${params}`;
         showToast('Exporting test cases to Excel...');
     } catch (error) {
         console.error('Error:', error);
@@ -403,7 +858,10 @@ refreshBtn.addEventListener('click', async () => {
             showToast(data.message);
 
             // Clear the display
+            listGeneration++;
             currentTestCases = [];
+            nextCursor = null;
+            clearSelection();
             testCasesGrid.innerHTML = `
                 <div style="text-align: center; padding: 3rem; color: var(--text-muted);">
                     <p style="font-size: 1.2rem;">No test cases yet. Upload a requirement document to get started!</p>
@@ -411,7 +869,7 @@ refreshBtn.addEventListener('click', async () => {
             `;
 
             // Update stats
-            updateStats([]);
+            updateStats(summarizeTestCases([]));
 
             // Hide the sections
             statsSection.style.display = 'none';
@@ -440,15 +898,30 @@ document.addEventListener('click', (e) => {
         const filter = e.target.dataset.filter;
         currentFilter = filter;
 
-        // Filter and display
-        const filteredCases = filter === 'all'
-            ? currentTestCases
-            : currentTestCases.filter(tc => tc.test_type === filter);
-
-        displayTestCases(filteredCases);
+        // Reload from the server, which filters and pages the list
+        loadTestCases(currentFilename);
     }
 });
 
+// ===================================
+// Search Test Cases
+// ===================================
+searchInput.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+        currentQuery = searchInput.value.trim();
+        loadTestCases(currentFilename);
+    }, 250);
+});
+
+// Pick up changes made elsewhere (other tabs, background jobs) on return
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState !== 'visible' || testCasesSection.style.display === 'none') return;
+    Promise.all([syncTestCases(), refreshSummary()]).catch(error => {
+        console.error('Error syncing test cases:', error);
+    });
+});
+
 // ===================================
 // Toast Notification
 // ===================================
@@ -485,5 +958,5 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Initialize with empty state
     currentTestCases = [];
     displayTestCases([]);
-    updateStats([]);
+    updateStats(summarizeTestCases([]));
 });
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as case10x
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app module, set up on a fresh database and uploads folder in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(case10x, '_app_ready', False)
+    monkeypatch.setitem(case10x.app.config, 'DATABASE', str(tmp_path / 'database.db'))
+    monkeypatch.setitem(case10x.app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setitem(case10x.app.config, 'STORAGE_JANITOR_INTERVAL', 0)
+    case10x._reset_db_connections()
+    case10x.create_app()
+    yield case10x
+    case10x._reset_db_connections()
+
+
+@pytest.fixture
+def gemini(app, monkeypatch):
+    """The fake Gemini model from benchmarks/, with its call counters reset"""
+    from benchmarks import fake_gemini
+
+    monkeypatch.setitem(app.app.config, 'GEMINI_MODEL_FACTORY', fake_gemini.FakeGenerativeModel)
+    monkeypatch.setitem(fake_gemini.stats, 'calls', 0)
+    monkeypatch.setitem(fake_gemini.settings, 'cases', 3)
+    return fake_gemini
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture
+def test_case_id(app):
+    with app.transaction() as cursor:
+        app.insert_test_cases(cursor, 'spec.txt', [{'test_case_name': 'Log in'}])
+    return app.get_db().execute('SELECT id FROM test_cases').fetchone()[0]
+
+
+@pytest.mark.parametrize('bad_id', [True, False, '1', 1.0, None])
+def test_bulk_update_rejects_ids_that_are_not_integers(client, test_case_id, bad_id):
+    response = client.patch('/test-cases', json={'updates': [{'id': bad_id, 'priority': 'Low'}]})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Every update needs an integer id'
+
+
+def test_bulk_update_applies_per_case_changes(client, test_case_id):
+    response = client.patch('/test-cases', json={'updates': [{'id': test_case_id, 'priority': 'Low'}]})
+
+    assert response.status_code == 200
+    assert response.get_json()['test_cases'][0]['priority'] == 'Low'
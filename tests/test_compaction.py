@@ -0,0 +1,48 @@
+REQUIREMENTS = [
+    'Users sign in with their email address and password.',
+    'Accounts are locked after repeated failed sign-ins.',
+    'Administrators can unlock accounts from the console.',
+    'Password resets are sent to the registered email address.',
+]
+
+
+def test_numeric_lines_in_unpaged_text_are_kept(app):
+    text = (
+        'Maximum failed login attempts:\n5\n\n'
+        'Session timeout in minutes:\n30\n\n'
+        'Password history depth:\n(12)\n\n'
+        'Required MFA factors:\n3/4\n'
+    )
+    compacted, stats = app.compact_requirement_text(text)
+
+    assert stats['page_number_lines'] == 0
+    assert stats['toc_lines'] == 0
+    for value in ('5', '30', '(12)', '3/4'):
+        assert value in compacted.split('\n')
+
+
+def test_numeric_table_cells_inside_pdf_pages_are_kept(app):
+    pages = [
+        f'Security requirements\n{requirement}\nAttempts\n5\nWindow (minutes)\n30\nApplies to: {requirement.lower()}\n{number}\n'
+        for number, requirement in enumerate(REQUIREMENTS, 1)
+    ]
+    compacted, stats = app.compact_requirement_text(app.PAGE_BREAK.join(pages))
+
+    lines = compacted.split('\n')
+    assert lines.count('5') == len(pages)
+    assert lines.count('30') == len(pages)
+    assert 'Security requirements' not in lines
+    assert stats['header_footer_lines'] + stats['page_number_lines'] == 2 * len(pages)
+
+
+def test_page_furniture_is_removed_from_page_edges(app):
+    pages = [
+        f'ACME Corp - Confidential\nSection {number}\n{requirement}\nSee the glossary for terms.\nPage {number} of 4\n'
+        for number, requirement in enumerate(REQUIREMENTS, 1)
+    ]
+    compacted, stats = app.compact_requirement_text(app.PAGE_BREAK.join(pages))
+
+    assert 'Confidential' not in compacted
+    assert 'Page 2 of 4' not in compacted
+    for requirement in REQUIREMENTS:
+        assert requirement in compacted
@@ -0,0 +1,43 @@
+import threading
+
+
+def test_database_runs_in_wal_mode(app):
+    assert app.get_db().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_readers_are_not_blocked_by_an_open_write_transaction(app):
+    with app.transaction() as cursor:
+        app.insert_test_cases(cursor, 'spec.txt', [{'test_case_name': 'Committed case'}])
+
+    writer_holds_lock = threading.Event()
+    release_writer = threading.Event()
+
+    def writer():
+        # BEGIN IMMEDIATE takes the write lock, as an upload's save stage does
+        with app.transaction() as cursor:
+            app.insert_test_cases(cursor, 'spec.txt', [{'test_case_name': 'Uncommitted case'}])
+            writer_holds_lock.set()
+            release_writer.wait(10)
+
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    try:
+        assert writer_holds_lock.wait(5)
+        read = {}
+
+        def reader():
+            rows = app.get_db().execute('SELECT test_case_name FROM test_case_details').fetchall()
+            read['names'] = [row[0] for row in rows]
+
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+        reader_thread.join(timeout=1)
+
+        assert not reader_thread.is_alive(), 'reader was blocked by the writer'
+        assert read['names'] == ['Committed case']
+    finally:
+        release_writer.set()
+        writer_thread.join()
+
+    names = [row[0] for row in app.get_db().execute('SELECT test_case_name FROM test_cases ORDER BY id')]
+    assert names == ['Committed case', 'Uncommitted case']
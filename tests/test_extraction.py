@@ -0,0 +1,17 @@
+from benchmarks import fixtures
+
+
+def test_process_pool_extracts_the_same_text(app, tmp_path, monkeypatch):
+    path = str(tmp_path / 'spec.pdf')
+    fixtures.make_pdf(path, fixtures.requirement_paragraphs(120), lines_per_page=20)
+    in_thread = app.extract_text_from_pdf(path)
+
+    monkeypatch.setitem(app.app.config, 'EXTRACTION_PROCESS_POOL', True)
+    monkeypatch.setitem(app.app.config, 'EXTRACTION_PARALLEL_MIN_PAGES', 2)
+    monkeypatch.setitem(app.app.config, 'EXTRACTION_PAGES_PER_TASK', 5)
+    monkeypatch.setitem(app.app.config, 'EXTRACTION_WORKERS', 2)
+    pooled = app.extract_text_from_pdf(path)
+
+    assert in_thread.count(app.PAGE_BREAK) > 5
+    assert pooled == in_thread
+    assert app.get_extraction_executor()._mp_context.get_start_method() in ('forkserver', 'spawn')
@@ -0,0 +1,135 @@
+import io
+import re
+
+import pytest
+
+SECTIONS = {
+    'Login': 'Users sign in with their email address and password.',
+    'Lockout': 'Accounts are locked after five failed sign-ins in ten minutes.',
+    'Password Reset': 'A reset link is emailed and expires after one hour.',
+    'Audit Log': 'Every sign-in attempt is written to the audit log.',
+}
+
+
+@pytest.fixture(autouse=True)
+def small_sections(app, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'INCREMENTAL_REGENERATION', True)
+    monkeypatch.setitem(app.app.config, 'INCREMENTAL_MIN_SECTION_TOKENS', 1)
+    monkeypatch.setitem(app.app.config, 'DEDUP_ENABLED', False)
+
+
+def document(**changes):
+    sections = {**SECTIONS, **changes}
+    return ''.join(f'## {title}\n{body}\n\n' for title, body in sections.items()).encode()
+
+
+def upload(client, text, **flags):
+    response = client.post('/upload', data={'file': (io.BytesIO(text), 'auth.txt'), **flags},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_first_upload_of_a_small_document_is_one_call(client, gemini):
+    result = upload(client, document())
+
+    assert gemini.stats['calls'] == 1
+    assert result['chunks'] == 1
+    assert result['sections']['regenerated'] == len(SECTIONS)
+
+
+def test_chunked_flag_batches_sections_by_token_budget(app, client, gemini, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'CHUNK_TOKEN_BUDGET', 30)
+    result = upload(client, document(), chunked='1')
+
+    assert 1 < gemini.stats['calls'] <= len(SECTIONS)
+    assert result['chunks'] == gemini.stats['calls']
+
+
+def test_large_documents_are_batched_without_the_flag(app, client, gemini, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'CHUNK_TOKEN_BUDGET', 30)
+    monkeypatch.setitem(app.app.config, 'CHUNK_AUTO_THRESHOLD_TOKENS', 20)
+    upload(client, document())
+
+    assert gemini.stats['calls'] > 1
+
+
+def test_reupload_keeps_batches_whose_sections_are_unchanged(app, client, gemini, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'CHUNK_TOKEN_BUDGET', 20)
+    upload(client, document(), chunked='1')
+    first_calls = gemini.stats['calls']
+
+    result = upload(client, document(Lockout='Accounts are locked after three failed sign-ins.'))
+
+    assert gemini.stats['calls'] == first_calls + 1
+    assert result['sections']['unchanged'] == len(SECTIONS) - 1
+    assert result['kept'] > 0
+
+
+def record_prompts(gemini, monkeypatch):
+    prompts = []
+    generate_content = gemini.FakeGenerativeModel.generate_content
+
+    def record(self, prompt, **kwargs):
+        prompts.append(prompt)
+        return generate_content(self, prompt, **kwargs)
+
+    monkeypatch.setattr(gemini.FakeGenerativeModel, 'generate_content', record)
+    return prompts
+
+
+def edit(client, test_case, name):
+    response = client.put(f"/test-cases/{test_case['id']}", json={**test_case, 'test_case_name': name})
+    assert response.status_code == 200
+
+
+def test_editing_one_section_regenerates_only_that_section(client, gemini, monkeypatch):
+    monkeypatch.setitem(gemini.settings, 'cases', 2 * len(SECTIONS))
+    upload(client, document())
+    stored = client.get('/test-cases').get_json()
+    assert {tc['source_section'] for tc in stored} == {f'## {title}' for title in SECTIONS}
+    login_case = next(tc for tc in stored if tc['source_section'] == '## Login')
+    lockout_case = next(tc for tc in stored if tc['source_section'] == '## Lockout')
+    edit(client, login_case, 'Edited login case')
+    edit(client, lockout_case, 'Edited lockout case')
+
+    prompts = record_prompts(gemini, monkeypatch)
+    result = upload(client, document(Lockout='Accounts are locked after three failed sign-ins.'))
+
+    assert len(prompts) == 1
+    assert 'three failed sign-ins' in prompts[0]
+    assert not any(body in prompts[0] for title, body in SECTIONS.items() if title != 'Lockout')
+    assert result['sections']['unchanged'] == len(SECTIONS) - 1
+    assert result['sections']['regenerated'] == 1
+
+    survivors = {tc['id']: tc for tc in client.get('/test-cases').get_json()}
+    for tc in stored:
+        if tc['source_section'] != '## Lockout':
+            assert tc['id'] in survivors
+    assert survivors[login_case['id']]['test_case_name'] == 'Edited login case'
+    assert survivors[lockout_case['id']]['test_case_name'] == 'Edited lockout case'
+    assert result['kept'] == len(stored) - sum(tc['source_section'] == '## Lockout' for tc in stored) + 1
+
+
+def test_edited_cases_survive_when_their_batch_is_regenerated(client, gemini, monkeypatch):
+    # A model that ignores the section numbers ties every case to the whole document
+    monkeypatch.setattr(gemini, 'SECTION_MARKER_PATTERN', re.compile(r'(?!)'))
+    upload(client, document())
+    stored = client.get('/test-cases').get_json()
+    edit(client, stored[0], 'Edited case')
+
+    result = upload(client, document(Lockout='Accounts are locked after three failed sign-ins.'))
+
+    assert result['kept'] == 1
+    survivors = {tc['id']: tc for tc in client.get('/test-cases').get_json()}
+    assert survivors[stored[0]['id']]['test_case_name'] == 'Edited case'
+    assert not any(tc['id'] in survivors for tc in stored[1:])
+
+
+def test_stream_honors_chunked(app, client, gemini, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'CHUNK_TOKEN_BUDGET', 30)
+    response = client.post('/upload/stream', data={'file': (io.BytesIO(document()), 'auth.txt'), 'chunked': '1'},
+                           content_type='multipart/form-data')
+
+    assert b'"completed"' in response.data
+    assert gemini.stats['calls'] > 1
@@ -0,0 +1,37 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from werkzeug.datastructures import FileStorage
+
+
+def test_upload_takes_over_the_request_spool(app):
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    spool.write(b'The user can log in.')
+    file = FileStorage(stream=spool, filename='spec.txt')
+
+    upload = app.SpooledUpload(file)
+    try:
+        assert upload.file is spool
+        assert upload.size == 20
+        assert upload.content_hash == hashlib.sha256(b'The user can log in.').hexdigest()
+        # Closing the request's files must not close the upload
+        file.close()
+        assert upload.open().read() == b'The user can log in.'
+    finally:
+        upload.close()
+
+
+def test_identical_uploads_are_stored_once(app):
+    paths = set()
+    for filename in ('a.txt', 'b.txt'):
+        upload = app.read_upload(FileStorage(stream=io.BytesIO(b'Same content'), filename=filename))
+        paths.add(upload.path)
+        upload.close()
+
+    assert len(paths) == 1
+    path = paths.pop()
+    assert os.path.basename(path) == hashlib.sha256(b'Same content').hexdigest()
+    with open(path, 'rb') as f:
+        assert f.read() == b'Same content'